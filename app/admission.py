@@ -0,0 +1,287 @@
+"""
+admission.py  ──  Admission control for LLM-bound requests
+
+At most ADMISSION_MAX_CONCURRENT requests run LLM work at once. The rest
+wait in a bounded queue where chat is served ahead of parse. A single API
+key (or client address) and a single session can hold only a few of those
+slots. Once at its quota, a caller waits even if global slots are free,
+so other callers go first.
+
+A request that would queue is rejected straight away with 429 and a
+Retry-After header when the queue is full or its projected wait exceeds
+the deadline of its priority. The projection is a rough estimate: the
+service times of the requests ahead of it, divided by the limit, from
+moving averages per priority. A queued request that still misses its
+deadline is rejected the same way. Background callers pass deadline=None
+and wait as long as needed.
+
+Functions you'll use elsewhere:
+    • with await admit(request, "chat", session=sid): ...  → 429 when overloaded
+    • with await admission.acquire("parse", deadline=None): ...
+    • admission.stats()
+"""
+
+from __future__ import annotations
+import asyncio
+import math
+import os
+import time
+from collections import Counter as Tally, deque
+from typing import Deque, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from .metrics import Counter, Gauge, Histogram
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_PER_KEY = int(os.getenv("ADMISSION_PER_KEY", "8"))           # concurrent slots per API key
+ADMISSION_PER_SESSION = int(os.getenv("ADMISSION_PER_SESSION", "1"))   # concurrent slots per session
+# Trusted proxies in front of the app; when > 0, keyless callers are keyed by
+# the X-Forwarded-For entry that many hops from the right
+ADMISSION_FORWARDED_HOPS = int(os.getenv("ADMISSION_FORWARDED_HOPS", "0"))
+ADMISSION_DEADLINES = {                                                # max queue wait, seconds
+    "chat": float(os.getenv("ADMISSION_CHAT_DEADLINE", "10")),
+    "parse": float(os.getenv("ADMISSION_PARSE_DEADLINE", "30")),
+}
+
+# Lower rank is served first; "background" (summaries) has no deadline
+PRIORITIES = {"chat": 0, "parse": 1, "background": 2}
+_EWMA_ALPHA = 0.2
+_DEFAULT = object()
+
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds", "Time admitted requests spent queued", ("priority",)
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total", "Requests rejected by admission control", ("priority", "reason")
+)
+
+
+class Overloaded(Exception):
+    """No slot can be granted in time; retry after *retry_after* seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server overloaded ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A granted slot. Release it exactly once, or use it as a context manager."""
+
+    __slots__ = ("_controller", "priority", "key", "session", "admitted_at", "_released")
+
+    def __init__(self, controller: "AdmissionController", priority: str, key, session):
+        self._controller = controller
+        self.priority = priority
+        self.key = key
+        self.session = session
+        self.admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self)
+
+    def __enter__(self) -> "Ticket":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class _Waiter:
+    __slots__ = ("priority", "key", "session", "future", "enqueued")
+
+    def __init__(self, priority: str, key, session):
+        self.priority = priority
+        self.key = key
+        self.session = session
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        limit: int = ADMISSION_MAX_CONCURRENT,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        per_key: int = ADMISSION_PER_KEY,
+        per_session: int = ADMISSION_PER_SESSION,
+        deadlines: Optional[Dict[str, float]] = None,
+        enabled: bool = ADMISSION_ENABLED,
+    ):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.per_key = per_key
+        self.per_session = per_session
+        self.deadlines = dict(deadlines or ADMISSION_DEADLINES)
+        self.enabled = enabled
+        self._active = 0
+        self._by_key: Tally = Tally()
+        self._by_session: Tally = Tally()
+        self._queues: Dict[str, Deque[_Waiter]] = {p: deque() for p in PRIORITIES}
+        self._service: Dict[str, Optional[float]] = {p: None for p in PRIORITIES}   # EWMA seconds
+        self._counters = {"admitted": 0, "waited": 0}
+        self._rejections: Tally = Tally()
+
+    # ── API ────────────────────────────────────────────────────────────────
+    async def acquire(
+        self, priority: str, key: Optional[str] = None, session: Optional[str] = None, deadline=_DEFAULT
+    ) -> Ticket:
+        """
+        Wait for a slot. Raises Overloaded if none is expected, or granted,
+        within *deadline* seconds (default: the priority's deadline).
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}")
+        if deadline is _DEFAULT:
+            deadline = self.deadlines.get(priority)
+        if not self.enabled or (self._active < self.limit and self._within_quota(key, session)):
+            # Free slots only exist while every waiter is held back by its quota
+            return self._admit(priority, key, session)
+
+        if deadline is not None:
+            if self.depth() >= self.queue_size:
+                self._reject(priority, "queue_full", self._projected_wait(priority))
+            projected = self._projected_wait(priority)
+            if projected > deadline:
+                self._reject(priority, "deadline", projected)
+
+        waiter = _Waiter(priority, key, session)
+        self._queues[priority].append(waiter)
+        self._counters["waited"] += 1
+        try:
+            ticket = await asyncio.wait_for(waiter.future, deadline)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self._reject(priority, "timeout", self._projected_wait(priority))
+        except asyncio.CancelledError:
+            self._discard(waiter)
+            if waiter.future.done() and not waiter.future.cancelled():
+                waiter.future.result().release()   # granted just as we were cancelled
+            raise
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - waiter.enqueued, priority=priority)
+        return ticket
+
+    def depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "active": self._active,
+            "limit": self.limit,
+            "queued": {p: len(q) for p, q in self._queues.items()},
+            "queue_size": self.queue_size,
+            "per_key": self.per_key,
+            "per_session": self.per_session,
+            "deadlines_seconds": self.deadlines,
+            "service_seconds": {p: round(s, 3) if s is not None else None for p, s in self._service.items()},
+            "rejections": {f"{p}:{r}": n for (p, r), n in self._rejections.items()},
+            **self._counters,
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _within_quota(self, key, session) -> bool:
+        return (key is None or self._by_key[key] < self.per_key) and (
+            session is None or self._by_session[session] < self.per_session
+        )
+
+    def _admit(self, priority: str, key, session) -> Ticket:
+        self._active += 1
+        if key is not None:
+            self._by_key[key] += 1
+        if session is not None:
+            self._by_session[session] += 1
+        self._counters["admitted"] += 1
+        return Ticket(self, priority, key, session)
+
+    def _release(self, ticket: Ticket) -> None:
+        self._active -= 1
+        for tally, name in ((self._by_key, ticket.key), (self._by_session, ticket.session)):
+            if name is not None:
+                tally[name] -= 1
+                if tally[name] <= 0:
+                    del tally[name]
+        took = time.monotonic() - ticket.admitted_at
+        previous = self._service[ticket.priority]
+        self._service[ticket.priority] = took if previous is None else (
+            previous + _EWMA_ALPHA * (took - previous)
+        )
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._active < self.limit:
+            waiter = self._next_eligible()
+            if waiter is None:
+                return
+            self._queues[waiter.priority].remove(waiter)
+            if not waiter.future.done():
+                waiter.future.set_result(self._admit(waiter.priority, waiter.key, waiter.session))
+
+    def _next_eligible(self) -> Optional[_Waiter]:
+        for priority in sorted(PRIORITIES, key=PRIORITIES.get):
+            for waiter in self._queues[priority]:
+                if self._within_quota(waiter.key, waiter.session):
+                    return waiter
+        return None
+
+    def _discard(self, waiter: _Waiter) -> None:
+        try:
+            self._queues[waiter.priority].remove(waiter)
+        except ValueError:
+            pass
+
+    def _projected_wait(self, priority: str) -> float:
+        """Seconds until a new *priority* request would likely get a slot."""
+        own = self._service[priority]
+        if own is None:
+            return 0.0   # no measurements yet; rely on the queue bound
+        rank = PRIORITIES[priority]
+        ahead = 0.0
+        for p, queue in self._queues.items():
+            if PRIORITIES[p] <= rank:
+                ahead += len(queue) * (self._service[p] if self._service[p] is not None else own)
+        # + one service time for a running call to free its slot
+        return (ahead + own) / max(self.limit, 1)
+
+    def _reject(self, priority: str, reason: str, projected: float) -> None:
+        self._rejections[(priority, reason)] += 1
+        ADMISSION_REJECTIONS.inc(priority=priority, reason=reason)
+        raise Overloaded(reason, max(1, math.ceil(projected)))
+
+
+def client_key(request: Request, forwarded_hops: int = ADMISSION_FORWARDED_HOPS) -> str:
+    """
+    Quota key: the API key when one is sent, otherwise the client address.
+    Behind *forwarded_hops* trusted proxies the address is read from
+    X-Forwarded-For; entries further left are client-supplied and ignored.
+    """
+    api_key = request.headers.get("authorization")
+    if api_key:
+        return api_key
+    if forwarded_hops > 0:
+        hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        if hops:
+            return hops[-min(forwarded_hops, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
+async def admit(request: Request, priority: str, session: Optional[str] = None) -> Ticket:
+    """acquire() for a route handler: Overloaded becomes 429 with Retry-After."""
+    try:
+        return await admission.acquire(priority, key=client_key(request), session=session)
+    except Overloaded as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+# singleton used by the FastAPI app
+admission = AdmissionController()
+
+Gauge("admission_active", "Requests holding an LLM slot", collect=lambda: admission.stats()["active"])
+Gauge("admission_queue_depth", "Requests waiting for an LLM slot", ("priority",),
+      collect=lambda: {(p,): n for p, n in admission.stats()["queued"].items()})
@@ -0,0 +1,209 @@
+"""
+answer_cache.py  ──  Opt-in cache of chat answers per resume
+
+Answers are keyed by a fingerprint of the resume + metadata and the
+normalised question. Near-duplicate questions ("what's my email?" /
+"what is the email on my resume") match at the token level. They must use
+exactly the same content words, so the only differences allowed are
+stopwords and word order, and their token cosine must reach the threshold.
+"python experience" never matches "java experience", however similar the
+characters. Generative or conversational prompts (cover letters, "tell me
+more") bypass the cache because their answer should not be replayed.
+
+Functions you'll use elsewhere:
+    • answer_cache.lookup(session, question) → cached answer | None
+    • answer_cache.store(session, question, answer)
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from .session_manager import Session
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.9"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+# Prompts whose answers are meant to be freshly generated or depend on the
+# conversation so far; these are never served from (or written to) the cache.
+_BYPASS = re.compile(
+    r"\b(cover letter|write|draft|compose|generate|rewrite|tailor|elaborate|"
+    r"tell me more|more detail|expand on|say that again|try again|what about|"
+    r"previous (answer|question|response)|(mentioned|said|listed) above)\b"
+)
+# Words that may differ between two questions without changing what is asked.
+# Question words and negations are deliberately not here.
+_STOPWORDS = frozenset(
+    "a an the is are was were be been am do does did have has had i me my mine "
+    "you your of in on at to for from with by about as and or please tell show "
+    "give list can could would will there this these those it its any all some "
+    "resume cv".split()
+)
+_STOPWORD_WEIGHT = 0.25
+_CONTRACTIONS = re.compile(r"\b(what|who|where|how)'?s\b")
+
+
+def normalize_question(question: str) -> str:
+    q = _CONTRACTIONS.sub(r"\1 is", question.lower().strip())
+    q = re.sub(r"[^\w\s]", " ", q)
+    return " ".join(q.split())
+
+
+def _stem(token: str) -> str:
+    # "skills" / "skill"; enough for questions, no stemmer dependency
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+
+def _tokens(text: str) -> Counter:
+    """Token weights for *text* (normalised); stopwords count for little."""
+    weights: Counter = Counter()
+    for token in text.split():
+        weights[_stem(token)] += _STOPWORD_WEIGHT if token in _STOPWORDS else 1.0
+    return weights
+
+
+def _content(vector: Counter) -> frozenset:
+    return frozenset(t for t, w in vector.items() if w >= 1.0)
+
+
+def similarity(a: str, b: str) -> float:
+    """
+    Token cosine of two normalised questions, or 0.0 when any content word
+    (anything but a stopword) appears in one and not the other.
+    """
+    va, vb = _tokens(a), _tokens(b)
+    return _cosine(va, vb) if _content(va) == _content(vb) else 0.0
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    dot = sum(v * b.get(k, 0) for k, v in a.items())
+    if not dot:
+        return 0.0
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+def fingerprint(session: Session) -> str:
+    digest = hashlib.sha256(session.resume_text.encode("utf-8"))
+    digest.update(json.dumps(session.metadata, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class _Entry:
+    answer: str
+    vector: Counter
+    content: frozenset
+    expires_at: float
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        enabled: bool = ANSWER_CACHE_ENABLED,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl: float = ANSWER_CACHE_TTL,
+    ):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        # fingerprint -> normalised questions cached for it (for near-dup scans)
+        self._by_resume: Dict[str, set] = {}
+        self._counters = {"hits": 0, "near_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+    # ── API ────────────────────────────────────────────────────────────────
+    def cacheable(self, question: str) -> bool:
+        return self.enabled and not _BYPASS.search(question.lower())
+
+    def lookup(self, session: Session, question: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        if not self.cacheable(question):
+            self._counters["bypassed"] += 1
+            return None
+
+        fp = fingerprint(session)
+        norm = normalize_question(question)
+        now = time.monotonic()
+
+        entry = self._live(fp, norm, now)
+        if entry is not None:
+            self._counters["hits"] += 1
+            return entry.answer
+
+        vector = _tokens(norm)
+        content = _content(vector)
+        best: Tuple[float, Optional[str]] = (0.0, None)
+        for other in list(self._by_resume.get(fp, ())):
+            candidate = self._live(fp, other, now)
+            if candidate is None or candidate.content != content:
+                continue
+            score = _cosine(vector, candidate.vector)
+            if score > best[0]:
+                best = (score, other)
+        if best[1] is not None and best[0] >= self.threshold:
+            self._counters["near_hits"] += 1
+            self._entries.move_to_end((fp, best[1]))
+            return self._entries[(fp, best[1])].answer
+
+        self._counters["misses"] += 1
+        return None
+
+    def store(self, session: Session, question: str, answer: str) -> None:
+        if not self.cacheable(question):
+            return
+        fp = fingerprint(session)
+        norm = normalize_question(question)
+        key = (fp, norm)
+        vector = _tokens(norm)
+        self._entries[key] = _Entry(answer, vector, _content(vector), time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        self._by_resume.setdefault(fp, set()).add(norm)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._forget(old_key)
+            self._counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "resumes": len(self._by_resume),
+            **self._counters,
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _live(self, fp: str, norm: str, now: float) -> Optional[_Entry]:
+        key = (fp, norm)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del self._entries[key]
+            self._forget(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _forget(self, key: Tuple[str, str]) -> None:
+        fp, norm = key
+        questions = self._by_resume.get(fp)
+        if questions is not None:
+            questions.discard(norm)
+            if not questions:
+                del self._by_resume[fp]
+
+
+# singleton used by the FastAPI app
+answer_cache = AnswerCache()
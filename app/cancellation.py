@@ -0,0 +1,44 @@
+"""
+cancellation.py  ──  Abort in-flight work when the HTTP client goes away
+
+Functions you'll use elsewhere:
+    • await run_until_disconnect(request, coro) → coro's result, or raises
+      ClientDisconnected after cancelling coro
+"""
+
+from __future__ import annotations
+import asyncio
+from typing import Awaitable, TypeVar
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection before the work finished."""
+
+
+async def _wait_for_disconnect(request: Request, poll_interval: float) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(poll_interval)
+
+
+async def run_until_disconnect(request: Request, work: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """Await *work*, cancelling it as soon as *request*'s client disconnects."""
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request, poll_interval))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Also reached when our own caller is cancelled
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+    if task not in done:
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+        raise ClientDisconnected()
+    return task.result()
@@ -2,40 +2,97 @@
 chat_pipeline.py  ──  Build one LLMChain per (resume_text, memory)
 
 Functions you'll use elsewhere:
-    • new_memory(k=2)           → fresh ConversationBufferWindowMemory
-    • build_chain(resume, mem)  → LLMChain wired to that memory + resume
+    • new_memory()              → fresh TokenBudgetMemory
+    • get_llm()                 → the shared model, created on first use and
+                                  routed with fallbacks, see llm_router
+    • build_chain(session)      → LLMChain wired to that memory + resume,
+                                  cached on the session until it changes
+    • apredict_with_monitoring  → awaitable, timeout-bounded LLM call
 """
 
 from __future__ import annotations
+import asyncio
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains import LLMChain
-from langsmith import traceable
-from .langsmith_config import setup_langsmith_tracing
+from typing import TYPE_CHECKING, AsyncIterator
 from .session_manager import Session
-# Initialize LangSmith tracing
-setup_langsmith_tracing()
+from .resume_context import ResumeContext
+from .tracing import traced
+from .metrics import stage_timer
+from .startup import startup
+from .llm_router import deadline_scope
+
+# LangChain is imported where it is first needed, keeping app startup fast
+if TYPE_CHECKING:
+    from langchain.chains import LLMChain
+    from langchain.prompts import ChatPromptTemplate
 
 # ────────────────────────────────────────────────────────────────────────────
-# 1. Gemini model (shared, thread-safe)
+# 1. Gemini model (shared, thread-safe, created lazily)
 # ────────────────────────────────────────────────────────────────────────────
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",          # pick any Gemini chat model
-    temperature=0.8,
-    max_tokens=1024,
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-    convert_system_message_to_human=True,  # Convert system messages to human messages
-)
+_llm = None
 
 
+def get_llm():
+    """
+    The shared model, created (and LangChain's Google client imported) on
+    first use: LLM_MODEL with LLM_FALLBACK_MODELS behind it, see llm_router.
+    """
+    global _llm
+    if _llm is None:
+        with startup.timed("llm_client"):
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            from .llm_metrics import LLMMetricsCallback
+            from .llm_router import LLM_FALLBACK_MODELS, LLM_MODEL
+            from .routed_chat_model import RoutedChatModel
 
-def _prompt_for_metadata(resume_text: str) -> ChatPromptTemplate:
-    system_msg = f"""
+            models = {
+                name: ChatGoogleGenerativeAI(
+                    model=name,
+                    temperature=0.8,
+                    max_tokens=1024,
+                    google_api_key=os.getenv("GOOGLE_API_KEY"),
+                    convert_system_message_to_human=True,  # Convert system messages to human messages
+                    max_retries=1,   # retries and fallback are the router's job
+                )
+                for name in dict.fromkeys([LLM_MODEL, *LLM_FALLBACK_MODELS])
+            }
+            _llm = RoutedChatModel(models=models, callbacks=[LLMMetricsCallback()])
+    return _llm
+
+
+def preload() -> None:
+    """Import LangChain and create the model ahead of the first request (warm-up)."""
+    from langchain.chains import LLMChain  # noqa: F401
+    from .session_manager import new_memory
+
+    get_llm()
+    _prompt_for_metadata()
+    new_memory()
+
+
+def set_llm(model) -> None:
+    """
+    Replace the shared model (benchmarks, fakes). Wrap fakes in a
+    RoutedChatModel to exercise the routing policy. Chains already cached
+    keep the old one.
+    """
+    global _llm
+    _llm = model
+
+
+# Upper bound on a single awaited LLM call, in seconds
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+
+
+def _prompt_for_metadata() -> ChatPromptTemplate:
+    from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    # The resume is passed as {resume_context}, see prompt_inputs
+    system_msg = """
     There is a resume below.
     --- RESUME START ---
-    {resume_text}
+    {resume_context}
     --- RESUME END ---
     """.strip()
     return ChatPromptTemplate.from_messages(
@@ -47,9 +104,13 @@ def _prompt_for_metadata(resume_text: str) -> ChatPromptTemplate:
     )
 
 
-def _prompt_from_resume(resume_text: str, metadata: dict) -> ChatPromptTemplate:
-    # Format metadata in a way that won't be parsed as template variables
+def _prompt_from_resume(metadata: dict) -> ChatPromptTemplate:
+    from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    # Format metadata in a way that won't be parsed as template variables.
+    # The resume itself is passed per turn as {resume_context}, see prompt_inputs.
     metadata_text = "\n".join([f"{k}: {v}" for k, v in metadata.items()])
+    metadata_block = metadata_text.replace("{", "\n").replace("}", "\n")
     
     system_msg = f"""
     You are a helpful assistant. There is a resume of the user below. Use the information in the resume as a context.
@@ -59,15 +120,13 @@ def _prompt_from_resume(resume_text: str, metadata: dict) -> ChatPromptTemplate:
     then you should generate a response that is concise and approximately 120 words, unless the user explicitly specifies a different length. 
     You should maintain a professional tone and use the resume information to personalize the content.
     --- RESUME START ---
-    {resume_text.replace("{", "\n").replace("}", "\n")}
+    {{resume_context}}
     --- RESUME END ---
     --- METADATA START ---
-    {metadata_text.replace("{", "\n").replace("}", "\n")}
+    {metadata_block}
     --- METADATA END ---
     """.strip()
 
-    print(system_msg)
-
     return ChatPromptTemplate.from_messages(
         [
             ("system", system_msg),
@@ -76,19 +135,55 @@ def _prompt_from_resume(resume_text: str, metadata: dict) -> ChatPromptTemplate:
         ]
     )
 
+
+# Prepared chains are cached on the Session and dropped by Session.set_metadata
+# or a resume_text change; these counters show how often that cache pays off.
+_chain_cache_stats = {"hits": 0, "rebuilds": 0}
+
+
 def build_chain(session: Session, prompt_type: str = "chat") -> LLMChain:
-    if prompt_type == "chat":
-        prompt = _prompt_from_resume(session.resume_text, session.metadata)
-    elif prompt_type == "metadata":
-        prompt = _prompt_for_metadata(session.resume_text)
-    else:
-        raise ValueError(f"Invalid prompt type: {prompt_type}")
-    print(prompt)
-    return LLMChain(llm=llm, prompt=prompt, memory=session.memory)
-
-
-@traceable(name="chat_prediction")
-def predict_with_monitoring(chain: LLMChain, question: str, session_id: str = None) -> dict:
+    chain = session.chains.get(prompt_type)
+    if chain is not None:
+        _chain_cache_stats["hits"] += 1
+        return chain
+
+    with stage_timer("build_chain"):
+        from langchain.chains import LLMChain
+
+        if prompt_type == "chat":
+            prompt = _prompt_from_resume(session.metadata)
+        elif prompt_type == "metadata":
+            prompt = _prompt_for_metadata()
+        else:
+            raise ValueError(f"Invalid prompt type: {prompt_type}")
+        chain = LLMChain(llm=get_llm(), prompt=prompt, memory=session.memory)
+    session.chains[prompt_type] = chain
+    _chain_cache_stats["rebuilds"] += 1
+    return chain
+
+
+def prompt_inputs(session: Session, question: str, prompt_type: str = "chat") -> dict:
+    """
+    Per-turn prompt variables besides the question: for chat, the parts of
+    the resume relevant to *question* (or all of it in full-context mode);
+    for metadata extraction, the whole resume.
+    """
+    if prompt_type == "metadata":
+        return {"resume_context": session.resume_text}
+    if session.context is None:
+        session.context = ResumeContext(session.resume_text)
+    return {"resume_context": session.context.build(question)}
+
+
+def chain_cache_stats() -> dict:
+    """Return how many build_chain calls were served from the session cache."""
+    return dict(_chain_cache_stats)
+
+
+@traced("chat_prediction")
+def predict_with_monitoring(
+    chain: LLMChain, question: str, session_id: str = None, inputs: dict | None = None
+) -> dict:
     """
     Wrapper function to make LLM predictions with LangSmith monitoring.
     
@@ -96,19 +191,74 @@ def predict_with_monitoring(chain: LLMChain, question: str, session_id: str = No
         chain: The LLMChain to use for prediction
         question: The user's question
         session_id: Optional session identifier for tracking
+        inputs: Extra prompt variables, see prompt_inputs()
         
     Returns:
         Dictionary containing the answer and metadata
     """
     try:
         # Make the prediction with the chain
-        answer = chain.predict(question=question)
+        answer = chain.predict(question=question, **(inputs or {}))
+        return {
+            "answer": answer,
+            "session_id": session_id,
+            "status": "success",
+            "question": question
+        }
+    except Exception as e:
+        return {
+            "answer": f"Error: {str(e)}",
+            "session_id": session_id,
+            "status": "error",
+            "question": question,
+            "error": str(e)
+        }
+
+@traced("chat_prediction")
+async def apredict_with_monitoring(
+    chain: LLMChain,
+    question: str,
+    session_id: str = None,
+    timeout: float | None = LLM_TIMEOUT,
+    inputs: dict | None = None,
+) -> dict:
+    """
+    Async counterpart of predict_with_monitoring: awaits the model instead of
+    blocking the event loop.
+
+    Cancelling the awaiting task (e.g. because the client disconnected)
+    cancels the underlying model request and leaves the memory untouched.
+
+    Args:
+        chain: The LLMChain to use for prediction
+        question: The user's question
+        session_id: Optional session identifier for tracking
+        timeout: Seconds to wait for the model; None waits forever
+        inputs: Extra prompt variables, see prompt_inputs()
+
+    Returns:
+        Dictionary containing the answer and metadata
+    """
+    try:
+        # The router spends what is left of the timeout on retries / fallbacks
+        with deadline_scope(timeout):
+            answer = await asyncio.wait_for(
+                chain.apredict(question=question, **(inputs or {})), timeout
+            )
         return {
             "answer": answer,
             "session_id": session_id,
             "status": "success",
             "question": question
         }
+    except asyncio.TimeoutError:
+        return {
+            "answer": f"Error: model did not answer within {timeout}s",
+            "session_id": session_id,
+            "status": "timeout",
+            "question": question,
+            "error": "timeout"
+        }
     except Exception as e:
         return {
             "answer": f"Error: {str(e)}",
@@ -118,6 +268,49 @@ def predict_with_monitoring(chain: LLMChain, question: str, session_id: str = No
             "error": str(e)
         }
 
+
+@traced("chat_stream")
+async def stream_with_monitoring(
+    chain: LLMChain, question: str, session_id: str = None, inputs: dict | None = None
+) -> AsyncIterator[str]:
+    """
+    Stream the answer token-by-token as the model produces it.
+
+    The chain's memory is updated with the full turn only once the stream has
+    completed, so an aborted stream leaves the conversation untouched.
+
+    Args:
+        chain: The LLMChain whose prompt, model and memory to use
+        question: The user's question
+        session_id: Optional session identifier for tracking
+        inputs: Extra prompt variables, see prompt_inputs()
+
+    Yields:
+        Text chunks of the answer
+    """
+    # prep_inputs merges the memory variables (history) into the inputs
+    prepared = chain.prep_inputs({"question": question, **(inputs or {})})
+    messages = chain.prompt.format_messages(
+        **{k: prepared[k] for k in chain.prompt.input_variables}
+    )
+    parts = []
+    async for chunk in chain.llm.astream(messages):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    if chain.memory is not None:
+        chain.memory.save_context({"question": question}, {"text": "".join(parts)})
+
 # Specify which symbols should be available when using "from chat_pipeline import *"
 # Only expose the new_memory() and build_chain() functions as the public API
-__all__ = ["new_memory", "build_chain", "predict_with_monitoring"]
+__all__ = [
+    "new_memory",
+    "get_llm",
+    "set_llm",
+    "build_chain",
+    "predict_with_monitoring",
+    "apredict_with_monitoring",
+    "stream_with_monitoring",
+    "prompt_inputs",
+    "chain_cache_stats",
+]
@@ -0,0 +1,119 @@
+"""
+conversation_memory.py  ──  Token-budgeted chat memory with a running summary
+
+TokenBudgetMemory keeps the latest turns verbatim, up to MEMORY_TOKEN_BUDGET
+tokens. It replaces a fixed window of k turns. Turns pushed out of the
+budget are parked in `evicted`. Later, off the request path, asummarize()
+folds them into `summary`. The summary is sent to the model as a system
+message ahead of the kept turns. Prompt size stays close to the budget plus
+the summary, while older context is kept in condensed form.
+
+Tokens are estimated from character counts. Counting through the model's
+API on every turn would cost a network round trip.
+
+Imported on first use (see session_manager.new_memory); it pulls in LangChain.
+"""
+
+from __future__ import annotations
+import math
+import os
+from typing import Any, Dict, List
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+from pydantic import Field
+
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))
+MEMORY_SUMMARY_WORDS = int(os.getenv("MEMORY_SUMMARY_WORDS", "150"))
+_CHARS_PER_TOKEN = 4
+_PER_MESSAGE_TOKENS = 4
+# Evicted messages kept while summaries keep failing; older ones are dropped
+_MAX_UNSUMMARIZED = 40
+
+_SUMMARY_PROMPT = """
+Progressively summarize the conversation between a user and an assistant
+about the user's resume. Extend the current summary with the new lines.
+Keep names, facts, decisions and anything the user asked to be remembered.
+Use at most {words} words and return only the summary.
+
+Current summary:
+{summary}
+
+New lines:
+{lines}
+
+New summary:
+""".strip()
+
+
+def approx_tokens(messages: List[BaseMessage]) -> int:
+    return sum(
+        math.ceil(len(str(m.content)) / _CHARS_PER_TOKEN) + _PER_MESSAGE_TOKENS for m in messages
+    )
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    memory_key: str = "history"
+    max_token_limit: int = MEMORY_TOKEN_BUDGET
+    summary: str = ""
+    # Turns dropped from the buffer, not yet folded into the summary
+    evicted: List[BaseMessage] = Field(default_factory=list)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        messages = list(self.chat_memory.messages)
+        if self.summary:
+            messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}"))
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        super().save_context(inputs, outputs)
+        self.prune()
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        await super().asave_context(inputs, outputs)
+        self.prune()
+
+    def prune(self) -> bool:
+        """
+        Move the oldest turns to `evicted` until the buffer fits the budget.
+        The newest turn always stays. Returns True if anything was evicted.
+        """
+        messages = self.chat_memory.messages
+        moved = False
+        while len(messages) > 2 and approx_tokens(messages) > self.max_token_limit:
+            self.evicted.extend(messages[:2])
+            del messages[:2]
+            moved = True
+        del self.evicted[:-_MAX_UNSUMMARIZED]
+        return moved
+
+    @property
+    def needs_summary(self) -> bool:
+        return bool(self.evicted)
+
+    async def asummarize(self, llm) -> None:
+        """Fold the evicted turns into the running summary with one model call."""
+        batch = list(self.evicted)
+        if not batch:
+            return
+        prompt = _SUMMARY_PROMPT.format(
+            words=MEMORY_SUMMARY_WORDS,
+            summary=self.summary or "(empty)",
+            lines=get_buffer_string(batch),
+        )
+        result = await llm.ainvoke(prompt)
+        self.summary = str(result.content).strip()
+        # Turns evicted while the model was answering wait for the next round
+        done = {id(m) for m in batch}
+        self.evicted[:] = [m for m in self.evicted if id(m) not in done]
+
+    def clear(self) -> None:
+        super().clear()
+        self.summary = ""
+        self.evicted.clear()
@@ -0,0 +1,156 @@
+"""
+conversation_store.py  ──  Write-behind persistence of chat turns
+
+Each completed turn is appended to an in-memory buffer and written to the
+`conversation_turns` table in batches, so /session/chat never waits on the
+database. Turns carry a random id with a unique index, making a retried
+batch idempotent. The buffer is drained on shutdown. SessionManager reads
+the latest turns back when it rebuilds a session, which restores the
+conversation after a restart or eviction.
+
+Functions you'll use elsewhere:
+    • await conversation_store.append(session_id, question, answer)
+    • await conversation_store.recent(session_id, limit) → [Turn], oldest first
+    • conversation_store.start() / await conversation_store.drain()
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import List
+
+from .database import create_table, dialect_insert, get_engine
+from .metrics import stage_timer
+from .write_behind import WriteBehindBuffer
+
+CONVERSATION_PERSIST = os.getenv("CONVERSATION_PERSIST", "true").lower() == "true"
+CONVERSATION_WRITE_BATCH = int(os.getenv("CONVERSATION_WRITE_BATCH", "200"))
+CONVERSATION_WRITE_INTERVAL = float(os.getenv("CONVERSATION_WRITE_INTERVAL", "1.0"))
+# Turns read back into memory when a session is rebuilt
+CONVERSATION_REHYDRATE_TURNS = int(os.getenv("CONVERSATION_REHYDRATE_TURNS", "20"))
+CONVERSATION_STORE_CREATE_SCHEMA = os.getenv("CONVERSATION_STORE_CREATE_SCHEMA", "true").lower() == "true"
+
+_table = None
+
+
+def turns_table():
+    global _table
+    if _table is None:
+        from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text
+
+        _table = Table(
+            "conversation_turns",
+            MetaData(),
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("turn_id", String(32), nullable=False),
+            Column("session_id", String(255), nullable=False),
+            Column("question", Text, nullable=False),
+            Column("answer", Text, nullable=False),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+            Index("ux_conversation_turns_turn_id", "turn_id", unique=True),
+            Index("ix_conversation_turns_session_id_created_at", "session_id", "created_at"),
+        )
+    return _table
+
+
+@dataclass
+class Turn:
+    session_id: str
+    question: str
+    answer: str
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    turn_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+class ConversationStore:
+    def __init__(
+        self,
+        enabled: bool = CONVERSATION_PERSIST,
+        batch_size: int = CONVERSATION_WRITE_BATCH,
+        interval: float = CONVERSATION_WRITE_INTERVAL,
+    ):
+        self.enabled = enabled
+        self._writes = WriteBehindBuffer(
+            "conversation writes", self._flush, max_batch=batch_size, interval=interval,
+            key=lambda t: t.turn_id,
+        )
+        self._schema_ready = False   # table known to exist (created or found)
+        self._schema_lock = asyncio.Lock()   # one creator when first requests race
+
+    # ── API ────────────────────────────────────────────────────────────────
+    async def append(self, session_id: str, question: str, answer: str) -> None:
+        if self.enabled:
+            await self._writes.add(Turn(session_id, question, answer))
+
+    async def recent(self, session_id: str, limit: int = CONVERSATION_REHYDRATE_TURNS) -> List[Turn]:
+        """The last *limit* turns of *session_id*, oldest first, including unflushed ones."""
+        if not self.enabled or limit <= 0:
+            return []
+        from sqlalchemy import select
+
+        table = turns_table()
+        query = (
+            select(table.c.turn_id, table.c.question, table.c.answer, table.c.created_at)
+            .where(table.c.session_id == session_id)
+            .order_by(table.c.created_at.desc(), table.c.id.desc())
+            .limit(limit)
+        )
+        rows = []
+        with stage_timer("db_lookup"):
+            # Right after a restart nothing has been flushed yet; the table
+            # must still be read, not assumed absent
+            if await self._ensure_schema():
+                async with get_engine().connect() as conn:
+                    rows = (await conn.execute(query)).all()
+        stored = [Turn(session_id, r.question, r.answer, r.created_at, r.turn_id) for r in reversed(rows)]
+        seen = {t.turn_id for t in stored}
+        pending = [t for t in self._writes.pending_where(lambda t: t.session_id == session_id) if t.turn_id not in seen]
+        return (stored + pending)[-limit:]
+
+    def start(self) -> None:
+        self._writes.start()
+
+    async def drain(self) -> None:
+        await self._writes.drain()
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, **self._writes.stats()}
+
+    # ── internals ──────────────────────────────────────────────────────────
+    async def _ensure_schema(self) -> bool:
+        """Whether the table exists, creating it first when allowed."""
+        if self._schema_ready:
+            return True
+        async with self._schema_lock:
+            # Another request may have created it while this one waited
+            if self._schema_ready:
+                return True
+            async with get_engine().begin() as conn:
+                if CONVERSATION_STORE_CREATE_SCHEMA:
+                    await conn.run_sync(create_table, turns_table())
+                else:
+                    from sqlalchemy import inspect
+
+                    # A missing table means no turns yet, not an error
+                    if not await conn.run_sync(lambda sync: inspect(sync).has_table(turns_table().name)):
+                        return False
+            self._schema_ready = True
+            return True
+
+    async def _flush(self, batch: List[Turn]) -> None:
+        engine = get_engine()
+        insert = dialect_insert(engine)
+        table = turns_table()
+        # A batch retried after a partial failure must not duplicate turns
+        stmt = insert(table).on_conflict_do_nothing(index_elements=[table.c.turn_id])
+        with stage_timer("db_write"):
+            await self._ensure_schema()
+            async with engine.begin() as conn:
+                await conn.execute(stmt, [asdict(t) for t in batch])
+
+
+# singleton used by the FastAPI app
+conversation_store = ConversationStore()
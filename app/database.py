@@ -1,6 +1,8 @@
 # database.py
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+from .metrics import Gauge
+from .startup import startup
 
 
 import os
@@ -8,16 +10,78 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-DATABASE_URL = (
+# DATABASE_URL overrides the DB_* parts, e.g. sqlite+aiosqlite:///bench.db for benchmarks
+DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"postgresql+asyncpg://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
     f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
 )
 
-engine = create_async_engine(DATABASE_URL, echo=False, pool_size=10)
-AsyncSessionLocal = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+# SQLAlchemy and the engine are created on first use, so routes that never
+# touch the database (and app startup) don't pay for them
+_engine: Optional["AsyncEngine"] = None
+_sessionmaker = None
+
+
+def get_engine() -> "AsyncEngine":
+    global _engine, _sessionmaker
+    if _engine is None:
+        with startup.timed("db_engine"):
+            from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+            from sqlalchemy.orm import sessionmaker
+
+            _engine = create_async_engine(DATABASE_URL, echo=False, pool_size=10)
+            _sessionmaker = sessionmaker(
+                _engine, class_=AsyncSession, expire_on_commit=False
+            )
+    return _engine
+
+
+def AsyncSessionLocal() -> "AsyncSession":
+    """New AsyncSession; same call as the sessionmaker this used to be."""
+    get_engine()
+    return _sessionmaker()
+
+
+async def check_database() -> None:
+    """Open a pooled connection and run a trivial query (readiness / warm-up)."""
+    from sqlalchemy import text
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+
+
+def dialect_insert(engine: "AsyncEngine"):
+    """The dialect's insert() construct, which supports ON CONFLICT clauses."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Upserts are not supported on {engine.dialect.name}")
+    return insert
+
+
+def create_table(sync_conn, table) -> None:
+    """Create *table* and its indexes if missing (use with AsyncConnection.run_sync)."""
+    table.metadata.create_all(sync_conn, tables=[table])
+    # create_all skips indexes of tables that already existed
+    for index in table.indexes:
+        index.create(sync_conn, checkfirst=True)
+
+
+async def dispose_engine() -> None:
+    if _engine is not None:
+        await _engine.dispose()
+
+
+Gauge("db_pool_checked_out", "Database connections currently in use",
+      collect=lambda: _engine.pool.checkedout() if _engine is not None else 0)
+Gauge("db_pool_size", "Database connection pool size",
+      collect=lambda: _engine.pool.size() if _engine is not None else 0)
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
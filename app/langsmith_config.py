@@ -4,6 +4,8 @@ LangSmith configuration for monitoring AI/LLM usage, tokens, and resources.
 import os
 from typing import Optional
 
+from .tracing import tracer
+
 
 def setup_langsmith_tracing(
     project_name: Optional[str] = None,
@@ -18,9 +20,15 @@ def setup_langsmith_tracing(
         api_key: LangSmith API key (defaults to LANGCHAIN_API_KEY env var)
         endpoint: LangSmith endpoint (defaults to LANGCHAIN_ENDPOINT env var)
     """
-    # Set up environment variables for LangSmith
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
-    
+    # LangChain's own per-call tracing (LANGCHAIN_TRACING_V2) is left as
+    # configured; spans are normally exported sampled and batched by
+    # app/tracing.py instead. Safe to call more than once.
+    if tracer.enabled and os.getenv("LANGCHAIN_TRACING_V2", "").lower() == "true":
+        print(
+            "Warning: LANGCHAIN_TRACING_V2=true traces every LLM call unsampled, on top of the "
+            "sampled TRACE_EXPORTER spans. Unset it unless you want both."
+        )
+
     # Use provided values or fall back to environment variables
     if project_name or os.getenv("LANGCHAIN_PROJECT"):
         os.environ["LANGCHAIN_PROJECT"] = project_name or os.getenv("LANGCHAIN_PROJECT", "fastapi-chat-app")
@@ -44,8 +52,10 @@ def get_langsmith_status() -> dict:
         Dictionary with LangSmith configuration details
     """
     return {
-        "tracing_enabled": os.getenv("LANGCHAIN_TRACING_V2") == "true",
+        "tracing_enabled": tracer.enabled,
+        "langchain_tracing_v2": os.getenv("LANGCHAIN_TRACING_V2") == "true",
         "project_name": os.getenv("LANGCHAIN_PROJECT"),
         "api_key_configured": bool(os.getenv("LANGCHAIN_API_KEY")),
         "endpoint": os.getenv("LANGCHAIN_ENDPOINT"),
+        "export": tracer.stats(),
     } 
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+llm_metrics.py  ──  LangChain callback feeding /metrics
+
+Attached to the shared model by chat_pipeline.get_llm(); kept in its own
+module so LangChain is only imported once a model is actually created.
+"""
+
+from __future__ import annotations
+import time
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from .metrics import LLM_IN_FLIGHT, LLM_TOKENS, STAGE_ERRORS, STAGE_SECONDS
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Feeds /metrics: in-flight calls, per-call latency and token usage."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._started: dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs) -> None:
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs) -> None:
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        if self._finish(run_id):
+            input_tokens, output_tokens = _token_usage(response)
+            if input_tokens:
+                LLM_TOKENS.inc(input_tokens, direction="input")
+            if output_tokens:
+                LLM_TOKENS.inc(output_tokens, direction="output")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        if self._finish(run_id):
+            STAGE_ERRORS.inc(stage="llm")
+
+    def _start(self, run_id: UUID) -> None:
+        self._started[run_id] = time.perf_counter()
+        LLM_IN_FLIGHT.inc()
+
+    def _finish(self, run_id: UUID) -> bool:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return False
+        LLM_IN_FLIGHT.dec()
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm")
+        return True
+
+
+def _token_usage(response) -> tuple[int, int]:
+    """(input, output) tokens from an LLMResult, whichever way the provider reports them."""
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            input_tokens += usage.get("input_tokens", 0)
+            output_tokens += usage.get("output_tokens", 0)
+    if not (input_tokens or output_tokens):
+        usage = (response.llm_output or {}).get("usage_metadata") or {}
+        input_tokens = usage.get("prompt_token_count", 0)
+        output_tokens = usage.get("candidates_token_count", 0)
+    return input_tokens, output_tokens
@@ -0,0 +1,323 @@
+"""
+llm_router.py  ──  Deadlines, retries, hedging and fallback for model calls
+
+Every model call goes through llm_router.call() with the models to use, in
+order: the primary first, then the fallbacks.
+
+For each model, the router retries transient errors (rate limits, 5xx,
+connection errors, timeouts) up to LLM_MAX_RETRIES times. Retries wait a
+jittered exponential backoff. When retries are used up, or the error is not
+transient, it moves on to the next model.
+
+Each attempt is hedged. If the model has not answered within its recent
+LLM_HEDGE_PERCENTILE latency, a duplicate request is sent to the same model
+and the first answer wins. Everything is bound by one deadline per request:
+LLM_DEADLINE, or a tighter one set with `with deadline_scope(seconds):`.
+Once the deadline passes, LLMDeadlineExceeded (a TimeoutError) is raised.
+
+Latencies are tracked per model and per kind of call ("call" for whole
+answers, "stream" for time to first chunk), over a sliding window. Those
+numbers drive the hedging threshold and are reported by stats().
+
+Standard library only, so it can be exercised with any awaitable stand-in
+for a model; the LangChain adapter is routed_chat_model.RoutedChatModel.
+
+Functions you'll use elsewhere:
+    • await llm_router.call(["primary", "fallback"], lambda name: ..., kind="call")
+    • with deadline_scope(10): ...   → tighter deadline for calls inside
+    • llm_router.stats()
+"""
+
+from __future__ import annotations
+import asyncio
+import contextvars
+import math
+import os
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+# Comma-separated models tried in order once the primary gives up
+LLM_FALLBACK_MODELS = [m.strip() for m in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if m.strip()]
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", os.getenv("LLM_TIMEOUT", "60")))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.25"))     # seconds, doubled per retry
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))  # 0 disables hedging
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.2"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "500"))
+
+_TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_TRANSIENT_NAMES = {
+    "ResourceExhausted", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded",
+    "TooManyRequests", "GatewayTimeout", "BadGateway", "Aborted",
+    "ConnectError", "ConnectTimeout", "ReadTimeout", "ReadError", "RemoteProtocolError",
+}
+
+# Absolute loop time by which the current request must have its answer
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_deadline", default=None)
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """No model answered before the request's deadline."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Model calls inside must finish within *seconds* (None keeps the outer deadline)."""
+    if seconds is None:
+        yield
+        return
+    new = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(new if outer is None else min(outer, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int) and status in _TRANSIENT_STATUS:
+        return True
+    return any(cls.__name__ in _TRANSIENT_NAMES for cls in type(error).__mro__)
+
+
+class LatencyTracker:
+    """Latencies of recent successful calls, for percentiles."""
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class LLMRouter:
+    def __init__(
+        self,
+        deadline: float = LLM_DEADLINE,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff: float = LLM_RETRY_BACKOFF,
+        hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        hedge_min_delay: float = LLM_HEDGE_MIN_DELAY,
+    ):
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self._latency: Dict[Tuple[str, str], LatencyTracker] = {}
+        self._models: Dict[str, Dict[str, int]] = {}
+        self._counters = {"calls": 0, "fallbacks": 0, "deadline_exceeded": 0, "failed": 0}
+
+    # ── API ────────────────────────────────────────────────────────────────
+    async def call(
+        self,
+        models: Sequence[str],
+        attempt: Callable[[str], Awaitable[T]],
+        kind: str = "call",
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> T:
+        """
+        Run ``attempt(model_name)`` under the retry / hedge / fallback policy
+        and return the first successful result. Results of attempts that
+        succeeded but lost a hedge race are passed to *discard* (e.g. to close
+        a stream).
+        """
+        self._counters["calls"] += 1
+        end = self._end()
+        last_error: Optional[BaseException] = None
+        for index, name in enumerate(models):
+            if index:
+                self._counters["fallbacks"] += 1
+            for retry in range(self.max_retries + 1):
+                if time.monotonic() >= end:
+                    self._counters["deadline_exceeded"] += 1
+                    raise LLMDeadlineExceeded(f"No model answered within the deadline ({last_error})")
+                try:
+                    return await self._hedged(name, attempt, kind, end, discard)
+                except LLMDeadlineExceeded:
+                    self._counters["deadline_exceeded"] += 1
+                    raise
+                except Exception as e:
+                    last_error = e
+                    if not is_transient(e) or retry == self.max_retries:
+                        break
+                    self._stat(name, "retries")
+                    await asyncio.sleep(min(self._backoff(retry), max(0.0, end - time.monotonic())))
+        self._counters["failed"] += 1
+        raise last_error if last_error is not None else RuntimeError("No models configured")
+
+    def call_sync(self, models: Sequence[str], attempt: Callable[[str], T], kind: str = "call") -> T:
+        """Blocking variant for sync callers: retries and fallback, no hedging."""
+        self._counters["calls"] += 1
+        end = self._end()
+        last_error: Optional[BaseException] = None
+        for index, name in enumerate(models):
+            if index:
+                self._counters["fallbacks"] += 1
+            for retry in range(self.max_retries + 1):
+                if time.monotonic() >= end:
+                    self._counters["deadline_exceeded"] += 1
+                    raise LLMDeadlineExceeded(f"No model answered within the deadline ({last_error})")
+                started = time.monotonic()
+                try:
+                    result = attempt(name)
+                except Exception as e:
+                    self._stat(name, "errors")
+                    last_error = e
+                    if not is_transient(e) or retry == self.max_retries:
+                        break
+                    self._stat(name, "retries")
+                    time.sleep(min(self._backoff(retry), max(0.0, end - time.monotonic())))
+                    continue
+                self._tracker(name, kind).observe(time.monotonic() - started)
+                self._stat(name, "successes")
+                return result
+        self._counters["failed"] += 1
+        raise last_error if last_error is not None else RuntimeError("No models configured")
+
+    def hedge_delay(self, name: str, kind: str = "call") -> Optional[float]:
+        """Seconds after which a duplicate is sent, or None while there is too little data."""
+        tracker = self._latency.get((name, kind))
+        if self.hedge_percentile <= 0 or tracker is None or len(tracker) < self.hedge_min_samples:
+            return None
+        return max(tracker.percentile(self.hedge_percentile), self.hedge_min_delay)
+
+    def stats(self) -> dict:
+        latency: Dict[str, dict] = {}
+        for (name, kind), tracker in self._latency.items():
+            delay = self.hedge_delay(name, kind)
+            latency.setdefault(name, {})[kind] = {
+                "count": tracker.count,
+                **{f"p{p}_ms": round(tracker.percentile(p) * 1000, 1) for p in (50, 95, 99)},
+                "hedge_after_ms": round(delay * 1000, 1) if delay is not None else None,
+            }
+        return {
+            "deadline_seconds": self.deadline,
+            "max_retries": self.max_retries,
+            "hedge_percentile": self.hedge_percentile,
+            **self._counters,
+            "models": {name: {**counts, "latency": latency.get(name, {})} for name, counts in self._models.items()},
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _end(self) -> float:
+        end = time.monotonic() + self.deadline
+        scoped = _deadline.get()
+        return end if scoped is None else min(end, scoped)
+
+    def _backoff(self, retry: int) -> float:
+        # "Full jitter": spreads retries from many requests over the window
+        return random.uniform(0, self.backoff * (2 ** retry))
+
+    def _tracker(self, name: str, kind: str) -> LatencyTracker:
+        tracker = self._latency.get((name, kind))
+        if tracker is None:
+            tracker = self._latency[(name, kind)] = LatencyTracker()
+        return tracker
+
+    def _stat(self, name: str, counter: str) -> None:
+        counts = self._models.get(name)
+        if counts is None:
+            counts = self._models[name] = {
+                "successes": 0, "errors": 0, "retries": 0, "hedges": 0, "hedge_wins": 0
+            }
+        counts[counter] += 1
+
+    async def _timed(self, name: str, attempt: Callable[[str], Awaitable[T]], kind: str) -> T:
+        started = time.monotonic()
+        try:
+            result = await attempt(name)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._stat(name, "errors")
+            raise
+        self._tracker(name, kind).observe(time.monotonic() - started)
+        self._stat(name, "successes")
+        return result
+
+    async def _hedged(
+        self,
+        name: str,
+        attempt: Callable[[str], Awaitable[T]],
+        kind: str,
+        end: float,
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> T:
+        delay = self.hedge_delay(name, kind)
+        hedge_at = time.monotonic() + delay if delay is not None else None
+        first = asyncio.ensure_future(self._timed(name, attempt, kind))
+        pending = {first}
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                now = time.monotonic()
+                wake = end if hedge_at is None else min(end, hedge_at)
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, wake - now), return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded = [t for t in done if t.exception() is None]
+                if succeeded:
+                    winner = first if first in succeeded else succeeded[0]
+                    if winner is not first:
+                        self._stat(name, "hedge_wins")
+                    # Original and hedge can finish in the same wake-up
+                    await self._discard([t.result() for t in succeeded if t is not winner], discard)
+                    return winner.result()
+                for task in done:
+                    last_error = task.exception()
+                if done:
+                    continue
+                if hedge_at is not None and time.monotonic() >= hedge_at and time.monotonic() < end:
+                    # Slower than usual: race a duplicate against the original
+                    self._stat(name, "hedges")
+                    pending.add(asyncio.ensure_future(self._timed(name, attempt, kind)))
+                    hedge_at = None
+                elif time.monotonic() >= end:
+                    raise LLMDeadlineExceeded(f"{name} did not answer within the deadline")
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                results = await asyncio.gather(*pending, return_exceptions=True)
+                # A task may have finished before the cancel reached it
+                await self._discard([r for r in results if not isinstance(r, BaseException)], discard)
+
+    @staticmethod
+    async def _discard(results: list, discard: Optional[Callable[[T], Awaitable[None]]]) -> None:
+        if discard is None:
+            return
+        for result in results:
+            try:
+                await discard(result)
+            except Exception as e:
+                print(f"Error discarding a losing LLM result: {e}")
+
+
+# singleton shared by every routed model in the app
+llm_router = LLMRouter()
@@ -1,5 +1,13 @@
+# Imported first so cold-start timings cover everything below, see /startup
+from .startup import startup, STARTUP_IMPORT_PROFILE
+if STARTUP_IMPORT_PROFILE:
+    startup.install_import_profiler(__package__)
+
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 import os
 from pathlib import Path
@@ -11,16 +19,101 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(os.path.join(BASE_DIR, '.env'))
 
 # Import routers AFTER loading environment variables to ensure they can access them
-from .routers import user, resume, session
+from .routers import user, resume, session, debug
 from .langsmith_config import get_langsmith_status, setup_langsmith_tracing
+from .pdf_fetcher import pdf_fetcher
+from .pdf_extractor import pdf_extractor
+from .session_manager import session_manager
+from .parse_jobs import parse_jobs
+from .admission import admission
+from .llm_router import llm_router
+from .resume_store import RESUME_STORE_CREATE_SCHEMA, resume_store
+from .conversation_store import conversation_store
+from .database import check_database, dispose_engine
+from .chat_pipeline import preload as preload_llm
+from .metrics import MetricsMiddleware, render as render_metrics
+from .tracing import TraceSamplingMiddleware, tracer
+from .profiling import ProfilingMiddleware, profiler, watchdog
 
 # Initialize LangSmith tracing
 setup_langsmith_tracing()
 
+
+# Load LangChain/Gemini and open a DB connection in the background after boot
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+# /ready stays 503 while any of these startup phases failed; session prefetch is best-effort
+READY_REQUIRE_WARMUP_SUCCESS = os.getenv("READY_REQUIRE_WARMUP_SUCCESS", "true").lower() == "true"
+READY_REQUIRED_PHASES = ("warmup_llm", "warmup_db", "resume_schema")
+
+
+async def warm_up(prefetch_ids: list) -> None:
+    """Background warm-up; /ready reports ready once it has finished."""
+    steps = []
+    if WARMUP_ON_STARTUP:
+        steps += [
+            ("warmup_llm", lambda: asyncio.to_thread(preload_llm)),
+            ("warmup_db", check_database),
+        ]
+    if prefetch_ids:
+        steps.append(("session_prefetch", lambda: session_manager.prefetch(prefetch_ids)))
+    for phase, step in steps:
+        try:
+            with startup.timed(phase):
+                result = await step()
+            if phase == "session_prefetch":
+                print(f"Prefetched {result}/{len(prefetch_ids)} sessions")
+        except Exception as e:
+            # Components still initialise lazily on first use
+            print(f"Warm-up step {phase} failed: {e}")
+    startup.mark_ready()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+    profiler.install(loop)
+    watchdog.start(loop)
+    parse_jobs.start()
+    tracer.start()
+    if RESUME_STORE_CREATE_SCHEMA:
+        # Once, before any write: a schema problem is reported here, not per flush
+        try:
+            with startup.timed("resume_schema"):
+                await resume_store.ensure_schema()
+        except Exception as e:
+            print(f"Resume store schema setup failed: {e}")
+    resume_store.start()
+    conversation_store.start()
+    # Optionally warm sessions for known users, e.g. SESSION_PREFETCH_IDS=12,15,42
+    prefetch_ids = [i.strip() for i in os.getenv("SESSION_PREFETCH_IDS", "").split(",") if i.strip()]
+    warmup_task = None
+    if WARMUP_ON_STARTUP or prefetch_ids:
+        warmup_task = asyncio.create_task(warm_up(prefetch_ids))
+    else:
+        startup.mark_ready()
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    await parse_jobs.stop()
+    # Write parsed resumes still buffered (after the jobs that produce them stop)
+    await resume_store.drain()
+    await conversation_store.drain()
+    # Export spans still queued
+    await tracer.stop()
+    # Release pooled keep-alive connections held by the shared PDF client
+    await pdf_fetcher.aclose()
+    pdf_extractor.shutdown()
+    await session_manager.aclose()
+    await dispose_engine()
+    watchdog.stop()
+
+
 app = FastAPI(
     title="FastAPI Backend",
     description="A FastAPI-based backend application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -32,10 +125,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request trace sampling decision, see app/tracing.py
+app.add_middleware(TraceSamplingMiddleware)
+# Per-route latency histograms for /metrics
+app.add_middleware(MetricsMiddleware)
+# Opt-in request profiles (X-Profile + API key, or POST /debug/profile), see app/profiling.py
+app.add_middleware(ProfilingMiddleware, api_key=resume.API_KEY)
+
 # Include routers
 app.include_router(user.router)
 app.include_router(resume.router)
 app.include_router(session.router)
+app.include_router(debug.router)
 
 @app.get("/")
 async def root():
@@ -47,16 +148,47 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and serving requests."""
     return {
         "status": "healthy",
         "version": "1.0.0"
     } 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: startup (and warm-up, if enabled) has finished without a required step failing."""
+    failed = [p for p in READY_REQUIRED_PHASES if p in startup.errors] if READY_REQUIRE_WARMUP_SUCCESS else []
+    ready = startup.ready and not failed
+    body = {"ready": ready, "warmup": WARMUP_ON_STARTUP, "failed": failed, "errors": startup.errors}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/startup", include_in_schema=False)
+async def startup_report():
+    """Cold-start breakdown: app import time, lazy inits, warm-up and (if profiled) imports."""
+    return startup.report()
+
 @app.get("/langsmith/status")
 async def langsmith_status():
     """Get LangSmith monitoring configuration and status."""
     return {
         "langsmith": get_langsmith_status(),
         "message": "LangSmith monitoring status"
-    } 
+    }
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Per-model latency percentiles, hedges, retries and fallbacks."""
+    return llm_router.stats()
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """LLM slot usage, queue depth per priority and rejection counts."""
+    return admission.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 
+startup.mark_app_loaded()
@@ -0,0 +1,209 @@
+"""
+metadata_extractor.py  ──  Rule-based resume metadata, no LLM involved
+
+Pulls name, email, phone, address and skills out of extracted resume text
+with regexes and a skills dictionary, and scores each field 0-1. The parse
+pipeline only asks the model for fields scoring below the threshold.
+
+Functions you'll use elsewhere:
+    • extract_local(text) → LocalMetadata(fields, confidence)
+    • lm.unresolved()      → field names the LLM still has to fill
+"""
+
+from __future__ import annotations
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+METADATA_LOCAL_THRESHOLD = float(os.getenv("METADATA_LOCAL_THRESHOLD", "0.7"))
+
+# Field name -> JSON type shown to the model
+METADATA_FIELDS: Dict[str, str] = {
+    "name": "string",
+    "email": "string",
+    "phone": "string",
+    "address": "string",
+    "skills": "string[]",
+}
+
+_EMAIL = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}")
+_PHONE = re.compile(r"(?<![\w/(])(\+?\(?\d[\d\s().\-]{7,}\d)(?![\w/])")
+_NAME_WORD = re.compile(r"^[A-Z][a-zA-Z'\-]+\.?$|^[A-Z]{2,}$")
+_NOT_A_NAME = re.compile(
+    r"\b(resume|curriculum|vitae|cv|profile|summary|objective|contact|page|email|phone)\b", re.I
+)
+# A house number (optionally "Unit 4," or "4/"), at most three name words, then
+# the street type. Anchored to the start of a contact-line part, so prose like
+# "3 years on the Pacific Highway project" is not an address.
+_STREET = re.compile(
+    r"^(?:address\s*:\s*)?(?:unit\s+\d+[a-z]?\s*,?\s*|\d+[a-z]?\s*/\s*)?\d{1,5}[a-z]?\s+"
+    r"(?:[a-z][\w.'\-]*\s+){1,3}(street|st|road|rd|avenue|ave|lane|ln|drive|dr|"
+    r"boulevard|blvd|court|ct|place|pl|parade|pde|highway|hwy|way|terrace|crescent|cres)\b\.?",
+    re.I,
+)
+_CITY_STATE_POSTCODE = re.compile(
+    r"\b[A-Z][a-zA-Z .'\-]+,?\s+(NSW|VIC|QLD|WA|SA|TAS|ACT|NT|[A-Z]{2})\s*,?\s*\d{4,5}\b"
+)
+# "Skills" on its own line, or "Skills: Java, Python" with the list inline
+_SKILLS_HEADING = re.compile(
+    r"^\s*(?:technical\s+|key\s+|core\s+)?(?:skills|technologies|tech stack|competencies)\b"
+    r"[ \t]*[:\-–]?[ \t]*(?P<inline>.*)$",
+    re.I | re.M,
+)
+_LIST_SEPARATOR = re.compile(r"\s*[,;|•·]\s*")
+_NEXT_HEADING = re.compile(
+    r"^\s*(experience|work experience|employment|education|projects|certifications|"
+    r"languages|interests|references|awards|publications)\b",
+    re.I | re.M,
+)
+
+SKILLS_DICTIONARY = (
+    "Python", "Java", "JavaScript", "TypeScript", "C", "C++", "C#", "Go", "Rust", "Ruby", "PHP",
+    "Swift", "Kotlin", "Scala", "R", "MATLAB", "SQL", "NoSQL", "Bash", "Shell", "Perl", "Dart",
+    "HTML", "CSS", "Sass", "React", "React Native", "Angular", "Vue", "Next.js", "Node.js",
+    "Express", "Django", "Flask", "FastAPI", "Spring", "Spring Boot", ".NET", "ASP.NET",
+    "Laravel", "Rails", "Flutter", "jQuery", "Redux", "GraphQL", "REST", "gRPC",
+    "PostgreSQL", "MySQL", "SQLite", "MongoDB", "Redis", "Elasticsearch", "Cassandra",
+    "DynamoDB", "Oracle", "SQL Server", "Firebase", "Snowflake", "BigQuery",
+    "AWS", "Azure", "GCP", "Google Cloud", "Docker", "Kubernetes", "Terraform", "Ansible",
+    "Jenkins", "GitHub Actions", "CI/CD", "Linux", "Git", "Nginx", "Kafka", "RabbitMQ",
+    "Spark", "Hadoop", "Airflow", "dbt", "Pandas", "NumPy", "SciPy", "scikit-learn",
+    "TensorFlow", "PyTorch", "Keras", "LangChain", "OpenAI", "NLP", "Machine Learning",
+    "Deep Learning", "Computer Vision", "Data Analysis", "Data Science", "Statistics",
+    "Tableau", "Power BI", "Excel", "Looker", "Figma", "Photoshop", "Illustrator", "UX", "UI",
+    "Agile", "Scrum", "Kanban", "Jira", "Confluence", "Project Management", "Microservices",
+    "Unit Testing", "Selenium", "Cypress", "Jest", "Pytest", "Salesforce", "SAP",
+    "Communication", "Leadership", "Teamwork", "Problem Solving", "Customer Service",
+    "Sales", "Marketing", "SEO", "Accounting", "Bookkeeping", "Xero", "MYOB",
+)
+# Single letters / very common words only count inside an explicit skills section
+_AMBIGUOUS_SKILLS = frozenset({"C", "R", "Go", "UI", "UX", "REST", "Spring", "Express", "Sales"})
+_SKILL_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    (skill, re.compile(r"(?<![\w+#.])" + re.escape(skill) + r"(?![\w+#])", re.I))
+    for skill in SKILLS_DICTIONARY
+]
+
+
+@dataclass
+class LocalMetadata:
+    fields: Dict[str, object] = field(default_factory=dict)
+    confidence: Dict[str, float] = field(default_factory=dict)
+
+    def unresolved(self, threshold: float = METADATA_LOCAL_THRESHOLD) -> List[str]:
+        return [f for f in METADATA_FIELDS if self.confidence.get(f, 0.0) < threshold]
+
+    def resolved(self, threshold: float = METADATA_LOCAL_THRESHOLD) -> Dict[str, object]:
+        return {f: v for f, v in self.fields.items() if self.confidence.get(f, 0.0) >= threshold}
+
+
+def _email(text: str) -> Tuple[Optional[str], float]:
+    found = list(dict.fromkeys(m.lower() for m in _EMAIL.findall(text)))
+    if not found:
+        return None, 0.0
+    return found[0], 0.95 if len(found) == 1 else 0.8
+
+
+def _phone(text: str) -> Tuple[Optional[str], float]:
+    candidates = []
+    for m in _PHONE.finditer(text):
+        raw = m.group(1).strip()
+        digits = re.sub(r"\D", "", raw)
+        # Skip date ranges like 2019 - 2021 and other long numbers
+        if not 8 <= len(digits) <= 15 or re.fullmatch(r"(19|20)\d{2}\D+(19|20)\d{2}", raw):
+            continue
+        # A half-captured "(02)" means the match is not a phone number as written
+        if raw.count("(") != raw.count(")"):
+            continue
+        candidates.append(" ".join(raw.split()))
+    if not candidates:
+        return None, 0.0
+    unique = list(dict.fromkeys(candidates))
+    return unique[0], 0.9 if len(unique) == 1 else 0.75
+
+
+def _name(lines: List[str], email: Optional[str]) -> Tuple[Optional[str], float]:
+    for line in lines[:6]:
+        candidate = line.strip().strip("|,").strip()
+        words = candidate.split()
+        if not 2 <= len(words) <= 4 or _NOT_A_NAME.search(candidate):
+            continue
+        if not all(_NAME_WORD.match(w) for w in words):
+            continue
+        name = " ".join(w if not w.isupper() else w.capitalize() for w in words)
+        local_part = (email or "").split("@")[0].lower()
+        if local_part and any(w.lower().strip(".") in local_part for w in words):
+            return name, 0.95
+        return name, 0.8
+    return None, 0.0
+
+
+def _address(lines: List[str]) -> Tuple[Optional[str], float]:
+    for line in lines[:15]:
+        # Contact lines are often "email | phone | address"
+        for part in re.split(r"[|•·]", line):
+            part = part.strip(" ,")
+            if _EMAIL.search(part) or _PHONE.fullmatch(part):
+                continue
+            city = _CITY_STATE_POSTCODE.search(part)
+            if _STREET.match(part):
+                # A street alone is a guess; with a state and postcode it is an address
+                return part, 0.85 if city else 0.6
+            if city:
+                return city.group(0).strip(), 0.6
+    return None, 0.0
+
+
+def _skills(text: str) -> Tuple[List[str], float]:
+    section = ""
+    listed: List[str] = []
+    heading = _SKILLS_HEADING.search(text)
+    if heading:
+        inline = heading.group("inline").strip()
+        rest = text[heading.end():]
+        nxt = _NEXT_HEADING.search(rest)
+        section = inline + "\n" + (rest[: nxt.start()] if nxt else rest[:1500])
+        # An inline list is explicit: keep its items even when not in the dictionary
+        if _LIST_SEPARATOR.search(inline):
+            items = (item.strip(" .") for item in _LIST_SEPARATOR.split(inline))
+            listed = [item for item in items if item and len(item.split()) <= 4]
+
+    found: List[str] = []
+    for skill, pattern in _SKILL_PATTERNS:
+        in_section = bool(section) and pattern.search(section) is not None
+        if in_section or (skill not in _AMBIGUOUS_SKILLS and pattern.search(text)):
+            found.append(skill)
+    known = {s.lower() for s in found}
+    found += [item for item in dict.fromkeys(listed) if item.lower() not in known]
+
+    if len(found) >= 3 and section:
+        return found, 0.9
+    # Dictionary hits anywhere in the text: likely, but let the model confirm
+    return found, 0.6 if len(found) >= 3 else 0.3 if found else 0.0
+
+
+def extract_local(text: str) -> LocalMetadata:
+    lines = [line for line in text.splitlines() if line.strip()]
+    result = LocalMetadata()
+
+    email, result.confidence["email"] = _email(text)
+    phone, result.confidence["phone"] = _phone(text)
+    name, result.confidence["name"] = _name(lines, email)
+    address, result.confidence["address"] = _address(lines)
+    skills, result.confidence["skills"] = _skills(text)
+
+    for key, value in (("name", name), ("email", email), ("phone", phone), ("address", address)):
+        if value is not None:
+            result.fields[key] = value
+    result.fields["skills"] = skills
+    return result
+
+
+def metadata_question(fields: List[str]) -> str:
+    """The JSON-filling instruction for just *fields* (all of them by default)."""
+    body = ",\n".join(f'        "{f}": {METADATA_FIELDS[f]}' for f in fields)
+    return (
+        "\n    Fill this JSON with the information in the resume.\n"
+        "    {\n" + body + ",\n    }\n"
+        "    Return the JSON only. No other text.\n"
+    )
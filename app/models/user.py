@@ -51,4 +51,13 @@ class User(UserBase):
     created_at: datetime = Field(..., description="Timestamp when the user was created")
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class UserFields(BaseModel):
+    """A user with only the fields picked with ``?fields=`` (the id is always there)."""
+    id: int
+    email: Optional[str] = None
+    username: Optional[str] = None
+    full_name: Optional[str] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
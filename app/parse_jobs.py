@@ -0,0 +1,159 @@
+"""
+parse_jobs.py  ──  Background resume-parse jobs with status polling
+
+POST /resume/parse/jobs enqueues a job and returns 202 straight away; a fixed
+pool of worker tasks drains the bounded queue through
+resume_pipeline.parse_one, which creates the session and sets its metadata
+when the job completes.
+
+Functions you'll use elsewhere:
+    • parse_jobs.submit(file_name) → ParseJob (raises JobQueueFull)
+    • parse_jobs.get(job_id)       → ParseJob | None
+    • parse_jobs.start() / await parse_jobs.stop()
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .resume_pipeline import ParseError, parse_one
+
+PARSE_JOB_WORKERS = int(os.getenv("PARSE_JOB_WORKERS", "4"))
+PARSE_JOB_QUEUE_SIZE = int(os.getenv("PARSE_JOB_QUEUE_SIZE", "100"))
+PARSE_JOB_RETENTION = float(os.getenv("PARSE_JOB_RETENTION", "3600"))   # seconds after finishing
+PARSE_JOB_MAX_RETAINED = 10_000
+
+STAGES = ("queued", "fetch", "extract", "metadata", "done")
+
+
+class JobQueueFull(Exception):
+    """The job queue is at capacity; the client should retry later."""
+
+
+@dataclass
+class ParseJob:
+    id: str
+    file_name: str
+    status: str = "queued"            # queued | running | succeeded | failed
+    stage: str = "queued"             # one of STAGES
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[dict] = None
+
+    def set_stage(self, stage: str) -> None:
+        self.stage = stage
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "fileName": self.file_name,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(STAGES.index(self.stage) / (len(STAGES) - 1), 2),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class ParseJobManager:
+    def __init__(
+        self,
+        workers: int = PARSE_JOB_WORKERS,
+        queue_size: int = PARSE_JOB_QUEUE_SIZE,
+        retention: float = PARSE_JOB_RETENTION,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retention = retention
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, ParseJob]" = OrderedDict()
+
+    # ── lifecycle ──────────────────────────────────────────────────────────
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ── API ────────────────────────────────────────────────────────────────
+    def submit(self, file_name: str) -> ParseJob:
+        if self._queue is None:
+            self.start()
+        self._prune()
+        job = ParseJob(id=uuid.uuid4().hex, file_name=file_name)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Parse queue is full ({self.queue_size} jobs waiting)")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[ParseJob]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        by_status: dict = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "jobs": by_status,
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                # The model call waits for an LLM slot behind requests (background_slot)
+                job.result = await parse_one(job.file_name, on_stage=job.set_stage)
+                job.status = "succeeded"
+                job.stage = "done"
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = {"status_code": 503, "detail": "Server shutting down"}
+                raise
+            except ParseError as e:
+                job.status = "failed"
+                job.error = {"status_code": e.status_code, "detail": e.detail}
+            except Exception as e:
+                job.status = "failed"
+                job.error = {"status_code": 500, "detail": str(e)}
+            finally:
+                # A failed job keeps the stage it failed in (and its progress)
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            if job.finished_at is not None and (
+                job.finished_at < cutoff or len(self._jobs) > PARSE_JOB_MAX_RETAINED
+            ):
+                del self._jobs[job_id]
+
+
+# singleton used by the FastAPI app
+parse_jobs = ParseJobManager()
@@ -0,0 +1,191 @@
+"""
+pdf_extractor.py  ──  Off-loop PDF text extraction on a process pool
+
+Functions you'll use elsewhere:
+    • await pdf_extractor.extract(path) → ExtractionResult (text + page stats)
+    • pdf_extractor.shutdown()          → stop the worker processes
+"""
+
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+# pypdf is only needed inside the worker processes
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_EXTRACT_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "20"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+
+
+class PdfExtractError(Exception):
+    """The document could not be opened or read."""
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    page_count: int
+    pages_extracted: int
+    truncated: bool        # True when the page or time limit cut extraction short
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Worker-side functions (run in the pool, must stay module-level/picklable)
+# ────────────────────────────────────────────────────────────────────────────
+def _extract_pages(reader: PdfReader, start: int, stop: int, deadline: float) -> Tuple[List[str], bool]:
+    texts: List[str] = []
+    for i in range(start, stop):
+        if time.time() > deadline:
+            return texts, True
+        texts.append(reader.pages[i].extract_text() or "")
+    return texts, False
+
+
+# Workers get the file path, not the bytes: each opens the file itself and
+# pypdf reads only the objects the requested pages need from disk.
+def _extract_head(path: str, max_pages: int, head_pages: int, deadline: float) -> Tuple[int, List[str], bool]:
+    """Count the pages and extract the first chunk in a single parse."""
+    from pypdf import PdfReader
+
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        page_count = len(reader.pages)
+        stop = min(page_count, max_pages, head_pages)
+        texts, cut = _extract_pages(reader, 0, stop, deadline)
+    return page_count, texts, cut
+
+
+def _extract_range(path: str, start: int, stop: int, deadline: float) -> Tuple[List[str], bool]:
+    from pypdf import PdfReader
+
+    with open(path, "rb") as f:
+        return _extract_pages(PdfReader(f), start, stop, deadline)
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Event-loop side
+# ────────────────────────────────────────────────────────────────────────────
+def _terminate(processes) -> None:
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+class PdfExtractor:
+    """Spread a document's pages across worker processes."""
+
+    def __init__(
+        self,
+        workers: int = PDF_WORKERS,
+        max_pages: int = PDF_MAX_PAGES,
+        timeout: float = PDF_EXTRACT_TIMEOUT,
+        pages_per_task: int = PDF_PAGES_PER_TASK,
+    ):
+        self.workers = max(1, workers)
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.pages_per_task = max(1, pages_per_task)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    # ── API ────────────────────────────────────────────────────────────────
+    async def extract(self, path: str) -> ExtractionResult:
+        try:
+            return await self._extract(path)
+        except BrokenProcessPool as e:
+            # A worker died (OOM, segfault in a malformed PDF) -- start over next time
+            self.shutdown()
+            raise PdfExtractError(f"PDF worker pool crashed: {e}") from e
+        except PdfExtractError:
+            raise
+        except asyncio.TimeoutError as e:
+            self._recycle()
+            raise PdfExtractError("Timed out opening PDF") from e
+        except Exception as e:
+            raise PdfExtractError(f"Could not read PDF: {e}") from e
+
+    async def _extract(self, path: str) -> ExtractionResult:
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        deadline = time.time() + self.timeout
+
+        page_count, texts, truncated = await asyncio.wait_for(
+            loop.run_in_executor(
+                pool, _extract_head, path, self.max_pages, self.pages_per_task, deadline
+            ),
+            self.timeout,
+        )
+        limit = min(page_count, self.max_pages)
+        truncated = truncated or page_count > self.max_pages
+
+        if not truncated and len(texts) < limit:
+            futures = [
+                loop.run_in_executor(
+                    pool, _extract_range, path, start, min(start + self.pages_per_task, limit), deadline
+                )
+                for start in range(len(texts), limit, self.pages_per_task)
+            ]
+            # Workers stop on their own at the deadline; the small grace covers IPC.
+            await asyncio.wait(futures, timeout=max(0.0, deadline - time.time()) + 0.5)
+            if not all(fut.done() for fut in futures):
+                self._recycle()
+            for fut in futures:
+                if not fut.done() or fut.exception() is not None:
+                    truncated = True
+                    break
+                chunk, cut = fut.result()
+                texts.extend(chunk)
+                if cut:
+                    truncated = True
+                    break
+            for fut in futures:
+                fut.cancel()
+
+        return ExtractionResult(
+            text="".join(texts),
+            page_count=page_count,
+            pages_extracted=len(texts),
+            truncated=truncated,
+        )
+
+    def _recycle(self) -> None:
+        """
+        Replace the pool after a task overran its deadline. The deadline is only
+        checked between pages, so a worker stuck inside one never frees up and
+        cancelling its future does not stop it. The old workers are killed once
+        every document already running on them is past its own deadline.
+        """
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        timer = threading.Timer(self.timeout + 1.0, _terminate, (processes,))
+        timer.daemon = True
+        timer.start()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# singleton used by the FastAPI app
+pdf_extractor = PdfExtractor()
@@ -0,0 +1,187 @@
+"""
+pdf_fetcher.py  ──  Shared, pooled async HTTP client for resume PDFs
+
+Functions you'll use elsewhere:
+    • pdf_fetcher.fetch(url, etag=None) → FetchResult (body spooled to a temp file)
+    • await result.spill()              → path of the body on disk, for worker processes
+    • pdf_fetcher.aclose()              → close pooled connections on shutdown
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from typing import IO, Optional
+
+import httpx
+
+# Where resume PDFs live; override to point at a local stand-in server.
+RESUME_BASE_URL = os.getenv(
+    "RESUME_BASE_URL", "https://bonga-resume.s3.ap-southeast-2.amazonaws.com/resumes"
+).rstrip("/")
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(20 * 1024 * 1024)))
+PDF_SPOOL_BYTES = int(os.getenv("PDF_SPOOL_BYTES", str(1024 * 1024)))
+PDF_FETCH_TIMEOUT = float(os.getenv("PDF_FETCH_TIMEOUT", "30"))
+PDF_MAX_CONNECTIONS = int(os.getenv("PDF_MAX_CONNECTIONS", "20"))
+
+
+class PdfFetchError(Exception):
+    """The PDF could not be downloaded (network error, bad upstream reply)."""
+
+
+class PdfNotFound(PdfFetchError):
+    """Upstream answered with anything other than 200/304."""
+
+
+class PdfTooLarge(PdfFetchError):
+    """The body exceeded the configured maximum size."""
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int
+    etag: Optional[str] = None
+    size: int = 0
+    sha256: Optional[str] = None
+    body: Optional[IO[bytes]] = None
+    path: Optional[str] = field(default=None, repr=False)   # set by spill()
+
+    @property
+    def not_modified(self) -> bool:
+        """True when a conditional GET came back ``304 Not Modified``."""
+        return self.status_code == 304
+
+    def read(self) -> bytes:
+        if self.body is None:
+            return b""
+        self.body.seek(0)
+        return self.body.read()
+
+    async def spill(self) -> str:
+        """Copy the body to a named temp file other processes can open by path.
+
+        The copy streams in chunks off the event loop, so the body is never held
+        in memory as a whole. The file is removed by close().
+        """
+        if self.path is None:
+            self.path = await asyncio.to_thread(self._spill)
+        return self.path
+
+    def _spill(self) -> str:
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as out:
+            if self.body is not None:
+                self.body.seek(0)
+                shutil.copyfileobj(self.body, out)
+        return path
+
+    def close(self) -> None:
+        if self.body is not None:
+            self.body.close()
+            self.body = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+    def __enter__(self) -> "FetchResult":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class PdfFetcher:
+    """One keep-alive connection pool shared for the app's lifetime."""
+
+    def __init__(
+        self,
+        max_bytes: int = PDF_MAX_BYTES,
+        spool_bytes: int = PDF_SPOOL_BYTES,
+        timeout: float = PDF_FETCH_TIMEOUT,
+        max_connections: int = PDF_MAX_CONNECTIONS,
+        chunk_size: int = 64 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.chunk_size = chunk_size
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=30.0,
+                ),
+                follow_redirects=True,
+            )
+        return self._client
+
+    # ── API ────────────────────────────────────────────────────────────────
+    async def fetch(self, url: str, etag: Optional[str] = None) -> FetchResult:
+        """
+        Stream *url* into a spooled temp file (RAM until ``spool_bytes``, then disk).
+
+        If *etag* is given the request is conditional; a ``304`` comes back as a
+        FetchResult with ``not_modified`` set and no body.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        try:
+            async with self._get_client().stream("GET", url, headers=headers) as resp:
+                if resp.status_code == 304:
+                    return FetchResult(url, 304, etag=resp.headers.get("ETag", etag))
+                if resp.status_code != 200:
+                    raise PdfNotFound(f"PDF file not found at {url} (HTTP {resp.status_code})")
+
+                declared = resp.headers.get("Content-Length")
+                if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                    raise PdfTooLarge(f"PDF is {declared} bytes, limit is {self.max_bytes}")
+
+                spool = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+                digest = hashlib.sha256()
+                size = 0
+                try:
+                    async for chunk in resp.aiter_bytes(self.chunk_size):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise PdfTooLarge(f"PDF exceeds the {self.max_bytes} byte limit")
+                        digest.update(chunk)
+                        spool.write(chunk)
+                except BaseException:
+                    spool.close()
+                    raise
+                spool.seek(0)
+                return FetchResult(
+                    url,
+                    200,
+                    etag=resp.headers.get("ETag"),
+                    size=size,
+                    sha256=digest.hexdigest(),
+                    body=spool,
+                )
+        except httpx.HTTPError as e:
+            raise PdfFetchError(f"Failed to fetch PDF: {e}") from e
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def resume_url(file_name: str) -> str:
+    return f"{RESUME_BASE_URL}/{file_name}"
+
+
+# singleton used by the FastAPI app
+pdf_fetcher = PdfFetcher()
@@ -0,0 +1,364 @@
+"""
+profiling.py  ──  On-demand request profiles and an event-loop stall watchdog
+
+Request profiles (opt-in, API key required):
+    A request sent with ``X-Profile: true`` and a valid ``Authorization``
+    header is profiled. So are the next N requests under a path, armed with
+    POST /debug/profile. While such a request runs, a sampler thread
+    records the event-loop thread's stack every PROFILE_INTERVAL seconds.
+    A sample is kept only when the running task belongs to that request:
+    the request's own task, or tasks created while serving it. The
+    response carries ``X-Profile-Id``, and the profile can be fetched from
+    GET /debug/profiles/{id}, as JSON or in collapsed "folded" format for
+    flame graph tools. Work in worker threads or processes is not sampled,
+    only time spent on the loop.
+
+Loop watchdog (always on unless LOOP_WATCHDOG_ENABLED=false):
+    A callback on the loop records a heartbeat every LOOP_WATCHDOG_INTERVAL
+    seconds. A watchdog thread checks it. When the heartbeat is more than
+    LOOP_STALL_THRESHOLD seconds late, something is blocking the loop, and
+    the watchdog records the loop thread's stack at that moment. That stack
+    is the blocking call. The last LOOP_STALLS_KEPT stalls are served at
+    GET /debug/stalls, with the same Prometheus series on /metrics. Cost:
+    one callback and one thread wake-up per interval.
+
+Functions you'll use elsewhere:
+    • profiler.install(loop) / watchdog.start(loop) / watchdog.stop()
+    • ProfilingMiddleware(app, api_key=...)
+    • profiler.arm(path_prefix, count) / profiler.get(id) / watchdog.stalls()
+"""
+
+from __future__ import annotations
+import asyncio
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter, OrderedDict, deque
+from typing import Dict, List, Optional
+
+from .metrics import Counter as MetricCounter, Histogram
+
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))    # seconds between samples
+PROFILES_KEPT = int(os.getenv("PROFILES_KEPT", "20"))
+LOOP_WATCHDOG_ENABLED = os.getenv("LOOP_WATCHDOG_ENABLED", "true").lower() == "true"
+LOOP_WATCHDOG_INTERVAL = float(os.getenv("LOOP_WATCHDOG_INTERVAL", "0.1"))
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.25"))
+LOOP_STALLS_KEPT = int(os.getenv("LOOP_STALLS_KEPT", "50"))
+_MAX_DEPTH = 64
+_REPORT_TOP = 20
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "How late the loop watchdog's heartbeat ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = MetricCounter("event_loop_stalls_total", "Heartbeats later than LOOP_STALL_THRESHOLD")
+
+_ROOTS = sorted({os.getcwd(), sys.prefix, sys.base_prefix, *sys.path}, key=len, reverse=True)
+
+
+def _short(filename: str) -> str:
+    for root in _ROOTS:
+        if root and filename.startswith(root + os.sep):
+            return filename[len(root) + 1:]
+    return filename
+
+
+def fold_stack(frame) -> str:
+    """Outermost-first ``func (file:line);...`` string for *frame*, as flame graph tools expect."""
+    parts: List[str] = []
+    while frame is not None and len(parts) < _MAX_DEPTH:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({_short(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Request profiles
+# ────────────────────────────────────────────────────────────────────────────
+# Set while a profiled request runs; tasks created under it join the profile
+_active: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, interval: float):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self.stacks: Counter = Counter()
+        self.outside = 0   # samples where the loop was busy elsewhere or idle
+
+    def to_dict(self) -> dict:
+        leaves: Counter = Counter()
+        for stack, n in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+        samples = sum(self.stacks.values())
+        # The sampler wakes less often than asked while the loop holds the GIL;
+        # spread the measured duration over the samples actually taken
+        taken = samples + self.outside
+        ms = self.duration * 1000 / taken if self.duration and taken else self.interval * 1000
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 1) if self.duration is not None else None,
+            "interval_ms": self.interval * 1000,
+            "samples": samples,
+            "samples_outside_request": self.outside,
+            "top_stacks": [
+                {"stack": s.split(";"), "samples": n, "approx_ms": round(n * ms, 1)}
+                for s, n in self.stacks.most_common(_REPORT_TOP)
+            ],
+            "top_functions": [
+                {"function": f, "samples": n, "approx_ms": round(n * ms, 1)}
+                for f, n in leaves.most_common(_REPORT_TOP)
+            ],
+        }
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.items())
+
+
+class Profiler:
+    def __init__(self, interval: float = PROFILE_INTERVAL, kept: int = PROFILES_KEPT):
+        self.interval = interval
+        self.kept = kept
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._running: List[RequestProfile] = []
+        self._done: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._armed: Dict[str, int] = {}   # path prefix -> requests left to profile
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── API ────────────────────────────────────────────────────────────────
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Track tasks created by profiled requests (chains any existing task factory)."""
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            context = kwargs.get("context")
+            profile = context.get(_active) if context is not None else _active.get()
+            if profile is not None:
+                profile.tasks.add(task)
+            return task
+
+        loop.set_task_factory(factory)
+
+    def arm(self, path_prefix: str, count: int = 1) -> None:
+        self._armed[path_prefix] = self._armed.get(path_prefix, 0) + count
+
+    def take_armed(self, path: str) -> bool:
+        for prefix, left in self._armed.items():
+            if path.startswith(prefix):
+                if left <= 1:
+                    del self._armed[prefix]
+                else:
+                    self._armed[prefix] = left - 1
+                return True
+        return False
+
+    def begin(self, method: str, path: str) -> RequestProfile:
+        profile = RequestProfile(method, path, self.interval)
+        profile.tasks.add(asyncio.current_task())
+        with self._lock:
+            self._running.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def end(self, profile: RequestProfile) -> None:
+        profile.duration = time.time() - profile.started_at
+        with self._lock:
+            self._running.remove(profile)
+            self._done[profile.id] = profile
+            while len(self._done) > self.kept:
+                self._done.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._done.get(profile_id)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._running),
+            "armed": dict(self._armed),
+            "profiles": [
+                {"id": p.id, "method": p.method, "path": p.path, "started_at": p.started_at,
+                 "duration_ms": round(p.duration * 1000, 1)}
+                for p in reversed(self._done.values())
+            ],
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _sample(self) -> None:
+        # Runs only while at least one profile is open
+        while True:
+            with self._lock:
+                running = list(self._running)
+                if not running:
+                    self._thread = None
+                    return
+            frame = sys._current_frames().get(self._loop_thread)
+            task = asyncio.current_task(self._loop)
+            stack = fold_stack(frame) if frame is not None and task is not None else None
+            for profile in running:
+                if stack is not None and task in profile.tasks:
+                    profile.stacks[stack] += 1
+                else:
+                    profile.outside += 1
+            del frame
+            time.sleep(self.interval)
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware: profiles requests that ask for it (``X-Profile``
+    plus the API key) or match a path armed with profiler.arm().
+    """
+
+    def __init__(self, app, api_key: Optional[str] = None):
+        self.app = app
+        self.api_key = api_key
+
+    def _requested(self, scope) -> bool:
+        headers = dict(scope.get("headers") or ())
+        if headers.get(b"x-profile", b"").lower() not in (b"1", b"true", b"yes"):
+            return False
+        given = headers.get(b"authorization", b"")
+        return bool(self.api_key) and hmac.compare_digest(given, self.api_key.encode())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or profiler._loop is None or not (
+            self._requested(scope) or (profiler._armed and profiler.take_armed(scope.get("path", "")))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.begin(scope.get("method", ""), scope.get("path", ""))
+        token = _active.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active.reset(token)
+            profiler.end(profile)
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Loop watchdog
+# ────────────────────────────────────────────────────────────────────────────
+class LoopWatchdog:
+    def __init__(
+        self,
+        interval: float = LOOP_WATCHDOG_INTERVAL,
+        threshold: float = LOOP_STALL_THRESHOLD,
+        kept: int = LOOP_STALLS_KEPT,
+        enabled: bool = LOOP_WATCHDOG_ENABLED,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.enabled = enabled
+        self._stalls: deque = deque(maxlen=kept)
+        self._total = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._expected = 0.0        # monotonic time the next heartbeat is due
+        self._current: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        self._schedule()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    def stalls(self) -> dict:
+        with self._lock:
+            recent = [dict(s) for s in reversed(self._stalls)]
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold * 1000,
+            "total": self._total,
+            "recent": recent,
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _schedule(self) -> None:
+        self._expected = time.monotonic() + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _beat(self) -> None:
+        lag = max(0.0, time.monotonic() - self._expected)
+        LOOP_LAG_SECONDS.observe(lag)
+        with self._lock:
+            if self._current is not None:
+                # The stall is over; now we know how long it lasted
+                self._current["duration_ms"] = round((lag + self.interval) * 1000, 1)
+                self._current = None
+        if not self._stop.is_set():
+            self._schedule()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            late = time.monotonic() - self._expected
+            if late < self.threshold:
+                continue
+            with self._lock:
+                if self._current is not None:
+                    continue   # already recorded this stall
+                frame = sys._current_frames().get(self._loop_thread)
+                task = asyncio.current_task(self._loop)
+                self._current = {
+                    "at": time.time(),
+                    "blocked_ms_when_seen": round((late + self.interval) * 1000, 1),
+                    "duration_ms": None,
+                    "task": task.get_name() if task is not None else None,
+                    "stack": fold_stack(frame).split(";") if frame is not None else [],
+                }
+                del frame
+                self._stalls.append(self._current)
+                self._total += 1
+            LOOP_STALLS.inc()
+            print(f"Event loop blocked for {late + self.interval:.2f}s in "
+                  f"{self._current['stack'][-1] if self._current['stack'] else '?'}")
+
+
+# singletons used by the FastAPI app
+profiler = Profiler()
+watchdog = LoopWatchdog()
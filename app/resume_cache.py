@@ -0,0 +1,203 @@
+"""
+resume_cache.py  ──  Two-tier (memory LRU + disk) cache of parsed resumes
+
+Entries are keyed by the PDF's SHA-256, so the same bytes uploaded under a
+different ``fileName`` still hit. The URL → (ETag, hash) alias lets
+/resume/parse send a conditional GET and skip the download entirely.
+
+Functions you'll use elsewhere:
+    • resume_cache.alias(url)           → last known (etag, sha256) for a URL
+    • await resume_cache.get(sha256)    → CachedResume | None
+    • await resume_cache.put(entry, url)
+    • resume_cache.stats()              → hit/miss counters and sizes
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+RESUME_CACHE_DIR = os.getenv(
+    "RESUME_CACHE_DIR",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "resumes"),
+)
+RESUME_CACHE_MEMORY_BYTES = int(os.getenv("RESUME_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+RESUME_CACHE_DISK_BYTES = int(os.getenv("RESUME_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+RESUME_CACHE_MAX_ALIASES = 10_000
+
+
+@dataclass
+class CachedResume:
+    sha256: str
+    text: str
+    metadata: dict = field(default_factory=dict)   # LLM-parsed fields only
+    size: int = 0                                  # PDF size in bytes
+    etag: Optional[str] = None
+
+    def nbytes(self) -> int:
+        return len(self.text) + len(json.dumps(self.metadata)) + 128
+
+
+class ResumeCache:
+    def __init__(
+        self,
+        cache_dir: Optional[str] = RESUME_CACHE_DIR,
+        max_memory_bytes: int = RESUME_CACHE_MEMORY_BYTES,
+        max_disk_bytes: int = RESUME_CACHE_DISK_BYTES,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, CachedResume]" = OrderedDict()
+        self._memory_bytes = 0
+        self._aliases: "OrderedDict[str, Tuple[Optional[str], str]]" = OrderedDict()
+        # Bytes of *.json on disk, seeded by one scan on the first write; writes
+        # run on worker threads, hence the lock
+        self._disk_bytes: Optional[int] = None
+        self._disk_lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # ── API ────────────────────────────────────────────────────────────────
+    def alias(self, url: str) -> Optional[Tuple[Optional[str], str]]:
+        """Return ``(etag, sha256)`` last seen for *url*, if any."""
+        return self._aliases.get(url)
+
+    async def get(self, sha256: str) -> Optional[CachedResume]:
+        entry = self._memory.get(sha256)
+        if entry is not None:
+            self._memory.move_to_end(sha256)
+            self._counters["memory_hits"] += 1
+            return entry
+
+        if self.cache_dir is not None:
+            entry = await asyncio.to_thread(self._read_disk, sha256)
+            if entry is not None:
+                self._counters["disk_hits"] += 1
+                self._remember(entry)
+                return entry
+
+        self._counters["misses"] += 1
+        return None
+
+    async def put(self, entry: CachedResume, url: Optional[str] = None) -> None:
+        self._remember(entry)
+        if url is not None:
+            self.set_alias(url, entry.etag, entry.sha256)
+        if self.cache_dir is not None:
+            await asyncio.to_thread(self._write_disk, entry)
+
+    def set_alias(self, url: str, etag: Optional[str], sha256: str) -> None:
+        self._aliases[url] = (etag, sha256)
+        self._aliases.move_to_end(url)
+        while len(self._aliases) > RESUME_CACHE_MAX_ALIASES:
+            self._aliases.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+        lookups = hits + self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "max_memory_bytes": self.max_memory_bytes,
+            "disk_enabled": self.cache_dir is not None,
+            "disk_bytes": self._disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+            "aliases": len(self._aliases),
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _remember(self, entry: CachedResume) -> None:
+        old = self._memory.pop(entry.sha256, None)
+        if old is not None:
+            self._memory_bytes -= old.nbytes()
+        self._memory[entry.sha256] = entry
+        self._memory_bytes += entry.nbytes()
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes()
+            self._counters["memory_evictions"] += 1
+
+    def _path(self, sha256: str) -> Path:
+        return self.cache_dir / f"{sha256}.json"
+
+    def _read_disk(self, sha256: str) -> Optional[CachedResume]:
+        path = self._path(sha256)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = CachedResume(**json.load(f))
+            os.utime(path)   # refresh mtime so disk eviction is LRU too
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Discarding unreadable cache entry {path}: {e}")
+            with self._disk_lock:
+                self._account_disk(-self._file_size(path))
+                path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, entry: CachedResume) -> None:
+        path = self._path(entry.sha256)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(entry), f)
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(self._file_size(p) for p in self.cache_dir.glob("*.json"))
+            replaced = self._file_size(path)
+            size = self._file_size(tmp)
+            os.replace(tmp, path)
+            self._account_disk(size - replaced)
+            # Only a write that crosses the budget pays for a directory scan
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _account_disk(self, delta: int) -> None:
+        if self._disk_bytes is not None:
+            self._disk_bytes = max(0, self._disk_bytes + delta)
+
+    @staticmethod
+    def _file_size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _evict_disk(self) -> None:
+        """Delete the least recently used entries until under budget (call with _disk_lock held)."""
+        files = []
+        total = 0
+        for p in self.cache_dir.glob("*.json"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+        for _, size, p in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            self._counters["disk_evictions"] += 1
+        # The scan also corrects any drift (files removed by hand, other processes)
+        self._disk_bytes = total
+
+
+# singleton used by the FastAPI app
+resume_cache = ResumeCache()
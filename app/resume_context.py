@@ -0,0 +1,136 @@
+"""
+resume_context.py  ──  Pick the parts of a resume relevant to a question
+
+The resume is split into chunks once per session and indexed with a small
+TF-IDF vectorizer (pure Python, no network). Each chat turn then only sends
+the top-k chunks that fit in a token budget instead of the whole CV.
+
+Functions you'll use elsewhere:
+    • ResumeContext(resume_text)      → chunk + index once
+    • ctx.build(question)             → text to put in the prompt
+"""
+
+from __future__ import annotations
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# "retrieval" sends the top-k chunks, "full" always sends the whole resume
+RESUME_CONTEXT_MODE = os.getenv("RESUME_CONTEXT_MODE", "retrieval").lower()
+RESUME_CONTEXT_TOP_K = int(os.getenv("RESUME_CONTEXT_TOP_K", "4"))
+RESUME_CONTEXT_TOKEN_BUDGET = int(os.getenv("RESUME_CONTEXT_TOKEN_BUDGET", "1200"))
+RESUME_CHUNK_CHARS = int(os.getenv("RESUME_CHUNK_CHARS", "800"))
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i in is it its me my of on or "
+    "that the their this to was were what when where which who with you your".split()
+)
+
+
+def approx_tokens(text: str) -> int:
+    """~4 characters per token; good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def tokenize(text: str) -> List[str]:
+    return [w.strip(".-") for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def chunk_text(text: str, max_chars: int = RESUME_CHUNK_CHARS) -> List[str]:
+    """Split on blank lines, then merge neighbours up to *max_chars*."""
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    if len(paragraphs) <= 1:
+        # PDF extraction often loses blank lines; fall back to single lines
+        paragraphs = [p.strip() for p in text.splitlines() if p.strip()]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for para in paragraphs:
+        while len(para) > max_chars:
+            # Oversized paragraph: hard-split it on its own
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(para[:max_chars])
+            para = para[max_chars:]
+        if size + len(para) > max_chars and current:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(para)
+        size += len(para) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class TfidfIndex:
+    """Sparse, L2-normalised TF-IDF vectors held as plain dicts."""
+
+    def __init__(self, documents: List[str]):
+        tokenized = [tokenize(d) for d in documents]
+        df = Counter(term for tokens in tokenized for term in set(tokens))
+        n = len(documents)
+        self.idf: Dict[str, float] = {t: math.log((1 + n) / (1 + c)) + 1.0 for t, c in df.items()}
+        self.vectors = [self._vectorize(tokens) for tokens in tokenized]
+
+    def _vectorize(self, tokens: List[str]) -> Dict[str, float]:
+        counts = Counter(tokens)
+        vec = {t: (1 + math.log(c)) * self.idf.get(t, 0.0) for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items() if v}
+
+    def search(self, query: str) -> List[Tuple[float, int]]:
+        """Return ``(cosine, doc_index)`` for every document, best first."""
+        q = self._vectorize(tokenize(query))
+        scores = [
+            (sum(w * doc.get(t, 0.0) for t, w in q.items()), i)
+            for i, doc in enumerate(self.vectors)
+        ]
+        return sorted(scores, key=lambda s: (-s[0], s[1]))
+
+
+class ResumeContext:
+    def __init__(
+        self,
+        resume_text: str,
+        mode: str = RESUME_CONTEXT_MODE,
+        top_k: int = RESUME_CONTEXT_TOP_K,
+        token_budget: int = RESUME_CONTEXT_TOKEN_BUDGET,
+    ):
+        self.resume_text = resume_text
+        self.mode = mode
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self._full_tokens = approx_tokens(resume_text)
+        self.chunks: List[str] = []
+        self.index: TfidfIndex | None = None
+        if mode == "retrieval" and self._full_tokens > token_budget:
+            self.chunks = chunk_text(resume_text)
+            self.index = TfidfIndex(self.chunks)
+
+    def build(self, question: str) -> str:
+        """Resume text to send for *question*: whole CV if it fits, else top-k chunks."""
+        if self.index is None:
+            return self.resume_text
+
+        picked: List[int] = []
+        used = 0
+        for score, i in self.index.search(question):
+            if len(picked) >= self.top_k:
+                break
+            if score <= 0 and picked:
+                break
+            cost = approx_tokens(self.chunks[i])
+            if used + cost > self.token_budget:
+                continue
+            picked.append(i)
+            used += cost
+        if not picked:
+            # Nothing matched: lead with the top of the CV (name, summary, contact)
+            picked = [0]
+        # Keep the original reading order so sections still make sense
+        return "\n...\n".join(self.chunks[i] for i in sorted(picked))
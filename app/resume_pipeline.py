@@ -0,0 +1,460 @@
+"""
+resume_pipeline.py  ──  fetch → extract → metadata stages for resume parsing
+
+The stages are shared by /resume/parse (one file) and /resume/parse/batch
+(many files, each stage with its own concurrency limit). In a batch, up
+to BATCH_LLM_BATCH_SIZE resumes share one metadata prompt and one model
+call, and at most BATCH_LLM_CONCURRENCY such calls are in flight.
+
+Only the model calls take an admission slot: one per single-file parse, one
+per batched prompt. Fetching, extraction and cache hits never hold one.
+
+Functions you'll use elsewhere:
+    • await fetch_resume(file_name)         → FetchedResume (cache-aware)
+    • await extract_text(fetched)           → str
+    • parse_metadata_answer(answer)         → dict | str
+    • merge_metadata(local, answer, asked)  → local fields + model-filled gaps
+    • await parse_one(file_name, llm_slot=) → response dict for a single file
+    • await finish_parse(...)               → response dict, session created
+    • parse_batch(file_names, llm_slot=)    → async iterator of response dicts
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from .admission import Overloaded, Ticket, admission
+from .pdf_fetcher import pdf_fetcher, resume_url, FetchResult, PdfFetchError, PdfNotFound, PdfTooLarge
+from .pdf_extractor import pdf_extractor, PdfExtractError
+from .resume_cache import resume_cache, CachedResume
+from .session_manager import session_manager
+from .resume_store import resume_store
+from .models.resume import ResumeCreate
+from .metadata_extractor import METADATA_FIELDS, LocalMetadata, extract_local, metadata_question
+from .metrics import stage_timer
+from .chat_pipeline import (
+    get_llm,
+    _prompt_for_metadata,
+    build_chain,
+    apredict_with_monitoring,
+    prompt_inputs,
+)
+
+BATCH_FETCH_CONCURRENCY = int(os.getenv("BATCH_FETCH_CONCURRENCY", "8"))
+BATCH_EXTRACT_CONCURRENCY = int(os.getenv("BATCH_EXTRACT_CONCURRENCY", str(os.cpu_count() or 2)))
+BATCH_LLM_BATCH_SIZE = int(os.getenv("BATCH_LLM_BATCH_SIZE", "8"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+
+# Waits for the admission slot one model call runs under
+LlmSlot = Callable[[], Awaitable[Ticket]]
+
+
+def background_slot() -> Awaitable[Ticket]:
+    """Shares the LLM slots with requests, behind chat; never rejected."""
+    return admission.acquire("parse", deadline=None)
+
+class ParseError(Exception):
+    """A stage failed; carries the HTTP status the caller should report."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class FetchedResume:
+    file_name: str
+    url: str
+    result: Optional[FetchResult] = None     # set when the PDF was downloaded
+    cached: Optional[CachedResume] = None    # set on a cache hit
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Stages
+# ────────────────────────────────────────────────────────────────────────────
+async def _download(url: str, etag: Optional[str] = None) -> FetchResult:
+    try:
+        with stage_timer("pdf_fetch"):
+            return await pdf_fetcher.fetch(url, etag=etag)
+    except PdfNotFound:
+        raise ParseError(404, f"PDF file not found at {url}")
+    except PdfTooLarge as e:
+        raise ParseError(413, str(e))
+    except PdfFetchError as e:
+        raise ParseError(500, f"Failed to fetch PDF: {e}")
+
+
+async def fetch_resume(file_name: str) -> FetchedResume:
+    """Download the PDF (conditionally if we've seen it) and check the cache."""
+    url = resume_url(file_name)
+    known = resume_cache.alias(url)
+    fetched = await _download(url, etag=known[0] if known else None)
+    cached = None
+    if fetched.not_modified:
+        cached = await resume_cache.get(known[1])
+        if cached is None:
+            # Entry evicted since we saw the ETag -- download it again
+            fetched = await _download(url)
+    if not fetched.not_modified:
+        cached = await resume_cache.get(fetched.sha256)
+
+    if cached is not None:
+        fetched.close()
+        resume_cache.set_alias(url, fetched.etag or cached.etag, cached.sha256)
+        return FetchedResume(file_name, url, cached=cached)
+    return FetchedResume(file_name, url, result=fetched)
+
+
+async def extract_text(fetched: FetchedResume) -> str:
+    """Extract text from all pages on the worker pool, off the event loop."""
+    # Workers open the body by path; the temp file goes when the result closes
+    with fetched.result as body:
+        try:
+            with stage_timer("pdf_extract"):
+                extraction = await pdf_extractor.extract(await body.spill())
+        except PdfExtractError as e:
+            raise ParseError(422, str(e))
+    if extraction.truncated:
+        print(
+            f"Extraction of {fetched.file_name} stopped after "
+            f"{extraction.pages_extracted}/{extraction.page_count} pages"
+        )
+    return extraction.text
+
+
+def parse_metadata_answer(answer: str) -> dict | str:
+    """Pull the JSON object out of the model's (usually fenced) answer."""
+    try:
+        # Extract JSON from markdown code block
+        json_match = re.search(r'```json\s*\n(.*?)\n```', answer, re.DOTALL)
+        if json_match:
+            json_str = json_match.group(1)
+        else:
+            # If no markdown formatting, try to parse the entire string
+            json_str = answer
+        return json.loads(json_str)
+    except (json.JSONDecodeError, AttributeError, TypeError) as e:
+        print(f"Error parsing JSON result: {e}")
+        # If parsing fails, return the raw string
+        return answer
+
+
+def merge_metadata(local: LocalMetadata, answer: Optional[str], asked: List[str]) -> dict:
+    """
+    Combine confidently-resolved local fields with what the model returned
+    for the *asked* ones. If the model's answer is unusable, fall back to the
+    local guesses, low confidence or not.
+    """
+    parsed = parse_metadata_answer(answer) if answer is not None else None
+    if not isinstance(parsed, dict):
+        return dict(local.fields)
+    merged = local.resolved()
+    for key in asked:
+        if parsed.get(key) not in (None, "", []):
+            merged[key] = parsed[key]
+        elif key in local.fields:
+            merged[key] = local.fields[key]
+    return merged
+
+
+def file_metadata(parsed: dict | str, file_name: str, size: int) -> dict:
+    return {
+        **(parsed if isinstance(parsed, dict) else {}),
+        "fileName": file_name,
+        "fileSize": f"{size / 1024:.2f} KB",
+        "fileType": "pdf",
+    }
+
+
+async def finish_parse(
+    fetched: FetchedResume,
+    text_content: str,
+    parsed: dict | str,
+    session_id: Optional[str] = None,
+) -> dict:
+    """Attach metadata to the (new or given) session, cache and persist the result."""
+    size = fetched.result.size
+    metadata = file_metadata(parsed, fetched.file_name, size)
+    if session_id is None:
+        session_id = await session_manager.create(text_content, metadata)
+    else:
+        await session_manager.set_metadata(session_id, metadata)
+
+    if isinstance(parsed, dict):
+        await resume_cache.put(
+            CachedResume(
+                sha256=fetched.result.sha256,
+                text=text_content,
+                metadata=parsed,
+                size=size,
+                etag=fetched.result.etag,
+            ),
+            url=fetched.url,
+        )
+    await resume_store.save(ResumeCreate(user_id=session_id, raw_text=text_content, metadata=metadata))
+    return parse_response(fetched.file_name, text_content, metadata, session_id, cached=False)
+
+
+async def finish_cached(fetched: FetchedResume) -> dict:
+    cached = fetched.cached
+    metadata = file_metadata(cached.metadata, fetched.file_name, cached.size)
+    session_id = await session_manager.create(cached.text, metadata)
+    await resume_store.save(ResumeCreate(user_id=session_id, raw_text=cached.text, metadata=metadata))
+    return parse_response(fetched.file_name, cached.text, metadata, session_id, cached=True)
+
+
+def parse_response(file_name: str, text: str, metadata: dict, session_id: str, cached: bool) -> dict:
+    return {
+        "status": "success",
+        "metadata": metadata,
+        "fileName": file_name,
+        "text_content": text,
+        "session_id": session_id,
+        "cached": cached,
+    }
+
+
+def error_response(file_name: str, error: Exception) -> dict:
+    if isinstance(error, ParseError):
+        status_code, detail = error.status_code, error.detail
+    else:
+        status_code, detail = 500, str(error)
+    return {"status": "error", "fileName": file_name, "status_code": status_code, "detail": detail}
+
+
+async def parse_one(
+    file_name: str,
+    on_stage: Optional[Callable[[str], None]] = None,
+    llm_slot: LlmSlot = background_slot,
+) -> dict:
+    """
+    Full single-file parse: fetch, extract, then ask the model for metadata
+    through the session's chain so the exchange is traced like any chat turn.
+    *on_stage* is called with "fetch", "extract" and "metadata" as work progresses.
+    *llm_slot* is awaited for the admission ticket held during the model call.
+    """
+    stage = on_stage or (lambda _stage: None)
+
+    # Fetch the PDF file (conditionally, and served from the cache if we've parsed it)
+    stage("fetch")
+    fetched = await fetch_resume(file_name)
+    if fetched.cached is not None:
+        return await finish_cached(fetched)
+
+    stage("extract")
+    text_content = await extract_text(fetched)
+
+    stage("metadata")
+    # Rule-based pass first; only fields it can't resolve confidently go to the model
+    local = extract_local(text_content)
+    missing = local.unresolved()
+    session_id = await session_manager.create(text_content)
+    if not missing:
+        return await finish_parse(fetched, text_content, dict(local.fields), session_id)
+
+    question = metadata_question(missing)
+    session = await session_manager.get(session_id)
+    try:
+        chain = build_chain(session, "metadata")
+    except Exception as e:
+        print(f"Error building chain: {e}")
+        raise ParseError(500, "Error building chain")
+    with await llm_slot():
+        result = await apredict_with_monitoring(
+            chain,
+            question,
+            inputs=prompt_inputs(session, question, "metadata"),
+        )
+    if result["status"] != "success":
+        print(f"Error predicting: {result.get('error')}")
+        raise ParseError(500, "Error predicting")
+
+    return await finish_parse(
+        fetched, text_content, merge_metadata(local, result["answer"], missing), session_id
+    )
+
+
+def batch_metadata_messages(requests: List[tuple]) -> list:
+    """
+    One prompt covering several ``(resume_text, fields)`` pairs; the model
+    answers with a JSON object keyed by resume number.
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    resumes = "\n\n".join(
+        f"--- RESUME {i} START ---\n{text}\n--- RESUME {i} END ---"
+        for i, (text, _) in enumerate(requests, 1)
+    )
+    wanted = "\n".join(
+        f'    "{i}": {{' + ", ".join(f'"{f}": {METADATA_FIELDS[f]}' for f in fields) + "}"
+        for i, (_, fields) in enumerate(requests, 1)
+    )
+    question = (
+        f"There are {len(requests)} resumes above. For each one, fill in only the listed fields "
+        "with the information in that resume.\n"
+        "{\n" + wanted + "\n}\n"
+        "Return this JSON object only, with every resume number as a key. No other text."
+    )
+    return [SystemMessage(content=resumes), HumanMessage(content=question)]
+
+
+def split_batch_answer(answer: str, count: int) -> List[Optional[str]]:
+    """Per-resume JSON answers from a batched reply (None where a resume is missing)."""
+    parsed = parse_metadata_answer(answer)
+    if not isinstance(parsed, dict):
+        return [None] * count
+    items = [parsed.get(str(i)) for i in range(1, count + 1)]
+    return [json.dumps(item) if isinstance(item, dict) else None for item in items]
+
+
+async def metadata_answers(requests: List[tuple]) -> List[str | Exception]:
+    """
+    Metadata answers for several ``(resume_text, fields)`` pairs from one
+    model call (no conversation memory). Resumes the reply leaves out are
+    asked again one at a time, so in-flight calls never exceed one per caller.
+    """
+    llm = get_llm()
+    answers: List[Optional[str] | Exception] = [None] * len(requests)
+    if len(requests) > 1:
+        try:
+            reply = await llm.ainvoke(batch_metadata_messages(requests))
+            answers = split_batch_answer(reply.content, len(requests))
+        except Exception as e:
+            print(f"Batched metadata call failed, asking per resume: {e}")
+
+    prompt = _prompt_for_metadata()
+    for i, (text, fields) in enumerate(requests):
+        if answers[i] is not None:
+            continue
+        messages = prompt.format_messages(history=[], question=metadata_question(fields), resume_context=text)
+        try:
+            answers[i] = (await llm.ainvoke(messages)).content
+        except Exception as e:
+            answers[i] = e
+    return answers
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Batch pipeline
+# ────────────────────────────────────────────────────────────────────────────
+_DONE = object()
+
+
+async def parse_batch(
+    file_names: List[str],
+    fetch_concurrency: int = BATCH_FETCH_CONCURRENCY,
+    extract_concurrency: int = BATCH_EXTRACT_CONCURRENCY,
+    llm_batch_size: int = BATCH_LLM_BATCH_SIZE,
+    llm_concurrency: int = BATCH_LLM_CONCURRENCY,
+    llm_slot: LlmSlot = background_slot,
+) -> AsyncIterator[dict]:
+    """
+    Run *file_names* through fetch → extract → metadata with a fixed number
+    of workers per stage and yield each result as soon as it is ready. Each
+    batched model call holds its own ticket from *llm_slot*; when admission
+    sheds it, the resumes in that call come back as 429 errors.
+
+    Queues between stages are bounded, so a slow stage applies backpressure
+    to the ones before it instead of buffering every PDF in memory.
+    """
+    names: asyncio.Queue = asyncio.Queue()
+    to_extract: asyncio.Queue = asyncio.Queue(maxsize=extract_concurrency * 2)
+    to_llm: asyncio.Queue = asyncio.Queue(maxsize=llm_batch_size * llm_concurrency * 2)
+    results: asyncio.Queue = asyncio.Queue()
+    for name in file_names:
+        names.put_nowait(name)
+
+    async def fetch_worker():
+        while True:
+            try:
+                name = names.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                fetched = await fetch_resume(name)
+                if fetched.cached is not None:
+                    await results.put(await finish_cached(fetched))
+                else:
+                    await to_extract.put(fetched)
+            except Exception as e:
+                await results.put(error_response(name, e))
+
+    async def extract_worker():
+        while True:
+            fetched = await to_extract.get()
+            if fetched is _DONE:
+                return
+            try:
+                text = await extract_text(fetched)
+                local = extract_local(text)
+                if local.unresolved():
+                    await to_llm.put((fetched, text, local))
+                else:
+                    # Everything resolved locally: skip the model entirely
+                    await results.put(await finish_parse(fetched, text, dict(local.fields)))
+            except Exception as e:
+                await results.put(error_response(fetched.file_name, e))
+
+    async def llm_worker():
+        while True:
+            item = await to_llm.get()
+            if item is _DONE:
+                return
+            batch = [item]
+            # Take whatever else is already waiting, up to the batch size
+            while len(batch) < llm_batch_size:
+                try:
+                    nxt = to_llm.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if nxt is _DONE:
+                    to_llm.put_nowait(_DONE)   # leave it for a sibling worker
+                    break
+                batch.append(nxt)
+            try:
+                with await llm_slot():
+                    answers = await metadata_answers([(text, local.unresolved()) for _, text, local in batch])
+            except Overloaded as e:
+                answers = [ParseError(429, str(e))] * len(batch)
+            except Exception as e:
+                answers = [e] * len(batch)
+            for (fetched, text, local), answer in zip(batch, answers):
+                try:
+                    if isinstance(answer, ParseError):
+                        raise answer
+                    if isinstance(answer, Exception):
+                        raise ParseError(500, f"Error predicting: {answer}")
+                    parsed = merge_metadata(local, answer, local.unresolved())
+                    await results.put(await finish_parse(fetched, text, parsed))
+                except Exception as e:
+                    await results.put(error_response(fetched.file_name, e))
+
+    async def run_stages():
+        await asyncio.gather(*(fetch_worker() for _ in range(fetch_concurrency)))
+        for _ in range(extract_concurrency):
+            await to_extract.put(_DONE)
+        await asyncio.gather(*extractors)
+        for _ in range(llm_concurrency):
+            await to_llm.put(_DONE)
+        await asyncio.gather(*llm_workers)
+
+    extractors = [asyncio.ensure_future(extract_worker()) for _ in range(extract_concurrency)]
+    llm_workers = [asyncio.ensure_future(llm_worker()) for _ in range(llm_concurrency)]
+    driver = asyncio.ensure_future(run_stages())
+    try:
+        for _ in range(len(file_names)):
+            yield await results.get()
+    finally:
+        for task in (driver, *extractors, *llm_workers):
+            task.cancel()
+        # Release PDFs that were downloaded but never extracted
+        while not to_extract.empty():
+            item = to_extract.get_nowait()
+            if isinstance(item, FetchedResume) and item.result is not None:
+                item.result.close()
@@ -0,0 +1,175 @@
+"""
+resume_store.py  ──  Parsed resumes in the `resumes` table
+
+Parses are saved with a write-behind buffer. Writes for the same user are
+coalesced and flushed as one multi-row upsert (INSERT ... ON CONFLICT
+(user_id) DO UPDATE). SessionManager reloads text and metadata from here,
+so a restarted worker rebuilds sessions without touching S3 or the LLM.
+
+Functions you'll use elsewhere:
+    • await resume_store.save(ResumeCreate(...))   → buffered upsert
+    • await resume_store.get(user_id)              → Resume | None
+    • await resume_store.get_many(user_ids)        → {user_id: Resume}
+    • await resume_store.ensure_schema()          → at startup (raises ResumeSchemaError)
+    • resume_store.start() / await resume_store.drain()
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from .database import create_table, dialect_insert, get_engine
+from .metrics import stage_timer
+from .models.resume import Resume, ResumeCreate
+from .write_behind import WriteBehindBuffer
+
+RESUME_WRITE_BATCH = int(os.getenv("RESUME_WRITE_BATCH", "100"))
+RESUME_WRITE_INTERVAL = float(os.getenv("RESUME_WRITE_INTERVAL", "1.0"))
+# Create the table / user_id index if missing (disable when migrations own the schema)
+RESUME_STORE_CREATE_SCHEMA = os.getenv("RESUME_STORE_CREATE_SCHEMA", "true").lower() == "true"
+
+_table = None
+
+
+class ResumeSchemaError(Exception):
+    """The resumes table or its unique user_id index could not be created."""
+
+
+def resumes_table():
+    """The SQLAlchemy Core table, defined on first use to keep SQLAlchemy off the import path."""
+    global _table
+    if _table is None:
+        from sqlalchemy import JSON, Column, DateTime, Index, Integer, MetaData, String, Table, Text
+
+        _table = Table(
+            "resumes",
+            MetaData(),
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("user_id", String(255), nullable=False),
+            Column("raw_text", Text, nullable=False),
+            Column("metadata", JSON),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+            Column("updated_at", DateTime(timezone=True), nullable=False),
+            # Unique so upserts can target it; also serves every lookup by user
+            Index("ix_resumes_user_id", "user_id", unique=True),
+        )
+    return _table
+
+
+class ResumeStore:
+    def __init__(self, batch_size: int = RESUME_WRITE_BATCH, interval: float = RESUME_WRITE_INTERVAL):
+        self._writes = WriteBehindBuffer(
+            "resume writes", self._flush, max_batch=batch_size, interval=interval, key=lambda r: r.user_id
+        )
+        self._schema_ready = False   # table known to exist (created or found)
+        self._schema_lock = asyncio.Lock()   # one creator when first requests race
+
+    # ── API ────────────────────────────────────────────────────────────────
+    async def save(self, resume: ResumeCreate) -> None:
+        await self._writes.add(resume)
+
+    async def get(self, user_id: str) -> Optional[Resume]:
+        found = await self.get_many([user_id])
+        return found.get(user_id)
+
+    async def get_many(self, user_ids: Iterable[str]) -> Dict[str, Resume]:
+        from sqlalchemy import select
+
+        wanted = list(dict.fromkeys(str(u) for u in user_ids))
+        found: Dict[str, Resume] = {}
+        query_ids = []
+        for user_id in wanted:
+            # Not flushed yet: answer from the buffer (read-your-writes)
+            pending = self._writes.pending(user_id)
+            if pending is not None:
+                now = datetime.now(timezone.utc)
+                found[user_id] = Resume(id=0, created_at=now, updated_at=now, **pending.model_dump())
+            else:
+                query_ids.append(user_id)
+        if not query_ids:
+            return found
+        try:
+            if not await self.ensure_schema():
+                return found   # no table yet, so nothing stored
+        except ResumeSchemaError:
+            pass   # the table is there, only the unique index is missing; reads still work
+
+        table = resumes_table()
+        query = select(table).where(
+            table.c.user_id == query_ids[0] if len(query_ids) == 1 else table.c.user_id.in_(query_ids)
+        )
+        with stage_timer("db_lookup"):
+            async with get_engine().connect() as conn:
+                rows = (await conn.execute(query)).mappings().all()
+        for row in rows:
+            found[str(row["user_id"])] = Resume.model_validate(dict(row))
+        return found
+
+    async def ensure_schema(self) -> bool:
+        """
+        Whether the table exists, creating it and its index first when
+        RESUME_STORE_CREATE_SCHEMA allows. Called once at startup; reads and
+        flushes call it too, so a store used before startup still works.
+        """
+        if self._schema_ready:
+            return True
+        async with self._schema_lock:
+            # Another request may have created it while this one waited
+            if self._schema_ready:
+                return True
+            from sqlalchemy import inspect
+            from sqlalchemy.exc import IntegrityError
+
+            table = resumes_table()
+            async with get_engine().begin() as conn:
+                if not RESUME_STORE_CREATE_SCHEMA:
+                    if not await conn.run_sync(lambda sync: inspect(sync).has_table(table.name)):
+                        return False
+                else:
+                    try:
+                        await conn.run_sync(create_table, table)
+                    except IntegrityError as e:
+                        raise ResumeSchemaError(
+                            "Cannot create the unique index ix_resumes_user_id: the resumes table has "
+                            "duplicate user_id rows. Keep one row per user_id and restart, or set "
+                            "RESUME_STORE_CREATE_SCHEMA=false and create the index with a migration."
+                        ) from e
+            self._schema_ready = True
+            return True
+
+    def start(self) -> None:
+        self._writes.start()
+
+    async def drain(self) -> None:
+        await self._writes.drain()
+
+    def stats(self) -> dict:
+        return self._writes.stats()
+
+    # ── internals ──────────────────────────────────────────────────────────
+    async def _flush(self, batch: List[ResumeCreate]) -> None:
+        engine = get_engine()
+        insert = dialect_insert(engine)
+        table = resumes_table()
+        now = datetime.now(timezone.utc)
+        rows = [{**r.model_dump(), "created_at": now, "updated_at": now} for r in batch]
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={
+                "raw_text": stmt.excluded.raw_text,
+                "metadata": stmt.excluded["metadata"],
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        with stage_timer("db_write"):
+            # Schema work stays out of the write transaction; upserts need the index
+            await self.ensure_schema()
+            async with engine.begin() as conn:
+                await conn.execute(stmt, rows)
+
+
+# singleton used by the FastAPI app
+resume_store = ResumeStore()
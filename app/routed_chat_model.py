@@ -0,0 +1,78 @@
+"""
+routed_chat_model.py  ──  LangChain chat model that routes through llm_router
+
+Wraps an ordered set of chat models (primary first, then fallbacks) so
+chains, abatch() and astream() get deadlines, retries, hedging and fallback
+without changing how they call the model. Streams are routed on time to the
+first chunk. Once a chunk has been sent, the stream stays on that model.
+
+Imported on first use (see chat_pipeline.get_llm); it pulls in LangChain.
+"""
+
+from __future__ import annotations
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, Field
+
+from .llm_router import LLMRouter, llm_router
+
+
+class RoutedChatModel(BaseChatModel):
+    """The first of *models* to answer under llm_router's policy."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    models: Dict[str, BaseChatModel]      # name -> model, in the order they are tried
+    router: LLMRouter = Field(default=llm_router, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"models": list(self.models)}
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        return self.router.call_sync(
+            list(self.models), lambda name: self.models[name]._generate(messages, stop=stop, **kwargs)
+        )
+
+    async def _agenerate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        return await self.router.call(
+            list(self.models), lambda name: self.models[name]._agenerate(messages, stop=stop, **kwargs)
+        )
+
+    async def _astream(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async def first_chunk(name: str):
+            stream = self.models[name]._astream(messages, stop=stop, **kwargs)
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None   # an empty answer is still an answer
+            except BaseException:
+                # Lost the race, failed or was cancelled: release the connection
+                await stream.aclose()
+                raise
+
+        async def close(result) -> None:
+            await result[0].aclose()
+
+        stream, chunk = await self.router.call(list(self.models), first_chunk, kind="stream", discard=close)
+        try:
+            while chunk is not None:
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                chunk = await anext(stream, None)
+        finally:
+            await stream.aclose()
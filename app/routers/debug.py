@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from ..profiling import profiler, watchdog
+from .resume import get_api_key
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["debug"],
+    dependencies=[Depends(get_api_key)],
+)
+
+
+@router.post("/profile")
+async def arm_profile(
+    path: str = Query(..., description="Path prefix to profile, e.g. /session/chat"),
+    count: int = Query(1, ge=1, le=100),
+):
+    """
+    Profile the next *count* requests whose path starts with *path*.
+    Their ids show up in GET /debug/profiles and in each response's X-Profile-Id header.
+    """
+    profiler.arm(path, count)
+    return {"armed": profiler.stats()["armed"]}
+
+@router.get("/profiles")
+async def list_profiles():
+    """
+    Recent request profiles, newest first
+    """
+    return profiler.stats()
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = Query("json", pattern="^(json|folded)$")):
+    """
+    One request profile: top stacks and functions by samples,
+    or format=folded for flame graph tools
+    """
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (still running or evicted)")
+    if format == "folded":
+        return PlainTextResponse(profile.folded())
+    return profile.to_dict()
+
+@router.get("/stalls")
+async def loop_stalls():
+    """
+    Recent event-loop stalls and the stack that was blocking each one
+    """
+    return watchdog.stalls()
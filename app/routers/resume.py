@@ -1,17 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends, Security, Query
+from fastapi import APIRouter, HTTPException, Depends, Security, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security.api_key import APIKeyHeader
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List
 import os
 from pathlib import Path
-import requests
-from PyPDF2 import PdfReader
-from io import BytesIO
 import json
-import re
-from ..models.resume import Resume
-from datetime import datetime
-from ..session_manager import session_manager
-from ..chat_pipeline import build_chain, predict_with_monitoring
+from ..admission import admission, admit, client_key
+from ..cancellation import run_until_disconnect, ClientDisconnected
+from ..resume_cache import resume_cache
+from ..resume_store import resume_store
+from ..resume_pipeline import BATCH_MAX_FILES, ParseError, parse_batch, parse_one
+from ..parse_jobs import parse_jobs, JobQueueFull
 
 router = APIRouter(
     prefix="/resume",
@@ -34,104 +34,85 @@ async def get_api_key(api_key: str = Security(api_key_header)):
         )
     return api_key
 
+@router.get("/cache/stats")
+async def cache_stats(api_key: str = Depends(get_api_key)):
+    """Hit/miss counters and sizes of the parsed-resume cache."""
+    return {**resume_cache.stats(), "db_writes": resume_store.stats()}
+
+
 @router.get("/parse", response_model=dict)
 async def parse_resume(
+    request: Request,
     fileName: str = Query(..., description="Name of the resume file to parse"),
     api_key: str = Depends(get_api_key),
 ):
     try:
-        # Construct the S3 URL
-        s3_url = f"https://bonga-resume.s3.ap-southeast-2.amazonaws.com/resumes/{fileName}"
-        
-        # Fetch the PDF file
-        response = requests.get(s3_url)
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=404,
-                detail=f"PDF file not found at {s3_url}"
-            )
-        
-        # Read the PDF content
-        pdf_file = BytesIO(response.content)
-        pdf_reader = PdfReader(pdf_file)
-        
-        
-        # Extract text from all pages
-        text_content = ""
-        for page in pdf_reader.pages:
-            text_content += page.extract_text()
-        print(text_content)
-
-        session_id = session_manager.create(text_content)
-
-        session = await session_manager.get(session_id)
-        try:
-            chain = build_chain(session, "metadata")
-        except Exception as e:
-            print(f"Error building chain: {e}")
-            raise HTTPException(500, "Error building chain")
-        try:
-            result = predict_with_monitoring(chain,
-                    """
-                        Fill this JSON with the information in the resume.
-                        {
-                            "name": string,
-                            "email": string,
-                            "phone": string,
-                            "address": string,
-                            "skills": string[],
-                        }
-                        Return the JSON only. No other text.
-                    """          
-            )
-        except Exception as e:
-            print(f"Error predicting: {e}")
-            raise HTTPException(500, "Error predicting")
-        print(result["answer"])
-        
-        # Parse the JSON from the markdown-formatted string
-        try:
-            # Extract JSON from markdown code block
-            json_match = re.search(r'```json\s*\n(.*?)\n```', result["answer"], re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # If no markdown formatting, try to parse the entire string
-                json_str = result["answer"]
-            
-            # Parse the JSON string to an object
-            parsed_result = json.loads(json_str)
-        except (json.JSONDecodeError, AttributeError) as e:
-            print(f"Error parsing JSON result: {e}")
-            # If parsing fails, return the raw string
-            parsed_result = result["answer"]
-        
-        metadata = {
-            **parsed_result,
-            "fileName": fileName,
-            "fileSize": f"{int(response.headers.get('Content-Length', 0)) / 1024:.2f} KB",
-            "fileType": "pdf",
-        }
-        
-        session.set_metadata(metadata)
-
-        return {
-            "status": "success",
-            "metadata": metadata,
-            "fileName": fileName,
-            "text_content": text_content,
-            "session_id": session_id,
-        }
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to fetch PDF: {str(e)}"
-        )
+        # Abandon the download/extraction/LLM work if the client goes away;
+        # only the model call waits for an LLM slot (429 when overloaded)
+        parse = parse_one(fileName, llm_slot=lambda: admit(request, "parse"))
+        return await run_until_disconnect(request, parse)
+    except ClientDisconnected:
+        raise HTTPException(499, "Client closed request")
+    except HTTPException:
+        raise
+    except ParseError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=str(e)
-        ) 
-    
-    
+        )
+
+
+class BatchParseRequest(BaseModel):
+    fileNames: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_FILES)
+
+
+@router.post("/parse/batch")
+async def parse_resume_batch(
+    req: BatchParseRequest,
+    request: Request,
+    api_key: str = Depends(get_api_key),
+):
+    """
+    Parse many resumes through the staged fetch → extract → metadata pipeline.
+    Results stream back as NDJSON, one line per file, in completion order.
+    Each batched model call takes its own LLM slot; resumes whose call is
+    shed come back as error lines with status_code 429.
+    """
+    key = client_key(request)
+
+    async def llm_slot():
+        return await admission.acquire("parse", key=key)
+
+    async def lines():
+        async for result in parse_batch(req.fileNames, llm_slot=llm_slot):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/parse/jobs", status_code=202)
+async def submit_parse_job(
+    fileName: str = Query(..., description="Name of the resume file to parse"),
+    api_key: str = Depends(get_api_key),
+):
+    """Queue a parse and return immediately; poll the status URL for the result."""
+    try:
+        job = parse_jobs.submit(fileName)
+    except JobQueueFull as e:
+        return JSONResponse(status_code=503, content={"detail": str(e)}, headers={"Retry-After": "5"})
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"{router.prefix}/parse/jobs/{job.id}",
+    }
+
 
+@router.get("/parse/jobs/{job_id}")
+async def get_parse_job(job_id: str, api_key: str = Depends(get_api_key)):
+    """Status, stage progress and (once finished) the parse result of a job."""
+    job = parse_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job.to_dict()
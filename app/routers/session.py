@@ -1,8 +1,22 @@
-from fastapi import UploadFile, File, HTTPException, APIRouter
-from pydantic import BaseModel
+from fastapi import HTTPException, APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+import json
 
-from ..session_manager import session_manager
-from ..chat_pipeline import build_chain, predict_with_monitoring
+from ..session_manager import SESSION_PREFETCH_MAX_IDS, session_manager
+from ..chat_pipeline import (
+    build_chain,
+    apredict_with_monitoring,
+    stream_with_monitoring,
+    prompt_inputs,
+    chain_cache_stats,
+)
+from ..admission import admit
+from ..cancellation import run_until_disconnect, ClientDisconnected
+from ..answer_cache import answer_cache
+from ..conversation_store import conversation_store
+from .resume import get_api_key
 
 router = APIRouter(
     prefix="/session",
@@ -18,18 +32,35 @@ class InitResponse(BaseModel):
 
 @router.get("/list")
 async def list_sessions():
-    """List all available session IDs for debugging"""
+    """Report session-store size, approximate memory use and evictions"""
     return {
-        "available_sessions": list(session_manager._sessions.keys()),
-        "total_sessions": len(session_manager._sessions)
+        **session_manager.stats(),
+        "chain_cache": chain_cache_stats(),
+        "answer_cache": answer_cache.stats(),
+        "conversation_writes": conversation_store.stats(),
     }
 
 
+class PrefetchRequest(BaseModel):
+    session_ids: list[str] = Field(..., max_length=SESSION_PREFETCH_MAX_IDS)
+
+
+@router.post("/prefetch")
+async def prefetch_sessions(req: PrefetchRequest, api_key: str = Depends(get_api_key)):
+    """Warm many sessions from the database with a single query"""
+    try:
+        loaded = await session_manager.prefetch(req.session_ids)
+    except Exception as e:
+        print(f"Prefetch failed: {e}")
+        raise HTTPException(500, "Error prefetching sessions")
+    return {"requested": len(req.session_ids), "loaded": loaded}
+
+
 @router.post("/init", response_model=InitResponse)
 async def init_session(
     resume_text: str
 ):
-    session_id = session_manager.create(resume_text)
+    session_id = await session_manager.create(resume_text)
     return InitResponse(session_id=session_id)
 
 
@@ -44,24 +75,112 @@ class ChatResponse(BaseModel):
     status: str
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
+async def chat(req: ChatRequest, request: Request):
     try:
         session = await session_manager.get(req.session_id)
     except KeyError:
-        print(f"Session {req.session_id} not found. Available sessions: {list(session_manager._sessions.keys())}")
+        print(f"Session {req.session_id} not found ({len(session_manager)} sessions live)")
         raise HTTPException(404, "Invalid session_id")
+
+    cached = answer_cache.lookup(session, req.message)
+    if cached is not None:
+        await _record_cached_turn(req, session, cached)
+        return ChatResponse(answer=cached, session_id=req.session_id, status="success")
     
-    try:
-      # Build a chain *for this call* using session-specific resume + memory
-      chain = build_chain(session, "chat")
-    except Exception as e:
-        print(f"Error building chain: {e}")
-        raise HTTPException(500, "Error building chain")
+    # Queue for an LLM slot, or 429 if the wait would be too long
+    with await admit(request, "chat", session=req.session_id):
+        try:
+          # Build a chain *for this call* using session-specific resume + memory
+          chain = build_chain(session, "chat")
+        except Exception as e:
+            print(f"Error building chain: {e}")
+            raise HTTPException(500, "Error building chain")
 
-    # Use the monitored prediction function
-    result = predict_with_monitoring(chain, req.message, req.session_id)
+        # Use the monitored prediction function; stop paying for it if the client leaves
+        try:
+            result = await run_until_disconnect(
+                request,
+                apredict_with_monitoring(
+                    chain, req.message, req.session_id, inputs=prompt_inputs(session, req.message)
+                ),
+            )
+        except ClientDisconnected:
+            raise HTTPException(499, "Client closed request")
+    if result["status"] == "success":
+        answer_cache.store(session, req.message, result["answer"])
+        await session_manager.record_turn(req.session_id, session, req.message, result["answer"])
     return ChatResponse(
         answer=result["answer"],
         session_id=result["session_id"],
         status=result["status"]
     )
+
+
+async def _record_cached_turn(req: ChatRequest, session, answer: str) -> None:
+    """Keep the conversation consistent when the answer came from the cache"""
+    await session.memory.asave_context({"question": req.message}, {"text": answer})
+    await session_manager.record_turn(req.session_id, session, req.message, answer)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    Same as /chat, but streams the answer as Server-Sent Events:
+    ``token`` events carry text chunks, followed by a final ``done``
+    (or ``error``) event.
+    """
+    try:
+        session = await session_manager.get(req.session_id)
+    except KeyError:
+        raise HTTPException(404, "Invalid session_id")
+
+    cached = answer_cache.lookup(session, req.message)
+    if cached is not None:
+        await _record_cached_turn(req, session, cached)
+
+        async def replay():
+            yield _sse("token", {"text": cached})
+            yield _sse("done", {"session_id": req.session_id, "status": "success"})
+
+        return StreamingResponse(
+            replay(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    # Held until the stream ends; background covers a stream that never starts
+    ticket = await admit(request, "chat", session=req.session_id)
+    try:
+        chain = build_chain(session, "chat")
+    except Exception as e:
+        ticket.release()
+        print(f"Error building chain: {e}")
+        raise HTTPException(500, "Error building chain")
+
+    async def events():
+        try:
+            inputs = prompt_inputs(session, req.message)
+            parts = []
+            async for token in stream_with_monitoring(chain, req.message, req.session_id, inputs=inputs):
+                parts.append(token)
+                yield _sse("token", {"text": token})
+            answer = "".join(parts)
+            answer_cache.store(session, req.message, answer)
+            await session_manager.record_turn(req.session_id, session, req.message, answer)
+        except Exception as e:
+            yield _sse("error", {"session_id": req.session_id, "status": "error", "error": str(e)})
+            return
+        finally:
+            ticket.release()
+        yield _sse("done", {"session_id": req.session_id, "status": "success"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(ticket.release),
+    )
@@ -1,61 +1,71 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from datetime import datetime
-from ..models.user import User, UserCreate
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
+from typing import List, Optional
+import json
+from pydantic_core import to_jsonable_python
+from ..models.user import User, UserCreate, UserFields
+from ..user_store import USER_PAGE_MAX, USER_PAGE_SIZE, UserExists, parse_fields, user_store
 
 router = APIRouter(
     prefix="/users",
     tags=["users"]
 )
 
-# Simulated database (in memory)
-fake_users_db = [
-    {
-        "id": 1,
-        "email": "john@example.com",
-        "username": "john_doe",
-        "full_name": "John Doe",
-        "is_active": True,
-        "created_at": datetime.now()
-    },
-    {
-        "id": 2,
-        "email": "jane@example.com",
-        "username": "jane_doe",
-        "full_name": "Jane Doe",
-        "is_active": True,
-        "created_at": datetime.now()
-    }
-]
-
-@router.get("/", response_model=List[User])
-async def get_users():
-    """
-    Get all users
-    """
-    return fake_users_db
+
+def _json(body, headers: Optional[dict] = None) -> Response:
+    # Rows come from the store already shaped like User; skip re-validating them,
+    # but encode them the way pydantic would (ISO datetimes, as POST returns)
+    return Response(json.dumps(to_jsonable_python(body)), media_type="application/json", headers=headers)
+
+
+@router.get("/", response_model=List[UserFields])
+async def get_users(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(USER_PAGE_SIZE, ge=1, le=USER_PAGE_MAX),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,email"),
+):
+    """
+    Get one page of users, ordered by id.
+    The next page's cursor is in the X-Next-Cursor header (absent on the last page).
+    """
+    try:
+        page = await user_store.list(cursor, limit, parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+    return _json(page.items, headers)
+
+@router.get("/lookup", response_model=User)
+async def lookup_user(
+    email: Optional[str] = Query(None),
+    username: Optional[str] = Query(None),
+):
+    """
+    Get a user by email or username
+    """
+    if (email is None) == (username is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of email or username")
+    user = await (user_store.get_by_email(email) if email is not None else user_store.get_by_username(username))
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return _json(user)
 
 @router.get("/{user_id}", response_model=User)
 async def get_user(user_id: int):
     """
     Get a specific user by ID
     """
-    user = next((user for user in fake_users_db if user["id"] == user_id), None)
+    user = await user_store.get(user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return _json(user)
 
 @router.post("/", response_model=User)
 async def create_user(user: UserCreate):
     """
     Create a new user
     """
-    # Simulate user creation
-    new_user = {
-        "id": len(fake_users_db) + 1,
-        **user.model_dump(exclude={"password"}),
-        "is_active": True,
-        "created_at": datetime.now()
-    }
-    fake_users_db.append(new_user)
-    return new_user
\ No newline at end of file
+    try:
+        return await user_store.create(user)
+    except UserExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,205 @@
+"""
+session_backends.py  ──  Shared storage for sessions across workers/nodes
+
+SessionManager keeps a local read-through cache in front of one of these, so
+any worker can pick up a conversation started on another. Saves are
+compare-and-set on the record's version: a worker holding a stale copy is
+told so instead of silently overwriting another worker's turn.
+
+Backends (select with SESSION_BACKEND):
+    • ""       → none, sessions live only in this process (default)
+    • "sqlite" → SQLiteSessionBackend, a file shared by workers on one host
+    • "redis"  → RedisSessionBackend, any Redis-protocol server (SESSION_REDIS_URL)
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "").lower()
+SESSION_BACKEND_TTL = int(os.getenv("SESSION_BACKEND_TTL", str(24 * 3600)))
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.sqlite3")
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+
+
+@dataclass
+class SessionRecord:
+    resume_text: str
+    metadata: dict = field(default_factory=dict)
+    messages: List[dict] = field(default_factory=list)   # langchain messages_to_dict()
+    summary: str = ""                                     # see conversation_memory
+    evicted: List[dict] = field(default_factory=list)    # turns not yet summarized
+    version: int = 0
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self), default=str)
+
+    @classmethod
+    def loads(cls, raw: str | bytes) -> "SessionRecord":
+        return cls(**json.loads(raw))
+
+
+class SessionBackend(ABC):
+    """Async key-value store for SessionRecords, keyed by session id."""
+
+    @abstractmethod
+    async def load(self, sid: str) -> Optional[SessionRecord]:
+        ...
+
+    @abstractmethod
+    async def version(self, sid: str) -> Optional[int]:
+        """Current version of *sid* without fetching the payload (None if absent)."""
+
+    @abstractmethod
+    async def save(self, sid: str, record: SessionRecord, expected_version: int) -> bool:
+        """
+        Store *record* only if *sid* is still at *expected_version* (0: absent
+        or expired). False means another writer got there first.
+        """
+
+    @abstractmethod
+    async def delete(self, sid: str) -> None:
+        ...
+
+    async def aclose(self) -> None:
+        pass
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# SQLite / file
+# ────────────────────────────────────────────────────────────────────────────
+class SQLiteSessionBackend(SessionBackend):
+    """One SQLite file in WAL mode; calls run on a worker thread."""
+
+    def __init__(self, path: str = SESSION_SQLITE_PATH, ttl: int = SESSION_BACKEND_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " sid TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " version INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._lock = asyncio.Lock()   # sqlite3 connections are not concurrent-safe
+
+    async def _run(self, sql: str, params: tuple):
+        async with self._lock:
+            return await asyncio.to_thread(lambda: self._conn.execute(sql, params).fetchone())
+
+    async def _write(self, sql: str, params: tuple) -> int:
+        async with self._lock:
+            return await asyncio.to_thread(lambda: self._conn.execute(sql, params).rowcount)
+
+    async def load(self, sid: str) -> Optional[SessionRecord]:
+        row = await self._run(
+            "SELECT data FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+        )
+        return SessionRecord.loads(row[0]) if row else None
+
+    async def version(self, sid: str) -> Optional[int]:
+        row = await self._run(
+            "SELECT version FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+        )
+        return row[0] if row else None
+
+    async def save(self, sid: str, record: SessionRecord, expected_version: int) -> bool:
+        now = time.time()
+        if expected_version == 0:
+            # New session, or replacing one that expired
+            written = await self._write(
+                "INSERT INTO sessions (sid, data, version, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(sid) DO UPDATE SET data = excluded.data, "
+                "version = excluded.version, expires_at = excluded.expires_at "
+                "WHERE sessions.expires_at <= ?",
+                (sid, record.dumps(), record.version, now + self.ttl, now),
+            )
+        else:
+            written = await self._write(
+                "UPDATE sessions SET data = ?, version = ?, expires_at = ? "
+                "WHERE sid = ? AND version = ? AND expires_at > ?",
+                (record.dumps(), record.version, now + self.ttl, sid, expected_version, now),
+            )
+        return written == 1
+
+    async def delete(self, sid: str) -> None:
+        await self._run("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    async def aclose(self) -> None:
+        self._conn.close()
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Redis (networked)
+# ────────────────────────────────────────────────────────────────────────────
+class RedisSessionBackend(SessionBackend):
+    """
+    Stores ``<prefix><sid>`` (payload) and ``<prefix><sid>:v`` (version).
+    Saves WATCH the version key and write both in MULTI/EXEC. Pass *client*
+    to use an existing client, e.g. fakeredis in tests.
+    """
+
+    def __init__(
+        self, url: str = SESSION_REDIS_URL, ttl: int = SESSION_BACKEND_TTL, prefix: str = "session:", client=None
+    ):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package") from e
+            client = redis.from_url(url)
+        self._redis = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def load(self, sid: str) -> Optional[SessionRecord]:
+        raw = await self._redis.get(self.prefix + sid)
+        return SessionRecord.loads(raw) if raw else None
+
+    async def version(self, sid: str) -> Optional[int]:
+        raw = await self._redis.get(f"{self.prefix}{sid}:v")
+        return int(raw) if raw is not None else None
+
+    async def save(self, sid: str, record: SessionRecord, expected_version: int) -> bool:
+        from redis.exceptions import WatchError
+
+        version_key = f"{self.prefix}{sid}:v"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(version_key)
+                current = await pipe.get(version_key)
+                if (int(current) if current is not None else 0) != expected_version:
+                    return False
+                pipe.multi()
+                pipe.set(self.prefix + sid, record.dumps(), ex=self.ttl)
+                pipe.set(version_key, record.version, ex=self.ttl)
+                await pipe.execute()
+            except WatchError:
+                # The version changed between WATCH and EXEC
+                return False
+        return True
+
+    async def delete(self, sid: str) -> None:
+        await self._redis.delete(self.prefix + sid, f"{self.prefix}{sid}:v")
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+def backend_from_env() -> Optional[SessionBackend]:
+    if SESSION_BACKEND in ("", "none", "memory"):
+        return None
+    if SESSION_BACKEND == "sqlite":
+        return SQLiteSessionBackend()
+    if SESSION_BACKEND == "redis":
+        return RedisSessionBackend()
+    raise ValueError(f"Unknown SESSION_BACKEND: {SESSION_BACKEND!r}")
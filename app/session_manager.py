@@ -1,61 +1,449 @@
 # session_manager.py
 from __future__ import annotations
-from typing import Dict
-from langchain.memory import ConversationBufferWindowMemory
-from .database import AsyncSessionLocal
-from sqlalchemy import text
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional
+from .admission import admission
+from .conversation_store import conversation_store
+from .metrics import Gauge, stage_timer
+from .resume_store import resume_store
+from .session_backends import SessionBackend, SessionRecord, backend_from_env
+
+# LangChain is imported on first use, keeping app startup fast
+if TYPE_CHECKING:
+    from .conversation_memory import TokenBudgetMemory
+
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))   # idle seconds
+# How long a "no resume for this user" answer is remembered
+SESSION_NEGATIVE_TTL = float(os.getenv("SESSION_NEGATIVE_TTL", "30"))
+# Compare-and-set attempts after the first when other workers save the same session
+SESSION_SAVE_RETRIES = int(os.getenv("SESSION_SAVE_RETRIES", "3"))
+# Most ids one POST /session/prefetch may warm
+SESSION_PREFETCH_MAX_IDS = int(os.getenv("SESSION_PREFETCH_MAX_IDS", "100"))
+_NEGATIVE_CACHE_MAX = 10_000
+
+# Rough fixed cost of a Session + its LangChain memory/chain objects
+_SESSION_OVERHEAD_BYTES = 4096
+
 
 class Session:
-    def __init__(self, resume_text: str, metadata: dict = {}):
-        self.resume_text: str = resume_text
-        self.metadata: dict = metadata
-        self.memory: ConversationBufferWindowMemory = new_memory()
-        
+    __slots__ = (
+        "_resume_text", "metadata", "memory", "chains", "context", "last_access", "nbytes", "version",
+        "history_pending",
+    )
+
+    def __init__(self, resume_text: str, metadata: dict | None = None):
+        self._resume_text: str = resume_text
+        self.metadata: dict = metadata if metadata is not None else {}
+        self.memory: TokenBudgetMemory = new_memory()
+        # prompt_type -> prepared LLMChain, see chat_pipeline.build_chain
+        self.chains: dict = {}
+        # chunked/indexed resume, see chat_pipeline.prompt_inputs
+        self.context = None
+        self.last_access: float = time.monotonic()
+        self.nbytes: int = 0   # last measured approx_bytes(), kept by SessionManager
+        self.version: int = 0  # bumped on every save to the shared backend
+        # True until past turns are read back from the conversation store
+        self.history_pending: bool = False
+
+    @property
+    def resume_text(self) -> str:
+        return self._resume_text
+
+    @resume_text.setter
+    def resume_text(self, value: str):
+        if value != self._resume_text:
+            self._resume_text = value
+            self.chains.clear()
+            self.context = None
+
     def set_metadata(self, metadata: dict):
         self.metadata = metadata
+        self.chains.clear()
+
+    def to_record(self) -> SessionRecord:
+        from langchain_core.messages import messages_to_dict
+
+        return SessionRecord(
+            resume_text=self._resume_text,
+            metadata=self.metadata,
+            messages=messages_to_dict(self.memory.chat_memory.messages),
+            summary=self.memory.summary,
+            evicted=messages_to_dict(self.memory.evicted),
+            version=self.version,
+        )
+
+    @classmethod
+    def from_record(cls, record: SessionRecord) -> "Session":
+        session = cls(record.resume_text, record.metadata)
+        session.load_record(record)
+        return session
+
+    def load_record(self, record: SessionRecord) -> None:
+        """Replace this session's state with *record* (in place, for requests holding it)."""
+        from langchain_core.messages import messages_from_dict
 
+        self.resume_text = record.resume_text
+        if record.metadata != self.metadata:
+            self.set_metadata(record.metadata)
+        self.memory.chat_memory.messages = messages_from_dict(record.messages)
+        self.memory.summary = record.summary
+        self.memory.evicted = messages_from_dict(record.evicted)
+        self.version = record.version
 
-def new_memory(k: int = 2) -> ConversationBufferWindowMemory:
-    """Return a sliding-window memory holding the last *k* turns."""
-    return ConversationBufferWindowMemory(k=k, return_messages=True)
+    def add_turn(self, question: str, answer: str) -> None:
+        self.memory.save_context({"question": question}, {"text": answer})
+
+    def restore_history(self, turns) -> None:
+        """Replay stored turns (oldest first) ahead of anything said since."""
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        restored = []
+        for turn in turns:
+            restored += [HumanMessage(content=turn.question), AIMessage(content=turn.answer)]
+        self.memory.chat_memory.messages = restored + list(self.memory.chat_memory.messages)
+        self.memory.prune()
+        self.history_pending = False
+
+    def approx_bytes(self) -> int:
+        """Cheap estimate of the memory held by this session."""
+        history = sum(len(str(m.content)) for m in self.memory.chat_memory.messages)
+        history += len(self.memory.summary) + sum(len(str(m.content)) for m in self.memory.evicted)
+        return (
+            _SESSION_OVERHEAD_BYTES
+            + len(self._resume_text)
+            + len(json.dumps(self.metadata, default=str))
+            + history
+        )
+
+
+def new_memory(max_tokens: int | None = None) -> TokenBudgetMemory:
+    """Return a memory holding recent turns up to *max_tokens*, plus a summary of older ones."""
+    from .conversation_memory import MEMORY_TOKEN_BUDGET, TokenBudgetMemory
+
+    # input_key: chat prompts carry extra inputs (resume_context) besides the question
+    return TokenBudgetMemory(
+        max_token_limit=max_tokens or MEMORY_TOKEN_BUDGET, return_messages=True, input_key="question"
+    )
 
 class SessionManager:
-    """Tiny in-memory store -- production apps should use Redis/DB."""
-    def __init__(self):
-        self._sessions: Dict[str, Session] = {}
+    """
+    Bounded in-memory store: least-recently-used sessions are evicted once
+    *max_sessions* or *max_bytes* is exceeded, and idle ones after *ttl* seconds.
+
+    With a shared *backend* the local store acts as a read-through cache:
+    a cached session is reused only while its version matches the backend's,
+    so a conversation can move freely between workers.
+    """
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_COUNT,
+        max_bytes: int = SESSION_MAX_BYTES,
+        ttl: float = SESSION_TTL,
+        backend: Optional[SessionBackend] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._total_bytes = 0
+        self._evictions: Dict[str, int] = {"lru": 0, "ttl": 0}
+        # sid -> in-flight load shared by every concurrent caller (single-flight)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # sid -> in-flight conversation history read for a prefetched session
+        self._hydrating: Dict[str, asyncio.Task] = {}
+        # sid -> background task folding evicted turns into the memory's summary
+        self._summarizing: Dict[str, asyncio.Task] = {}
+        # sid -> monotonic time until which "not found" is answered locally
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self._load_stats: Dict[str, int] = {
+            "db_queries": 0, "coalesced": 0, "negative_hits": 0, "history_loads": 0, "save_conflicts": 0
+        }
+        self._summary_stats: Dict[str, int] = {"runs": 0, "errors": 0}
 
     # ── API ────────────────────────────────────────────────────────────────
-    def create(self, resume_text: str, metadata: dict = {}) -> str:
-        sid = str(len(self._sessions) + 1)
-        self._sessions[sid] = Session(resume_text, metadata)
+    async def create(self, resume_text: str, metadata: dict | None = None) -> str:
+        sid = uuid.uuid4().hex
+        session = Session(resume_text, metadata)
+        self._put(sid, session)
+        await self.save(sid, session)
         return sid
-    
-    def set_metadata(self, sid: str, metadata: dict):
-        self._sessions[sid].set_metadata(metadata)
+
+    async def set_metadata(self, sid: str, metadata: dict):
+        session = self._sessions.get(sid) or await self.get(sid)
+        session.set_metadata(metadata)
+        self._touch(sid, session)
+        await self.save(sid, session, reapply=lambda s: s.set_metadata(metadata))
+
+    async def save(
+        self, sid: str, session: Session | None = None, reapply: Optional[Callable[[Session], None]] = None
+    ) -> bool:
+        """
+        Push *sid* (resume, metadata, conversation) to the shared backend.
+
+        The write is compare-and-set on the version this worker last saw. If
+        another worker saved first, its state is loaded into *session*, this
+        worker's change is applied again with *reapply*, and the save is
+        retried. Without *reapply*, the other worker's state simply wins.
+        """
+        if self.backend is None:
+            return True
+        session = session or self._sessions.get(sid)
+        if session is None:
+            return True
+        for _ in range(SESSION_SAVE_RETRIES + 1):
+            expected = session.version
+            record = session.to_record()
+            record.version = expected + 1
+            if await self.backend.save(sid, record, expected):
+                session.version = record.version
+                return True
+            self._load_stats["save_conflicts"] += 1
+            latest = await self.backend.load(sid)
+            if latest is None:
+                session.version = 0   # expired or deleted meanwhile: write ours as new
+                continue
+            session.load_record(latest)
+            if reapply is not None:
+                reapply(session)
+            if self._sessions.get(sid) is session:
+                self._touch(sid, session)
+        print(f"Giving up saving session {sid!r} after {SESSION_SAVE_RETRIES} conflicting writes")
+        return False
+
+    async def record_turn(self, sid: str, session: Session, question: str, answer: str) -> None:
+        """Save *session* after a completed turn and queue the turn for the database."""
+        await self.save(sid, session, reapply=lambda s: s.add_turn(question, answer))
+        await conversation_store.append(sid, question, answer)
+        self._schedule_summary(sid, session)
 
     async def get(self, sid: str) -> Session:
-        if sid not in self._sessions:
-            # Get resume from database
-            print("Getting resume from database")
-            async with AsyncSessionLocal() as db:
-                print("DB initialized")
-                try:
-                    result = await db.execute(
-                        text("SELECT raw_text FROM resumes WHERE user_id = :sid"),
-                        {"sid": sid}
-                    )
-                    resume = result.fetchone()
-                    if resume is None:
-                        raise KeyError(f"No resume found for user {sid!r}")
-                    
-                    # Create new session with resume text from DB
-                    self._sessions[sid] = Session(resume.raw_text, metadata)
-                except Exception as e:
-                    print(f"Database error: {e}")
-                    raise KeyError(f"Error fetching resume for user {sid!r}: {e}")
-
-        return self._sessions[sid]
+        self._expire()
+        session = self._sessions.get(sid)
+        if session is not None and self.backend is not None:
+            remote_version = await self.backend.version(sid)
+            if remote_version is not None and remote_version != session.version:
+                session = None   # another worker moved the conversation on
+        if session is not None:
+            if session.history_pending:
+                await self._hydrate(sid, session)
+            # Re-measure: the conversation may have grown since the last access
+            self._touch(sid, session)
+            return session
+
+        expires = self._missing.get(sid)
+        if expires is not None:
+            if expires > time.monotonic():
+                self._load_stats["negative_hits"] += 1
+                raise KeyError(f"No resume found for user {sid!r}")
+            del self._missing[sid]
+
+        # Coalesce concurrent cold loads of the same sid into one query
+        task = self._inflight.get(sid)
+        if task is None:
+            task = asyncio.ensure_future(self._load(sid))
+            self._inflight[sid] = task
+            task.add_done_callback(lambda t, sid=sid: self._load_done(sid, t))
+        else:
+            self._load_stats["coalesced"] += 1
+        # shield: one caller being cancelled must not fail the other waiters
+        return await asyncio.shield(task)
+
+    async def prefetch(self, sids: Iterable[str]) -> int:
+        """
+        Warm many sessions with a single ``user_id IN (...)`` query.
+        Returns how many were loaded; ids found neither in the resumes table
+        nor in the shared backend are negatively cached.
+        Conversation history is read on each session's first get().
+        """
+        wanted = [
+            sid for sid in dict.fromkeys(sids)
+            if sid not in self._sessions and sid not in self._inflight
+        ]
+        if not wanted:
+            return 0
+        self._load_stats["db_queries"] += 1
+        resumes = await resume_store.get_many(wanted)
+        found = set()
+        for sid, resume in resumes.items():
+            if sid in self._sessions:
+                continue   # created while we were querying
+            found.add(sid)
+            session = Session(resume.raw_text, resume.metadata)
+            session.history_pending = True
+            self._put(sid, session)
+        missing = [sid for sid in wanted if sid not in found]
+        if missing and self.backend is not None:
+            # No resume row, but another worker may hold the session (e.g. one
+            # created from a parse there); only ids absent from both are "missing"
+            versions = await asyncio.gather(*(self.backend.version(sid) for sid in missing))
+            missing = [sid for sid, version in zip(missing, versions) if version is None]
+        for sid in missing:
+            self._remember_missing(sid)
+        return len(found)
+
+    async def aclose(self) -> None:
+        for task in list(self._summarizing.values()):
+            task.cancel()
+        await asyncio.gather(*self._summarizing.values(), return_exceptions=True)
+        if self.backend is not None:
+            await self.backend.aclose()
+
+    def discard(self, sid: str) -> None:
+        session = self._sessions.pop(sid, None)
+        if session is not None:
+            self._total_bytes -= session.nbytes
+
+    def __contains__(self, sid: str) -> bool:
+        return sid in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        self._expire()
+        return {
+            "sessions": len(self._sessions),
+            "approx_bytes": self._total_bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "evictions": dict(self._evictions),
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "loads": {**self._load_stats, "in_flight": len(self._inflight)},
+            "negative_cache": len(self._missing),
+            "summaries": {**self._summary_stats, "in_flight": len(self._summarizing)},
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    async def _load(self, sid: str) -> Session:
+        if self.backend is not None:
+            record = await self.backend.load(sid)
+            if record is not None:
+                session = Session.from_record(record)
+                self._put(sid, session)
+                return session
+
+        # Get resume text and metadata from the database
+        self._load_stats["db_queries"] += 1
+        try:
+            resume = await resume_store.get(sid)
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise KeyError(f"Error fetching resume for user {sid!r}: {e}")
+        if resume is None:
+            self._remember_missing(sid)
+            raise KeyError(f"No resume found for user {sid!r}")
+
+        # Create new session from the stored resume and past conversation
+        session = Session(resume.raw_text, resume.metadata)
+        session.history_pending = True
+        await self._hydrate(sid, session)
+        self._put(sid, session)
+        await self.save(sid, session)
+        return session
+
+    async def _hydrate(self, sid: str, session: Session) -> None:
+        # Single-flight, like _load: concurrent first requests share one query
+        task = self._hydrating.get(sid)
+        if task is None:
+            task = asyncio.ensure_future(self._read_history(sid, session))
+            self._hydrating[sid] = task
+            task.add_done_callback(lambda t, sid=sid: self._hydrating.pop(sid, None))
+        await asyncio.shield(task)
+
+    async def _read_history(self, sid: str, session: Session) -> None:
+        self._load_stats["history_loads"] += 1
+        try:
+            turns = await conversation_store.recent(sid)
+        except Exception as e:
+            # A failed read must not block the chat. Keep history_pending so the
+            # next request tries again rather than dropping the history for good
+            print(f"Error loading conversation for {sid!r}: {e}")
+            return
+        session.restore_history(turns)
+        self._schedule_summary(sid, session)
+
+    def _schedule_summary(self, sid: str, session: Session) -> None:
+        # One at a time per session; a later turn is picked up by the next run
+        if session.memory.needs_summary and sid not in self._summarizing:
+            task = asyncio.ensure_future(self._summarize(sid, session))
+            self._summarizing[sid] = task
+            task.add_done_callback(lambda t, sid=sid: self._summarizing.pop(sid, None))
+
+    async def _summarize(self, sid: str, session: Session) -> None:
+        from .chat_pipeline import get_llm
+
+        self._summary_stats["runs"] += 1
+        try:
+            # Lowest priority: waits behind chat and parse for an LLM slot
+            with await admission.acquire("background", deadline=None):
+                with stage_timer("summarize"):
+                    await session.memory.asummarize(get_llm())
+        except Exception as e:
+            self._summary_stats["errors"] += 1
+            print(f"Error summarizing conversation {sid!r}: {e}")
+            return
+        if self._sessions.get(sid) is session:
+            self._touch(sid, session)
+            await self.save(sid, session)
+
+    def _load_done(self, sid: str, task: asyncio.Task) -> None:
+        self._inflight.pop(sid, None)
+        if not task.cancelled():
+            task.exception()   # mark retrieved even if every waiter went away
+
+    def _remember_missing(self, sid: str) -> None:
+        self._missing[sid] = time.monotonic() + SESSION_NEGATIVE_TTL
+        self._missing.move_to_end(sid)
+        while len(self._missing) > _NEGATIVE_CACHE_MAX:
+            self._missing.popitem(last=False)
+
+    def _put(self, sid: str, session: Session) -> None:
+        self._missing.pop(sid, None)
+        self.discard(sid)
+        self._sessions[sid] = session
+        self._touch(sid, session)
+
+    def _touch(self, sid: str, session: Session) -> None:
+        session.last_access = time.monotonic()
+        self._sessions.move_to_end(sid)
+        size = session.approx_bytes()
+        self._total_bytes += size - session.nbytes
+        session.nbytes = size
+        self._evict(keep=sid)
+
+    def _expire(self) -> None:
+        # Ordered by last access, so expired sessions sit at the front
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            sid, session = next(iter(self._sessions.items()))
+            if session.last_access > cutoff:
+                break
+            self.discard(sid)
+            self._evictions["ttl"] += 1
+
+    def _evict(self, keep: str) -> None:
+        while (
+            len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes
+        ) and len(self._sessions) > 1:
+            sid = next(iter(self._sessions))
+            if sid == keep:
+                break
+            self.discard(sid)
+            self._evictions["lru"] += 1
 
 
 # singleton used by the FastAPI app
-session_manager = SessionManager()
+session_manager = SessionManager(backend=backend_from_env())
+
+Gauge("session_store_sessions", "Sessions held in memory", collect=lambda: len(session_manager))
+Gauge("session_store_bytes", "Approximate bytes held by in-memory sessions",
+      collect=lambda: session_manager.stats()["approx_bytes"])
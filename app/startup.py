@@ -0,0 +1,156 @@
+"""
+startup.py  ──  Cold-start timing and readiness state
+
+Imported first by app.main, so the clock starts before anything heavy is
+loaded. With STARTUP_IMPORT_PROFILE=true every top-level package (and every
+app.* module) is timed as it is imported, giving a per-import breakdown at
+GET /startup. Lazily created components (Gemini client, DB engine) and the
+optional warm-up record their own timings here too.
+
+Functions you'll use elsewhere:
+    • with startup.timed("llm_client"): ...  → record a lazy-init / warm-up step
+    • startup.install_import_profiler()     → start per-import timing
+    • startup.mark_ready() / startup.ready  → readiness for GET /ready
+    • startup.report()                      → dict served by GET /startup
+"""
+
+from __future__ import annotations
+import importlib.abc
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+STARTUP_IMPORT_PROFILE = os.getenv("STARTUP_IMPORT_PROFILE", "false").lower() == "true"
+_REPORT_TOP_IMPORTS = 30
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module's real loader just long enough to time exec_module."""
+
+    def __init__(self, loader, name: str, profiler: "_ImportProfiler"):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the real loader back before any code in the module runs, so
+        # importlib.resources and friends see what they expect
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._profiler.enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.exit(self._name)
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+
+class _ImportProfiler(importlib.abc.MetaPathFinder):
+    """
+    Times first imports of top-level packages and of our own modules.
+    *total* includes nested tracked imports, *self* excludes them.
+    """
+
+    def __init__(self, package: str):
+        self.package = package
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._stack: List[List] = []   # [name, started, nested_seconds]
+        self._busy = False
+
+    def tracked(self, name: str) -> bool:
+        return "." not in name or name.startswith(self.package + ".")
+
+    def find_spec(self, name, path, target=None):
+        if self._busy or name in self.timings or not self.tracked(name):
+            return None
+        self._busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._busy = False
+        if spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, name, self)
+        return spec
+
+    def enter(self, name: str) -> None:
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self, name: str) -> None:
+        _, started, nested = self._stack.pop()
+        total = time.perf_counter() - started
+        self.timings[name] = {"total_ms": round(total * 1000, 2), "self_ms": round((total - nested) * 1000, 2)}
+        if self._stack:
+            self._stack[-1][2] += total
+
+
+class StartupReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.app_loaded: Optional[float] = None       # seconds after start
+        self.ready_at: Optional[float] = None
+        self.phases: Dict[str, float] = {}             # name -> seconds
+        self.errors: Dict[str, str] = {}
+        self._profiler: Optional[_ImportProfiler] = None
+
+    # ── timing ─────────────────────────────────────────────────────────────
+    def install_import_profiler(self, package: str) -> None:
+        if self._profiler is None:
+            self._profiler = _ImportProfiler(package)
+            sys.meta_path.insert(0, self._profiler)
+
+    def mark_app_loaded(self) -> None:
+        if self.app_loaded is None:
+            self.app_loaded = time.perf_counter() - self.started
+
+    @contextmanager
+    def timed(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.errors[phase] = str(e)
+            raise
+        finally:
+            self.phases.setdefault(phase, time.perf_counter() - start)
+
+    # ── readiness ──────────────────────────────────────────────────────────
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def mark_ready(self) -> None:
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter() - self.started
+
+    def report(self) -> dict:
+        imports = None
+        if self._profiler is not None:
+            slowest = sorted(self._profiler.timings.items(), key=lambda kv: kv[1]["self_ms"], reverse=True)
+            imports = [{"module": name, **t} for name, t in slowest[:_REPORT_TOP_IMPORTS]]
+        return {
+            "app_import_ms": round(self.app_loaded * 1000, 2) if self.app_loaded is not None else None,
+            "ready_ms": round(self.ready_at * 1000, 2) if self.ready_at is not None else None,
+            "phases_ms": {name: round(s * 1000, 2) for name, s in self.phases.items()},
+            "errors": self.errors,
+            "imports": imports,
+        }
+
+
+# singleton used by the FastAPI app
+startup = StartupReport()
@@ -0,0 +1,352 @@
+"""
+tracing.py  ──  Sampled, batched trace export that never blocks a request
+
+Spans from @traced functions are sampled (globally and per route), pushed
+onto a bounded in-memory queue and shipped in batches by a background
+flusher. When the queue is full new spans are dropped and counted rather
+than slowing the request down.
+
+Exporters (TRACE_EXPORTER):
+    • langsmith → batch-ingest runs into LangSmith
+    • file      → append JSON lines to TRACE_FILE_PATH, for offline runs
+    • none      → sample and count, export nothing
+
+Functions you'll use elsewhere:
+    • @traced("chat_prediction")          → record a span for the call
+    • TraceSamplingMiddleware             → per-request sampling decision
+    • tracer.start() / await tracer.stop() → run / drain the flusher
+    • tracer.stats()                      → sampled/dropped/exported counts
+"""
+
+from __future__ import annotations
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# e.g. "/session/chat=0.5,/resume/parse=0.01"; longest matching path prefix wins
+TRACE_ROUTE_SAMPLE_RATES = os.getenv("TRACE_ROUTE_SAMPLE_RATES", "")
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "1000"))
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "100"))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "5"))
+TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "traces.jsonl")
+
+_MAX_FIELD_CHARS = 2000
+
+# Sampling decision for the current request; None outside a request
+_sampled: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar("trace_sampled", default=None)
+_route: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_route", default=None)
+
+
+def parse_route_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in spec.split(","):
+        if "=" not in part:
+            continue
+        prefix, rate = part.split("=", 1)
+        rates[prefix.strip()] = float(rate)
+    return rates
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Exporters: called from a worker thread with a batch of span dicts
+# ────────────────────────────────────────────────────────────────────────────
+class FileExporter:
+    def __init__(self, path: str = TRACE_FILE_PATH):
+        self.path = path
+
+    def export(self, spans: List[dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + "\n")
+
+
+class LangSmithExporter:
+    def __init__(self, project: Optional[str] = None):
+        self.project = project or os.getenv("LANGCHAIN_PROJECT", "fastapi-chat-app")
+        self._client = None
+
+    @property
+    def client(self):
+        # Created on the first export, off the startup path
+        if self._client is None:
+            from langsmith import Client
+
+            self._client = Client()
+        return self._client
+
+    def export(self, spans: List[dict]) -> None:
+        runs = []
+        for span in spans:
+            start = datetime.fromtimestamp(span["start_time"], tz=timezone.utc)
+            runs.append({
+                "id": span["id"],
+                "trace_id": span["id"],
+                "dotted_order": f"{start:%Y%m%dT%H%M%S%fZ}{span['id']}",
+                "name": span["name"],
+                "run_type": "chain",
+                "session_name": self.project,
+                "start_time": start,
+                "end_time": datetime.fromtimestamp(span["end_time"], tz=timezone.utc),
+                "inputs": span["inputs"],
+                "outputs": span["outputs"],
+                "error": span["error"],
+                "extra": {"metadata": {"route": span["route"]}},
+            })
+        self.client.batch_ingest_runs(create=runs)
+
+
+def exporter_from_env():
+    kind = os.getenv("TRACE_EXPORTER", "langsmith" if os.getenv("LANGCHAIN_API_KEY") else "none").lower()
+    if kind == "file":
+        return FileExporter()
+    if kind == "langsmith":
+        return LangSmithExporter()
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown TRACE_EXPORTER {kind!r} (expected langsmith, file or none)")
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Tracer: sampling, bounded queue and background flusher
+# ────────────────────────────────────────────────────────────────────────────
+class Tracer:
+    def __init__(
+        self,
+        exporter=None,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        route_rates: Optional[Dict[str, float]] = None,
+        queue_size: int = TRACE_QUEUE_SIZE,
+        batch_size: int = TRACE_BATCH_SIZE,
+        flush_interval: float = TRACE_FLUSH_INTERVAL,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.route_rates = route_rates if route_rates is not None else parse_route_rates(TRACE_ROUTE_SAMPLE_RATES)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: deque = deque()
+        # Spans may be recorded from threadpool workers (sync endpoints)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {"sampled": 0, "not_sampled": 0, "dropped": 0, "exported": 0, "export_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    # ── sampling ───────────────────────────────────────────────────────────
+    def rate_for(self, path: str) -> float:
+        best = None
+        for prefix in self.route_rates:
+            if path.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.route_rates[best] if best is not None else self.sample_rate
+
+    def decide(self, path: Optional[str] = None) -> bool:
+        if not self.enabled:
+            return False
+        rate = self.rate_for(path) if path is not None else self.sample_rate
+        sampled = rate >= 1.0 or random.random() < rate
+        self._counters["sampled" if sampled else "not_sampled"] += 1
+        return sampled
+
+    def is_sampled(self) -> bool:
+        decision = _sampled.get()
+        if decision is None:
+            # Outside a request (background jobs): decide per span
+            return self.decide()
+        return decision
+
+    # ── queue ──────────────────────────────────────────────────────────────
+    def record(self, span: dict) -> None:
+        with self._lock:
+            if len(self._queue) >= self.queue_size:
+                self._counters["dropped"] += 1
+                return
+            self._queue.append(span)
+            full_batch = len(self._queue) >= self.batch_size
+        if full_batch and self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self) -> None:
+        if self._task is not None or not self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        # Drain what is left so a clean shutdown loses nothing
+        while self._queue:
+            await self._flush_once()
+
+    def stats(self) -> dict:
+        return {
+            "exporter": type(self.exporter).__name__ if self.exporter else None,
+            "sample_rate": self.sample_rate,
+            "route_sample_rates": self.route_rates,
+            "queued": len(self._queue),
+            "queue_size": self.queue_size,
+            **self._counters,
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    async def _flusher(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._queue:
+                await self._flush_once()
+                if len(self._queue) < self.batch_size:
+                    break
+
+    async def _flush_once(self) -> None:
+        with self._lock:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self.exporter.export, batch)
+            self._counters["exported"] += len(batch)
+        except Exception as e:
+            # Traces are best effort: count and drop rather than retry forever
+            self._counters["export_errors"] += 1
+            self._counters["dropped"] += len(batch)
+            print(f"Trace export failed ({len(batch)} spans dropped): {e}")
+
+
+def _clip(value):
+    if isinstance(value, str):
+        return value[:_MAX_FIELD_CHARS]
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {str(k): _clip(v) for k, v in value.items() if isinstance(v, (str, int, float, bool, type(None)))}
+    return None
+
+
+def _span(name: str, start: float, inputs: dict, outputs: Optional[dict], error: Optional[BaseException]) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "name": name,
+        "route": _route.get(),
+        "start_time": start,
+        "end_time": time.time(),
+        "inputs": inputs,
+        "outputs": outputs,
+        "error": repr(error) if error is not None else None,
+    }
+
+
+
+def traced(name: str) -> Callable:
+    """
+    Record a span for each call of the decorated function when the current
+    request is sampled. Works on plain, async and async-generator functions.
+    Only scalar arguments (question, session_id, ...) are captured.
+    """
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        def inputs_of(args, kwargs) -> dict:
+            bound = signature.bind_partial(*args, **kwargs)
+            return {k: _clip(v) for k, v in bound.arguments.items() if _clip(v) is not None}
+
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def agen_wrapper(*args, **kwargs):
+                if not tracer.enabled or not tracer.is_sampled():
+                    async for item in fn(*args, **kwargs):
+                        yield item
+                    return
+                start, chunks, error = time.time(), 0, None
+                try:
+                    async for item in fn(*args, **kwargs):
+                        chunks += 1
+                        yield item
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    tracer.record(_span(name, start, inputs_of(args, kwargs), {"chunks": chunks}, error))
+            return agen_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled or not tracer.is_sampled():
+                    return await fn(*args, **kwargs)
+                start, result, error = time.time(), None, None
+                try:
+                    result = await fn(*args, **kwargs)
+                    return result
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    tracer.record(_span(name, start, inputs_of(args, kwargs), _clip(result), error))
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def sync_wrapper(*args, **kwargs):
+            if not tracer.enabled or not tracer.is_sampled():
+                return fn(*args, **kwargs)
+            start, result, error = time.time(), None, None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                tracer.record(_span(name, start, inputs_of(args, kwargs), _clip(result), error))
+        return sync_wrapper
+
+    return decorator
+
+
+class TraceSamplingMiddleware:
+    """Pure ASGI middleware: one sampling decision per request, by path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        path = scope.get("path", "")
+        sampled_token = _sampled.set(tracer.decide(path))
+        route_token = _route.set(path)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _sampled.reset(sampled_token)
+            _route.reset(route_token)
+
+
+# singleton used by the FastAPI app
+tracer = Tracer(exporter=exporter_from_env())
@@ -0,0 +1,284 @@
+"""
+user_store.py  ──  User repository with indexed lookups and keyset pagination
+
+Backends (select with USER_BACKEND):
+    • "database" → SQLUserRepository, the `users` table on the shared async
+                   engine, with unique indexes on email and username (default)
+    • "memory"   → InMemoryUserRepository, dicts keyed by id, email and
+                   username, seeded with two demo users (tests, local runs)
+
+Lists are keyset-paginated. Each page returns up to *limit* users with
+id > cursor, plus the cursor of the next page. Reading page 10,000 costs the
+same as page 1, and no request serializes the whole table. *fields* limits
+the columns read and returned. The id is always included.
+
+Functions you'll use elsewhere:
+    • await user_store.get(user_id) / get_by_email(email) / get_by_username(name)
+    • await user_store.create(UserCreate(...))   → row dict (raises UserExists)
+    • await user_store.list(cursor, limit, fields) → UserPage
+"""
+
+from __future__ import annotations
+import asyncio
+import base64
+import bisect
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+from .database import create_table, get_engine
+from .metrics import stage_timer
+from .models.user import UserCreate
+
+USER_BACKEND = os.getenv("USER_BACKEND", "database").lower()
+USER_PAGE_SIZE = int(os.getenv("USER_PAGE_SIZE", "50"))
+USER_PAGE_MAX = int(os.getenv("USER_PAGE_MAX", "200"))
+USER_STORE_CREATE_SCHEMA = os.getenv("USER_STORE_CREATE_SCHEMA", "true").lower() == "true"
+
+USER_FIELDS = ("id", "email", "username", "full_name", "is_active", "created_at")
+
+_DEMO_USERS = (
+    {"email": "john@example.com", "username": "john_doe", "full_name": "John Doe"},
+    {"email": "jane@example.com", "username": "jane_doe", "full_name": "Jane Doe"},
+)
+
+
+class UserExists(Exception):
+    """Another user already has this email or username."""
+
+    def __init__(self, field: str):
+        super().__init__(f"A user with this {field} already exists")
+        self.field = field
+
+
+@dataclass
+class UserPage:
+    items: List[dict]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(user_id: int) -> str:
+    return base64.urlsafe_b64encode(str(user_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """The last id of the previous page; ValueError if *cursor* is malformed."""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: Optional[str]) -> Sequence[str]:
+    """Validated column list from ``fields=id,email``; the id is always included."""
+    if not fields:
+        return USER_FIELDS
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in USER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(f for f in USER_FIELDS if f == "id" or f in wanted)
+
+
+def _clamp(limit: Optional[int]) -> int:
+    return max(1, min(limit or USER_PAGE_SIZE, USER_PAGE_MAX))
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def get(self, user_id: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def create(self, user: UserCreate) -> dict:
+        ...
+
+    @abstractmethod
+    async def list(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None, fields: Sequence[str] = USER_FIELDS
+    ) -> UserPage:
+        ...
+
+    @staticmethod
+    def _row(user: UserCreate, user_id: Optional[int] = None) -> dict:
+        # The password is not stored, as before
+        row = {
+            **user.model_dump(exclude={"password"}),
+            "is_active": True,
+            "created_at": datetime.now(timezone.utc),
+        }
+        return row if user_id is None else {"id": user_id, **row}
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# In memory
+# ────────────────────────────────────────────────────────────────────────────
+class InMemoryUserRepository(UserRepository):
+    """Dict indexes on id, email and username; ids ascend, so pages are a bisect away."""
+
+    def __init__(self, seed: Sequence[dict] = _DEMO_USERS):
+        self._by_id: Dict[int, dict] = {}
+        self._by_email: Dict[str, dict] = {}
+        self._by_username: Dict[str, dict] = {}
+        self._ids: List[int] = []
+        self._next_id = 1
+        for user in seed:
+            self._insert({
+                "id": self._next_id, **user, "is_active": True, "created_at": datetime.now(timezone.utc)
+            })
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        return self._by_id.get(user_id)
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return self._by_email.get(email)
+
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        return self._by_username.get(username)
+
+    async def create(self, user: UserCreate) -> dict:
+        if user.email in self._by_email:
+            raise UserExists("email")
+        if user.username in self._by_username:
+            raise UserExists("username")
+        row = self._row(user, self._next_id)
+        self._insert(row)
+        return row
+
+    async def list(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None, fields: Sequence[str] = USER_FIELDS
+    ) -> UserPage:
+        limit = _clamp(limit)
+        start = bisect.bisect_right(self._ids, decode_cursor(cursor)) if cursor else 0
+        ids = self._ids[start:start + limit + 1]
+        items = [{f: self._by_id[i][f] for f in fields} for i in ids[:limit]]
+        return UserPage(items, encode_cursor(ids[limit - 1]) if len(ids) > limit else None)
+
+    def _insert(self, row: dict) -> None:
+        self._by_id[row["id"]] = row
+        self._by_email[row["email"]] = row
+        self._by_username[row["username"]] = row
+        self._ids.append(row["id"])
+        self._next_id = row["id"] + 1
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Database
+# ────────────────────────────────────────────────────────────────────────────
+_table = None
+
+
+def users_table():
+    """The SQLAlchemy Core table, defined on first use to keep SQLAlchemy off the import path."""
+    global _table
+    if _table is None:
+        from sqlalchemy import Boolean, Column, DateTime, Index, Integer, MetaData, String, Table
+
+        _table = Table(
+            "users",
+            MetaData(),
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("email", String(320), nullable=False),
+            Column("username", String(50), nullable=False),
+            Column("full_name", String(100)),
+            Column("is_active", Boolean, nullable=False, default=True),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+            Index("ux_users_email", "email", unique=True),
+            Index("ux_users_username", "username", unique=True),
+        )
+    return _table
+
+
+class SQLUserRepository(UserRepository):
+    """Primary key and unique-index lookups; pages are ``WHERE id > :cursor ORDER BY id LIMIT n``."""
+
+    def __init__(self):
+        self._schema_ready = not USER_STORE_CREATE_SCHEMA
+        self._schema_lock = asyncio.Lock()   # one creator when first requests race
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        return await self._one("id", user_id)
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return await self._one("email", email)
+
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        return await self._one("username", username)
+
+    async def create(self, user: UserCreate) -> dict:
+        from sqlalchemy import insert
+        from sqlalchemy.exc import IntegrityError
+
+        # Friendly error for the common case; the unique indexes settle races
+        if await self.get_by_email(user.email) is not None:
+            raise UserExists("email")
+        if await self.get_by_username(user.username) is not None:
+            raise UserExists("username")
+        table = users_table()
+        stmt = insert(table).values(**self._row(user)).returning(*table.c)
+        try:
+            with stage_timer("db_write"):
+                async with get_engine().begin() as conn:
+                    row = (await conn.execute(stmt)).mappings().one()
+        except IntegrityError:
+            raise UserExists("email or username")
+        return dict(row)
+
+    async def list(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None, fields: Sequence[str] = USER_FIELDS
+    ) -> UserPage:
+        from sqlalchemy import select
+
+        limit = _clamp(limit)
+        table = users_table()
+        query = select(*(table.c[f] for f in fields)).order_by(table.c.id).limit(limit + 1)
+        if cursor:
+            query = query.where(table.c.id > decode_cursor(cursor))
+        rows = await self._fetch(query)
+        items = [dict(r) for r in rows[:limit]]
+        return UserPage(items, encode_cursor(items[-1]["id"]) if len(rows) > limit else None)
+
+    async def _one(self, column: str, value) -> Optional[dict]:
+        from sqlalchemy import select
+
+        table = users_table()
+        rows = await self._fetch(select(table).where(table.c[column] == value))
+        return dict(rows[0]) if rows else None
+
+    async def _fetch(self, query) -> list:
+        await self._ensure_schema()
+        with stage_timer("db_lookup"):
+            async with get_engine().connect() as conn:
+                return (await conn.execute(query)).mappings().all()
+
+    async def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        async with self._schema_lock:
+            # Another request may have created it while this one waited
+            if not self._schema_ready:
+                async with get_engine().begin() as conn:
+                    await conn.run_sync(create_table, users_table())
+                self._schema_ready = True
+
+
+def repository_from_env() -> UserRepository:
+    if USER_BACKEND == "memory":
+        return InMemoryUserRepository()
+    if USER_BACKEND == "database":
+        return SQLUserRepository()
+    raise ValueError(f"Unknown USER_BACKEND: {USER_BACKEND!r}")
+
+
+# singleton used by the FastAPI app
+user_store = repository_from_env()
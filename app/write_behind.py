@@ -0,0 +1,162 @@
+"""
+write_behind.py  ──  Batch database writes off the request path
+
+Items are buffered in memory and handed to an async *flush* callable in
+batches, when *max_batch* items are waiting or every *interval* seconds,
+whichever comes first. With a *key* function, a newer item replaces a
+pending one with the same key, so only the latest version is written.
+If the buffer holds *max_pending* items, add() waits for a flush. This is
+backpressure: writes are never silently dropped. A failed batch is put
+back and retried on the next flush. drain() flushes everything on shutdown.
+
+Functions you'll use elsewhere:
+    • buf = WriteBehindBuffer("resumes", flush_fn, key=lambda r: r.user_id)
+    • await buf.add(item)
+    • buf.pending(key)             → item not yet written (read-your-writes)
+    • buf.pending_where(pred)      → all such items matching pred
+    • buf.start() / await buf.drain()
+"""
+
+from __future__ import annotations
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, List, Optional
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[List[Any]], Awaitable[None]],
+        max_batch: int = 100,
+        interval: float = 1.0,
+        max_pending: int = 10_000,
+        key: Optional[Callable[[Any], Hashable]] = None,
+    ):
+        self.name = name
+        self._flush_fn = flush
+        self.max_batch = max_batch
+        self.interval = interval
+        self.max_pending = max_pending
+        self._key = key
+        self._seq = itertools.count()
+        self._pending: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._in_flight: dict = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._counters = {"added": 0, "coalesced": 0, "written": 0, "batches": 0, "errors": 0, "waits": 0}
+        self._last_error: Optional[str] = None
+
+    # ── API ────────────────────────────────────────────────────────────────
+    async def add(self, item: Any) -> None:
+        self._ensure_events()
+        while len(self._pending) >= self.max_pending:
+            self._counters["waits"] += 1
+            self._space.clear()
+            self._wakeup.set()
+            if self._task is None:
+                if not await self.flush():
+                    await asyncio.sleep(self.interval)
+            else:
+                await self._space.wait()
+        key = self._key(item) if self._key is not None else next(self._seq)
+        if key in self._pending:
+            self._counters["coalesced"] += 1
+            self._pending.move_to_end(key)
+        self._pending[key] = item
+        self._counters["added"] += 1
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    def pending(self, key: Hashable) -> Optional[Any]:
+        """The newest not-yet-written item for *key*, if any."""
+        item = self._pending.get(key)
+        return item if item is not None else self._in_flight.get(key)
+
+    def pending_where(self, predicate: Callable[[Any], bool]) -> List[Any]:
+        """Every not-yet-written item matching *predicate*, oldest first."""
+        items = list(self._in_flight.values()) + list(self._pending.values())
+        return [item for item in items if predicate(item)]
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._ensure_events()
+        self._task = asyncio.create_task(self._run())
+
+    async def flush(self) -> bool:
+        """Write everything pending now, batch by batch. False if a batch failed."""
+        self._ensure_events()
+        async with self._flush_lock:
+            while self._pending:
+                if not await self._flush_batch():
+                    return False
+        return True
+
+    async def drain(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._pending:
+            print(f"{self.name}: {len(self._pending)} buffered writes could not be flushed: {self._last_error}")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "max_batch": self.max_batch,
+            "interval_seconds": self.interval,
+            "last_error": self._last_error,
+            **self._counters,
+        }
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _ensure_events(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._space = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not await self.flush():
+                # Back off instead of hammering a failing database
+                await asyncio.sleep(self.interval)
+
+    async def _flush_batch(self) -> bool:
+        keys = list(itertools.islice(self._pending, self.max_batch))
+        batch = {k: self._pending.pop(k) for k in keys}
+        self._in_flight = batch
+        started = time.perf_counter()
+        try:
+            await self._flush_fn(list(batch.values()))
+        except BaseException as e:
+            # Put the batch back in front, unless a newer version arrived
+            # meanwhile; also when cancelled so drain() can still write it
+            for k, item in reversed(list(batch.items())):
+                if k not in self._pending:
+                    self._pending[k] = item
+                    self._pending.move_to_end(k, last=False)
+            if not isinstance(e, Exception):
+                raise
+            self._counters["errors"] += 1
+            self._last_error = f"{type(e).__name__}: {e}"
+            print(f"{self.name}: flush of {len(batch)} writes failed after "
+                  f"{time.perf_counter() - started:.2f}s, will retry: {e}")
+            return False
+        finally:
+            self._in_flight = {}
+            self._space.set()
+        self._counters["written"] += len(batch)
+        self._counters["batches"] += 1
+        return True
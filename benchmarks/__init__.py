@@ -0,0 +1,6 @@
+"""Offline load-testing harness, see benchmarks/run.py."""
+
+# API key the benchmark server is started with and the load generator sends
+BENCH_API_KEY = "benchmark-key"
+# Users seeded in the benchmark database, ids 1..BENCH_USERS
+BENCH_USERS = 5000
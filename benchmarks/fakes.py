@@ -0,0 +1,315 @@
+"""
+fakes.py  ──  Offline stand-ins for Gemini, S3 and Postgres
+
+Functions you'll use elsewhere:
+    • FakeChatModel(latency=.., token_latency=.., tokens=..) → LangChain chat model
+      (failure_rate / slow_rate inject errors and latency spikes)
+    • routed_fakes(fallbacks=1, ..) → fakes behind the app's LLM router
+    • install_fake_llm(model)       → swap it in for the shared model
+    • PdfServer(resumes).start()    → local HTTP server standing in for S3
+    • seed_database(path, resumes, users) → SQLite file with resumes and users tables
+    • fake_resumes(n)               → deterministic resume texts
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_WORDS = (
+    "experienced engineer delivered scalable services across teams improving reliability "
+    "latency and cost while mentoring developers and owning production systems end to end"
+).split()
+_JSON_FIELD = re.compile(r'"(\w+)":\s*(string\[\]|string)')
+# One line per resume in a batched metadata question: "1": {"name": string, ...}
+_BATCH_ITEM = re.compile(r'^\s*"(\d+)":\s*\{(.*)\}\s*$', re.M)
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Fake LLM
+# ────────────────────────────────────────────────────────────────────────────
+class FakeModelError(Exception):
+    """Injected upstream failure; status 503 makes the router treat it as transient."""
+
+    status_code = 503
+
+
+def _fake_fields(fields) -> dict:
+    return {name: ["Python", "SQL"] if kind == "string[]" else f"Fake {name}" for name, kind in fields}
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers after *latency* seconds (time to first token), then streams
+    *tokens* words *token_latency* seconds apart. Metadata questions get a
+    JSON answer for exactly the fields asked for, batched ones one object per resume.
+
+    A *failure_rate* share of calls raise FakeModelError straight away.
+    A *slow_rate* share wait *slow_latency* seconds instead of *latency*,
+    to exercise hedging.
+    """
+
+    latency: float = 0.5
+    token_latency: float = 0.01
+    tokens: int = 60
+    failure_rate: float = 0.0
+    slow_rate: float = 0.0
+    slow_latency: float = 5.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        question = str(messages[-1].content) if messages else ""
+        fields = _JSON_FIELD.findall(question)
+        if "resumes above" in question:
+            return json.dumps({
+                number: _fake_fields(_JSON_FIELD.findall(item)) for number, item in _BATCH_ITEM.findall(question)
+            })
+        if "Fill this JSON" in question and fields:
+            return json.dumps(_fake_fields(fields))
+        return " ".join(_WORDS[i % len(_WORDS)] for i in range(self.tokens))
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> dict:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = len(text.split())
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        text = self._reply(messages)
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _first_token_delay(self) -> float:
+        if random.random() < self.failure_rate:
+            raise FakeModelError(f"{self._llm_type}: injected failure")
+        return self.slow_latency if random.random() < self.slow_rate else self.latency
+
+    def _total_delay(self, text: str) -> float:
+        return self._first_token_delay() + self.token_latency * len(text.split())
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        result = self._result(messages)
+        time.sleep(self._total_delay(result.generations[0].message.content))
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        result = self._result(messages)
+        await asyncio.sleep(self._total_delay(result.generations[0].message.content))
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._first_token_delay())
+        for word in self._reply(messages).split(" "):
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._first_token_delay())
+        for word in self._reply(messages).split(" "):
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def routed_fakes(fallbacks: int = 1, callbacks: Optional[list] = None, **fake: Any) -> BaseChatModel:
+    """
+    A primary FakeChatModel plus *fallbacks* identical ones behind the app's
+    router, like get_llm() builds for Gemini. *fake* goes to every model.
+    """
+    from app.routed_chat_model import RoutedChatModel
+
+    names = ["fake-primary"] + [f"fake-fallback-{i}" for i in range(1, fallbacks + 1)]
+    return RoutedChatModel(models={name: FakeChatModel(**fake) for name in names}, callbacks=callbacks)
+
+
+def install_fake_llm(model: BaseChatModel) -> None:
+    """Use *model* wherever the app would call Gemini."""
+    from app.chat_pipeline import set_llm
+
+    set_llm(model)
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Resumes, PDFs and the S3 stand-in
+# ────────────────────────────────────────────────────────────────────────────
+def fake_resumes(n: int, seed: int = 7) -> Dict[str, str]:
+    """user_id -> resume text. Addresses are left out so parses still ask the LLM."""
+    rng = random.Random(seed)
+    first = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie"]
+    last = ["Nguyen", "Smith", "Patel", "Garcia", "Brown", "Chen", "Wilson", "Khan"]
+    skills = ["Python", "FastAPI", "PostgreSQL", "Docker", "Kubernetes", "AWS", "React", "Redis"]
+    resumes = {}
+    for i in range(n):
+        name = f"{rng.choice(first)} {rng.choice(last)}"
+        handle = name.lower().replace(" ", ".")
+        lines = [
+            name,
+            f"{handle}{i}@example.com | +61 4{rng.randrange(10**7, 10**8)}",
+            "Summary",
+            " ".join(rng.choice(_WORDS) for _ in range(40)),
+            "Skills",
+            ", ".join(rng.sample(skills, 5)),
+            "Experience",
+        ]
+        for year in range(2015, 2024, 2):
+            lines.append(f"Engineer, Company {rng.randrange(100)} ({year} - {year + 2})")
+            lines.append(" ".join(rng.choice(_WORDS) for _ in range(30)))
+        resumes[f"bench-user-{i}"] = "\n".join(lines)
+    return resumes
+
+
+def make_resume_pdf(text: str) -> bytes:
+    """A minimal single-page PDF with *text* set in Helvetica, one line per row."""
+    rows = []
+    for line in text.splitlines():
+        # Wrap long lines so they stay on the page
+        while line:
+            rows.append(line[:95])
+            line = line[95:]
+    escaped = [r.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for r in rows]
+    stream = "BT /F1 10 Tf 40 800 Td 13 TL\n" + "".join(f"({r}) Tj T*\n" for r in escaped) + "ET"
+    stream_bytes = stream.encode("latin-1", "replace")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length " + str(len(stream_bytes)).encode() + b" >>\nstream\n" + stream_bytes + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+class PdfServer:
+    """
+    Serves {user_id}.pdf for each resume with ETags, like the S3 bucket.
+    *delay* holds every reply back (timeouts); *content_length=False* sends
+    bodies without a length, as a chunked upstream would.
+    """
+
+    def __init__(
+        self,
+        resumes: Dict[str, str],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        delay: float = 0.0,
+        content_length: bool = True,
+    ):
+        self.files = {f"{uid}.pdf": make_resume_pdf(text) for uid, text in resumes.items()}
+        self.etags = {name: '"' + hashlib.md5(body).hexdigest() + '"' for name, body in self.files.items()}
+        self.delay = delay
+        self.content_length = content_length
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _handler(self):
+        files, etags, server = self.files, self.etags, self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.delay:
+                    time.sleep(server.delay)
+                name = self.path.lstrip("/").split("?", 1)[0]
+                body = files.get(name)
+                if body is None:
+                    self.send_error(404)
+                    return
+                if self.headers.get("If-None-Match") == etags[name]:
+                    self.send_response(304)
+                    self.send_header("ETag", etags[name])
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                if server.content_length:
+                    self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etags[name])
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "PdfServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Database stand-in
+# ────────────────────────────────────────────────────────────────────────────
+def seed_database(path: str, resumes: Dict[str, str], users: int = 0) -> None:
+    """Create the resumes and users tables the app queries, with *resumes* and *users* rows."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS resumes")
+        conn.execute(
+            "CREATE TABLE resumes (id INTEGER PRIMARY KEY, user_id VARCHAR(255) NOT NULL, "
+            "raw_text TEXT NOT NULL, metadata JSON, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        )
+        conn.execute("CREATE UNIQUE INDEX ix_resumes_user_id ON resumes (user_id)")
+        conn.executemany(
+            "INSERT INTO resumes (user_id, raw_text, created_at, updated_at) "
+            "VALUES (?, ?, datetime('now'), datetime('now'))",
+            list(resumes.items()),
+        )
+        conn.execute("DROP TABLE IF EXISTS users")
+        conn.execute(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(320) NOT NULL, "
+            "username VARCHAR(50) NOT NULL, full_name VARCHAR(100), is_active BOOLEAN NOT NULL, "
+            "created_at DATETIME NOT NULL)"
+        )
+        conn.execute("CREATE UNIQUE INDEX ux_users_email ON users (email)")
+        conn.execute("CREATE UNIQUE INDEX ux_users_username ON users (username)")
+        conn.executemany(
+            "INSERT INTO users (email, username, full_name, is_active, created_at) "
+            "VALUES (?, ?, ?, 1, datetime('now'))",
+            [(f"user{i}@example.com", f"user_{i}", f"User {i}") for i in range(1, users + 1)],
+        )
+        conn.commit()
+    finally:
+        conn.close()
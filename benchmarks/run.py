@@ -0,0 +1,304 @@
+"""
+run.py  ──  Closed-loop load generator for /session/chat, /resume/parse and /users
+
+    python -m benchmarks.run --profiles chat,users --concurrency 1,16,64 --duration 20 \\
+        --out bench-results.json --compare bench-baseline.json
+
+Starts benchmarks.server as a subprocess unless --url is given. For every
+profile and concurrency level it runs that many workers, each sending its
+next request as soon as the previous one finishes, for --duration seconds
+after a short warm-up. It reports RPS and latency percentiles per endpoint.
+Results are written as JSON tagged with the git commit, so runs from
+different commits can be compared with --compare.
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from . import BENCH_API_KEY, BENCH_USERS
+
+ROOT = Path(__file__).resolve().parent.parent
+
+QUESTIONS = [
+    "What is my email address?",
+    "Summarise my experience in two sentences.",
+    "Which skills should I highlight for a backend role?",
+    "Write a short cover letter for a platform engineering job.",
+    "How many years of experience do I have?",
+]
+
+
+@dataclass
+class Context:
+    resumes: int
+    rng: random.Random = field(default_factory=random.Random)
+
+
+Op = Callable[[httpx.AsyncClient, Context], Awaitable[Tuple[str, httpx.Response]]]
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Operations
+# ────────────────────────────────────────────────────────────────────────────
+async def chat(client: httpx.AsyncClient, ctx: Context):
+    # Seeded user ids double as session ids: first use loads from the DB
+    body = {
+        "session_id": f"bench-user-{ctx.rng.randrange(ctx.resumes)}",
+        "message": ctx.rng.choice(QUESTIONS),
+    }
+    return "POST /session/chat", await client.post("/session/chat", json=body)
+
+
+async def parse(client: httpx.AsyncClient, ctx: Context):
+    file_name = f"bench-user-{ctx.rng.randrange(ctx.resumes)}.pdf"
+    return "GET /resume/parse", await client.get(
+        "/resume/parse", params={"fileName": file_name}, headers={"Authorization": BENCH_API_KEY}
+    )
+
+
+async def list_users(client: httpx.AsyncClient, ctx: Context):
+    # A random page: keyset pagination keeps deep pages as cheap as the first
+    cursor = base64.urlsafe_b64encode(str(ctx.rng.randrange(BENCH_USERS)).encode()).decode()
+    return "GET /users", await client.get("/users/", params={"cursor": cursor})
+
+
+async def get_user(client: httpx.AsyncClient, ctx: Context):
+    return "GET /users/{id}", await client.get(f"/users/{ctx.rng.randrange(1, BENCH_USERS + 1)}")
+
+
+async def create_user(client: httpx.AsyncClient, ctx: Context):
+    # Unique across workers and runs, so every create is a real insert, not a 409
+    n = uuid.uuid4().hex
+    body = {
+        "email": f"bench{n}@example.com",
+        "username": f"bench_{n}",
+        "full_name": "Bench User",
+        "password": "benchmark-password",
+    }
+    return "POST /users", await client.post("/users/", json=body)
+
+
+# profile -> [(weight, op)]
+PROFILES: Dict[str, List[Tuple[float, Op]]] = {
+    "chat": [(1.0, chat)],
+    "parse": [(1.0, parse)],
+    "users": [(0.7, list_users), (0.25, get_user), (0.05, create_user)],
+    "mixed": [(0.6, chat), (0.1, parse), (0.25, list_users), (0.05, get_user)],
+}
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Load generation
+# ────────────────────────────────────────────────────────────────────────────
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / seconds, 2) if seconds else 0.0,
+        "mean_ms": round(1000 * sum(values) / len(values), 2) if values else 0.0,
+        **{f"p{p}_ms": round(1000 * percentile(values, p), 2) for p in (50, 90, 95, 99)},
+        "max_ms": round(1000 * values[-1], 2) if values else 0.0,
+    }
+
+
+async def run_step(
+    url: str, profile: str, concurrency: int, duration: float, warmup: float, resumes: int, seed: int
+) -> dict:
+    weights, ops = zip(*PROFILES[profile])
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120.0) as client:
+        start = time.perf_counter()
+        measure_from = start + warmup
+        deadline = measure_from + duration
+
+        async def worker(index: int) -> None:
+            ctx = Context(resumes=resumes, rng=random.Random(seed * 1000 + index))
+            while True:
+                op = ctx.rng.choices(ops, weights)[0]
+                began = time.perf_counter()
+                if began >= deadline:
+                    return
+                try:
+                    name, response = await op(client, ctx)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    name, failed = op.__name__, True
+                ended = time.perf_counter()
+                if began < measure_from:
+                    continue
+                latencies.setdefault(name, []).append(ended - began)
+                if failed:
+                    errors[name] = errors.get(name, 0) + 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        # Requests in flight at the deadline finish late; count the real span
+        measured = max(time.perf_counter(), deadline) - measure_from
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    return {
+        "profile": profile,
+        "concurrency": concurrency,
+        "seconds": round(measured, 2),
+        "total": summarize(all_latencies, sum(errors.values()), measured),
+        "endpoints": {
+            name: summarize(values, errors.get(name, 0), measured) for name, values in sorted(latencies.items())
+        },
+    }
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Server process, reporting
+# ────────────────────────────────────────────────────────────────────────────
+def start_server(args) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "benchmarks.server",
+        "--port", str(args.port),
+        "--resumes", str(args.resumes),
+        "--llm-latency", str(args.llm_latency),
+        "--llm-token-latency", str(args.llm_token_latency),
+        "--llm-tokens", str(args.llm_tokens),
+        "--llm-failure-rate", str(args.llm_failure_rate),
+        "--llm-slow-rate", str(args.llm_slow_rate),
+        "--llm-slow-latency", str(args.llm_slow_latency),
+        "--llm-fallbacks", str(args.llm_fallbacks),
+    ]
+    return subprocess.Popen(cmd, cwd=ROOT)
+
+
+async def wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url, timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server at {url} did not become healthy within {timeout:.0f}s")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: List[dict], baseline: Optional[dict]) -> None:
+    previous = {}
+    if baseline:
+        previous = {(r["profile"], r["concurrency"]): r["total"] for r in baseline["results"]}
+    print(f"{'profile':<8} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}  vs baseline")
+    for r in results:
+        t = r["total"]
+        line = (
+            f"{r['profile']:<8} {r['concurrency']:>5} {t['rps']:>9.1f} "
+            f"{t['p50_ms']:>9.1f} {t['p99_ms']:>9.1f} {t['errors']:>7}"
+        )
+        old = previous.get((r["profile"], r["concurrency"]))
+        if old and old["rps"] and old["p99_ms"]:
+            line += (
+                f"  rps {100 * (t['rps'] / old['rps'] - 1):+.1f}%"
+                f"  p99 {100 * (t['p99_ms'] / old['p99_ms'] - 1):+.1f}%"
+            )
+        print(line)
+
+
+async def run(args) -> dict:
+    url = args.url or f"http://127.0.0.1:{args.port}"
+    server = None if args.url else start_server(args)
+    try:
+        await wait_ready(url)
+        results = []
+        for profile in args.profiles:
+            for concurrency in args.concurrency:
+                print(f"→ {profile} × {concurrency} for {args.duration:.0f}s", flush=True)
+                results.append(await run_step(
+                    url, profile, concurrency, args.duration, args.warmup, args.resumes, args.seed
+                ))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+    return {
+        "commit": git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            k: getattr(args, k) for k in (
+                "profiles", "concurrency", "duration", "warmup", "resumes",
+                "llm_latency", "llm_token_latency", "llm_tokens", "llm_failure_rate",
+                "llm_slow_rate", "llm_slow_latency", "llm_fallbacks", "seed",
+            )
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    def csv(kind):
+        return lambda value: [kind(v) for v in value.split(",") if v]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=csv(str), default=["chat", "parse", "users"],
+                        help=f"comma-separated, from {', '.join(PROFILES)}")
+    parser.add_argument("--concurrency", type=csv(int), default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per step")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each step")
+    parser.add_argument("--resumes", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-token-latency", type=float, default=0.01)
+    parser.add_argument("--llm-tokens", type=int, default=60)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0)
+    parser.add_argument("--llm-slow-latency", type=float, default=5.0)
+    parser.add_argument("--llm-fallbacks", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--url", default=None, help="benchmark an already running server instead")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--compare", default=None, help="results JSON from an earlier run")
+    args = parser.parse_args()
+
+    unknown = set(args.profiles) - set(PROFILES)
+    if unknown:
+        parser.error(f"unknown profiles: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args))
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_results(report["results"], baseline)
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
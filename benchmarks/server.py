@@ -0,0 +1,78 @@
+"""
+server.py  ──  Run the app fully offline for benchmarking
+
+    python -m benchmarks.server --port 8001 --llm-latency 0.5 --resumes 200
+
+Starts the local PDF server, seeds a SQLite database, points the app at
+both through the environment, swaps in FakeChatModel and serves the app with
+uvicorn. benchmarks/run.py starts this as a subprocess so the load generator
+does not share an event loop with the server.
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+from . import BENCH_API_KEY, BENCH_USERS
+from .fakes import PdfServer, fake_resumes, install_fake_llm, routed_fakes, seed_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--resumes", type=int, default=200, help="resumes seeded in the DB and PDF server")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds to first token")
+    parser.add_argument("--llm-token-latency", type=float, default=0.01, help="seconds between streamed tokens")
+    parser.add_argument("--llm-tokens", type=int, default=60, help="words per chat answer")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="share of model calls that fail (503)")
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0, help="share of model calls that are slow")
+    parser.add_argument("--llm-slow-latency", type=float, default=5.0, help="seconds to first token when slow")
+    parser.add_argument("--llm-fallbacks", type=int, default=1, help="fallback models behind the primary")
+    parser.add_argument("--workdir", default=None, help="where the SQLite DB and caches go (default: temp dir)")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    resumes = fake_resumes(args.resumes)
+    pdfs = PdfServer(resumes).start()
+    db_path = workdir / "bench.sqlite3"
+    seed_database(str(db_path), resumes, BENCH_USERS)
+
+    # Must be set before the app modules read them at import time
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+        "RESUME_BASE_URL": pdfs.base_url,
+        "RESUME_CACHE_DIR": str(workdir / "resume-cache"),
+        "API_KEY": BENCH_API_KEY,
+        "GOOGLE_API_KEY": "offline-benchmark",
+        "TRACE_EXPORTER": "none",
+        "SESSION_BACKEND": "memory",
+        "USER_BACKEND": "database",
+    })
+
+    import uvicorn
+    from app.main import app
+    from app.llm_metrics import LLMMetricsCallback
+
+    install_fake_llm(routed_fakes(
+        fallbacks=args.llm_fallbacks,
+        callbacks=[LLMMetricsCallback()],
+        latency=args.llm_latency,
+        token_latency=args.llm_token_latency,
+        tokens=args.llm_tokens,
+        failure_rate=args.llm_failure_rate,
+        slow_rate=args.llm_slow_rate,
+        slow_latency=args.llm_slow_latency,
+    ))
+    print(f"PDF server on {pdfs.base_url}, database {db_path}")
+    try:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    finally:
+        pdfs.stop()
+
+
+if __name__ == "__main__":
+    main()
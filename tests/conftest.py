@@ -0,0 +1,15 @@
+import pytest
+
+from app import database
+
+
+@pytest.fixture
+def fresh_database(tmp_path, monkeypatch):
+    """Point the shared engine at an empty SQLite file.
+
+    Tests must ``await database.dispose_engine()`` before their event loop ends.
+    """
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(database, "_engine", None)
+    yield
+    monkeypatch.setattr(database, "_engine", None)
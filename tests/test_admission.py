@@ -0,0 +1,31 @@
+import pytest
+from starlette.requests import Request
+
+from app.admission import client_key
+
+
+def _request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("10.0.0.1", 5000),
+    })
+
+
+def test_api_key_wins_over_the_address():
+    assert client_key(_request({"Authorization": "k1", "X-Forwarded-For": "1.2.3.4"}), forwarded_hops=1) == "k1"
+
+
+@pytest.mark.parametrize("hops, expected", [
+    (0, "10.0.0.1"),        # proxy header ignored unless trusted
+    (1, "203.0.113.9"),     # the address our proxy saw
+    (2, "198.51.100.7"),
+    (5, "6.6.6.6"),         # more hops than entries: leftmost
+])
+def test_forwarded_for_is_read_from_the_trusted_end(hops, expected):
+    request = _request({"X-Forwarded-For": "6.6.6.6, 198.51.100.7, 203.0.113.9"})
+    assert client_key(request, forwarded_hops=hops) == expected
+
+
+def test_falls_back_to_the_peer_without_the_header():
+    assert client_key(_request({}), forwarded_hops=1) == "10.0.0.1"
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.answer_cache import AnswerCache, normalize_question, similarity
+
+SESSION = SimpleNamespace(resume_text="Jane Doe. Python, Java. Acme Corp 2019-2023.", metadata={"name": "Jane"})
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(enabled=True, threshold=0.9, max_entries=100, ttl=60)
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("how many years of python experience do i have", "how many years of java experience do i have"),
+    ("summarize my work experience at acme corp", "summarize my work experience at apex corp"),
+    ("when did i start at acme", "where did i start at acme"),
+    ("do i know python", "do i not know python"),
+])
+def test_questions_that_differ_in_a_content_word_miss(cache, cached, asked):
+    cache.store(SESSION, cached, "cached answer")
+    assert cache.lookup(SESSION, asked) is None
+    assert similarity(normalize_question(cached), normalize_question(asked)) == 0.0
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("what is my email", "What's my email?"),
+    ("what is the email on my resume", "what is my email on the resume"),
+    ("what are my skills", "what is my skill"),
+])
+def test_rewordings_hit(cache, cached, asked):
+    cache.store(SESSION, cached, "cached answer")
+    assert cache.lookup(SESSION, asked) == "cached answer"
+
+
+def test_other_resume_misses(cache):
+    cache.store(SESSION, "what is my email", "jane@example.com")
+    other = SimpleNamespace(resume_text="John Roe", metadata={})
+    assert cache.lookup(other, "what is my email") is None
+
+
+@pytest.mark.parametrize("question", [
+    "write a cover letter for this job",
+    "tell me more",
+    "can you elaborate on the previous answer",
+])
+def test_generative_and_follow_up_prompts_bypass(cache, question):
+    assert not cache.cacheable(question)
+
+
+@pytest.mark.parametrize("question", [
+    "what projects did i do that used python",
+    "which roles were above senior level",
+    "do i have more java or python experience",
+])
+def test_ordinary_questions_are_cacheable(cache, question):
+    assert cache.cacheable(question)
@@ -0,0 +1,40 @@
+import asyncio
+
+from app import conversation_store as store_module, database
+from app.conversation_store import ConversationStore
+
+
+def run(coro_fn):
+    async def go():
+        try:
+            return await coro_fn()
+        finally:
+            await database.dispose_engine()
+
+    return asyncio.run(go())
+
+
+def test_concurrent_first_reads_create_the_schema_once(fresh_database):
+    store = ConversationStore(enabled=True)
+
+    async def reads():
+        return await asyncio.gather(*(store.recent(f"s{i}") for i in range(6)), return_exceptions=True)
+
+    assert run(reads) == [[]] * 6
+
+
+def test_flushed_turns_are_read_back_in_order(fresh_database):
+    store = ConversationStore(enabled=True)
+
+    async def roundtrip():
+        for i in range(3):
+            await store.append("s1", f"q{i}", f"a{i}")
+        await store.drain()
+        return await store.recent("s1", limit=2)
+
+    assert [t.question for t in run(roundtrip)] == ["q1", "q2"]
+
+
+def test_missing_table_is_empty_when_not_creating(fresh_database, monkeypatch):
+    monkeypatch.setattr(store_module, "CONVERSATION_STORE_CREATE_SCHEMA", False)
+    assert run(lambda: ConversationStore(enabled=True).recent("s1")) == []
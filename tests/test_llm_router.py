@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from app.llm_router import LLMDeadlineExceeded, LLMRouter, deadline_scope
+
+
+class Upstream503(Exception):
+    status_code = 503
+
+
+def router(**overrides) -> LLMRouter:
+    options = dict(deadline=5, max_retries=2, backoff=0, hedge_percentile=0, hedge_min_samples=3, hedge_min_delay=0.01)
+    return LLMRouter(**{**options, **overrides})
+
+
+class FakeModels:
+    """Stub model calls: per model, a list of outcomes (a value, an exception, or a delay then a value)."""
+
+    def __init__(self, **script):
+        self.script = {name: list(outcomes) for name, outcomes in script.items()}
+        self.calls = []
+
+    async def __call__(self, name):
+        self.calls.append(name)
+        outcome = self.script[name].pop(0) if len(self.script[name]) > 1 else self.script[name][0]
+        if isinstance(outcome, tuple):
+            delay, outcome = outcome
+            await asyncio.sleep(delay)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def test_transient_error_is_retried():
+    models = FakeModels(primary=[Upstream503(), ConnectionError(), "ok"])
+    assert asyncio.run(router().call(["primary"], models)) == "ok"
+    assert models.calls == ["primary"] * 3
+
+
+def test_non_transient_error_is_not_retried():
+    models = FakeModels(primary=[ValueError("bad request"), "ok"])
+    with pytest.raises(ValueError):
+        asyncio.run(router().call(["primary"], models))
+    assert models.calls == ["primary"]
+
+
+def test_falls_back_to_the_second_model():
+    models = FakeModels(primary=[Upstream503()], fallback=["from fallback"])
+    r = router(max_retries=1)
+    assert asyncio.run(r.call(["primary", "fallback"], models)) == "from fallback"
+    assert models.calls == ["primary", "primary", "fallback"]
+    assert r.stats()["fallbacks"] == 1
+
+
+def test_hedge_fires_after_the_percentile_delay():
+    r = router(hedge_percentile=95)
+
+    async def scenario():
+        warm = FakeModels(primary=[(0.02, "warm")])
+        for _ in range(3):
+            await r.call(["primary"], warm)
+        # The original stalls; the duplicate sent after ~p95 answers first
+        slow_then_fast = FakeModels(primary=[(2.0, "original"), (0.0, "hedge")])
+        started = time.monotonic()
+        result = await r.call(["primary"], slow_then_fast)
+        return result, time.monotonic() - started
+
+    result, elapsed = asyncio.run(scenario())
+    assert result == "hedge"
+    assert elapsed < 0.5
+    counts = r.stats()["models"]["primary"]
+    assert counts["hedges"] == 1 and counts["hedge_wins"] == 1
+
+
+def test_losing_result_is_discarded_when_both_finish_together():
+    r = router(hedge_percentile=95)
+    discarded = []
+
+    async def scenario():
+        warm = FakeModels(primary=["warm"])
+        for _ in range(3):
+            await r.call(["primary"], warm)
+        release = asyncio.Event()
+        attempts = iter(["original", "hedge"])
+
+        async def attempt(name):
+            label = next(attempts)
+            await release.wait()
+            return label
+
+        asyncio.get_running_loop().call_later(0.1, release.set)
+
+        async def discard(result):
+            discarded.append(result)
+
+        return await r.call(["primary"], attempt, discard=discard)
+
+    assert asyncio.run(scenario()) == "original"
+    assert discarded == ["hedge"]
+
+
+def test_deadline_exceeded():
+    models = FakeModels(primary=[(1.0, "too late")])
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(router(deadline=0.05).call(["primary"], models))
+
+
+def test_deadline_scope_tightens_the_deadline():
+    async def scenario():
+        with deadline_scope(0.05):
+            await router(deadline=5).call(["primary"], FakeModels(primary=[(1.0, "too late")]))
+
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(scenario())
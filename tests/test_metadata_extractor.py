@@ -0,0 +1,37 @@
+import pytest
+
+from app.metadata_extractor import METADATA_LOCAL_THRESHOLD, extract_local
+
+
+@pytest.mark.parametrize("text, field, value, resolved", [
+    # Prose mentioning a road is not an address
+    ("Worked 3 years on analytics for the Pacific Highway project", "address", None, False),
+    ("Led 12 engineers rebuilding the billing platform on Main Street", "address", None, False),
+    ("jane@example.com | 0412 345 678 | 12 Smith St, Sydney NSW 2000", "address",
+     "12 Smith St, Sydney NSW 2000", True),
+    ("Unit 4, 27 Harbour View Road", "address", "Unit 4, 27 Harbour View Road", False),
+    ("Sydney NSW 2000", "address", "Sydney NSW 2000", False),
+    # Phone numbers keep their opening paren, or are not taken at all
+    ("Phone: (02) 9876 5432", "phone", "(02) 9876 5432", True),
+    ("Mobile +61 (2) 9876 5432", "phone", "+61 (2) 9876 5432", True),
+    ("0412 345 678", "phone", "0412 345 678", True),
+    ("Acme Corp 2019 - 2021", "phone", None, False),
+])
+def test_contact_fields(text, field, value, resolved):
+    result = extract_local(text)
+    assert result.fields.get(field) == value
+    assert (result.confidence[field] >= METADATA_LOCAL_THRESHOLD) is resolved
+
+
+@pytest.mark.parametrize("text, expected, resolved", [
+    ("Skills: Java, Python, Kubernetes, Stakeholder mapping\nExperience\nAcme",
+     ["Python", "Java", "Kubernetes", "Stakeholder mapping"], True),
+    ("Technical Skills\nPython, Docker and AWS\nEducation\nUNSW",
+     ["Python", "AWS", "Docker"], True),
+    # Dictionary words in prose are a hint for the model, not an answer
+    ("Built Python services on AWS with Docker", ["Python", "AWS", "Docker"], False),
+])
+def test_skills(text, expected, resolved):
+    result = extract_local(text)
+    assert sorted(result.fields["skills"]) == sorted(expected)
+    assert (result.confidence["skills"] >= METADATA_LOCAL_THRESHOLD) is resolved
@@ -0,0 +1,40 @@
+import asyncio
+
+from app import parse_jobs
+from app.parse_jobs import ParseJobManager
+from app.resume_pipeline import ParseError
+
+
+def _run(manager, file_name):
+    async def go():
+        job = manager.submit(file_name)
+        await manager._queue.join()
+        await manager.stop()
+        return job.to_dict()
+
+    return asyncio.run(go())
+
+
+def test_succeeded_job_is_done(monkeypatch):
+    async def parse_one(file_name, on_stage):
+        on_stage("fetch")
+        on_stage("metadata")
+        return {"fileName": file_name}
+
+    monkeypatch.setattr(parse_jobs, "parse_one", parse_one)
+    job = _run(ParseJobManager(workers=1), "a.pdf")
+    assert job["status"] == "succeeded"
+    assert job["stage"] == "done" and job["progress"] == 1.0
+
+
+def test_failed_job_keeps_its_stage(monkeypatch):
+    async def parse_one(file_name, on_stage):
+        on_stage("fetch")
+        on_stage("extract")
+        raise ParseError(422, "No text in PDF")
+
+    monkeypatch.setattr(parse_jobs, "parse_one", parse_one)
+    job = _run(ParseJobManager(workers=1), "b.pdf")
+    assert job["status"] == "failed"
+    assert job["error"] == {"status_code": 422, "detail": "No text in PDF"}
+    assert job["stage"] == "extract" and job["progress"] < 1.0
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+import pytest
+
+from app import pdf_extractor as extractor_module
+from app.pdf_extractor import PdfExtractError, PdfExtractor
+from benchmarks.fakes import make_resume_pdf
+
+
+def _hang(*args):
+    """Stands in for a page pypdf never finishes (the deadline is checked between pages)."""
+    time.sleep(60)
+
+
+def test_a_hung_worker_is_replaced(tmp_path, monkeypatch):
+    path = tmp_path / "resume.pdf"
+    path.write_bytes(make_resume_pdf("Jane Doe\njane@example.com"))
+    extractor = PdfExtractor(workers=1, timeout=1.0)
+    stuck = []
+    recycle = extractor._recycle
+
+    def record_and_recycle():
+        stuck.extend(extractor._pool._processes.values())
+        recycle()
+
+    extractor._recycle = record_and_recycle
+
+    async def hang_then_extract():
+        monkeypatch.setattr(extractor_module, "_extract_head", _hang)
+        with pytest.raises(PdfExtractError):
+            await extractor.extract(str(path))
+        monkeypatch.undo()
+        # With the only worker still stuck this would time out too
+        return await extractor.extract(str(path))
+
+    try:
+        result = asyncio.run(hang_then_extract())
+        assert "jane@example.com" in result.text
+        assert stuck and all(p.is_alive() for p in stuck)
+        time.sleep(extractor.timeout + 1.5)   # killed once past every document's deadline
+        assert not any(p.is_alive() for p in stuck)
+    finally:
+        extractor.shutdown()
@@ -0,0 +1,103 @@
+import asyncio
+import os
+
+import pytest
+
+from app.pdf_fetcher import PdfFetcher, PdfFetchError, PdfNotFound, PdfTooLarge
+from benchmarks.fakes import PdfServer
+
+RESUMES = {"42": "Jane Doe\njane@example.com\nSkills\nPython, SQL"}
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**options) -> PdfServer:
+        server = PdfServer(RESUMES, **options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def fetch(fetcher: PdfFetcher, url: str, etag=None):
+    async def run():
+        try:
+            return await fetcher.fetch(url, etag=etag)
+        finally:
+            await fetcher.aclose()
+
+    return asyncio.run(run())
+
+
+def test_downloads_into_a_spooled_file(serve):
+    server = serve()
+    with fetch(PdfFetcher(spool_bytes=64), server.base_url + "42.pdf") as result:
+        body = result.read()
+        assert result.status_code == 200
+        assert body == server.files["42.pdf"] and result.size == len(body)
+        assert result.body._rolled   # spilled to disk past spool_bytes
+
+
+def test_spill_hands_workers_a_path(serve):
+    from app.pdf_extractor import PdfExtractor
+
+    server = serve()
+    extractor = PdfExtractor(workers=1, pages_per_task=1)
+    result = fetch(PdfFetcher(), server.base_url + "42.pdf")
+    try:
+        with result:
+            path = asyncio.run(result.spill())
+            with open(path, "rb") as f:
+                assert f.read() == server.files["42.pdf"]
+            extraction = asyncio.run(extractor.extract(path))
+            assert "jane@example.com" in extraction.text
+        assert result.path is None and not os.path.exists(path)   # removed on close
+    finally:
+        extractor.shutdown()
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+def test_size_cap(serve, content_length):
+    # Rejected from the declared length, or while streaming when there is none
+    server = serve(content_length=content_length)
+    with pytest.raises(PdfTooLarge):
+        fetch(PdfFetcher(max_bytes=100, chunk_size=16), server.base_url + "42.pdf")
+
+
+def test_size_cap_is_a_413(serve, monkeypatch):
+    from app import resume_pipeline
+    from app.resume_pipeline import ParseError
+
+    server = serve()
+    monkeypatch.setattr(resume_pipeline, "pdf_fetcher", PdfFetcher(max_bytes=100))
+    with pytest.raises(ParseError) as error:
+        asyncio.run(resume_pipeline._download(server.base_url + "42.pdf"))
+    assert error.value.status_code == 413
+
+
+def test_etag_reuse(serve):
+    server = serve()
+    url = server.base_url + "42.pdf"
+    with fetch(PdfFetcher(), url) as first:
+        assert first.etag == server.etags["42.pdf"]
+    second = fetch(PdfFetcher(), url, etag=first.etag)
+    assert second.not_modified and second.body is None
+    changed = fetch(PdfFetcher(), url, etag='"stale"')
+    assert changed.status_code == 200
+    changed.close()
+
+
+def test_missing_file(serve):
+    server = serve()
+    with pytest.raises(PdfNotFound):
+        fetch(PdfFetcher(), server.base_url + "nobody.pdf")
+
+
+def test_timeout(serve):
+    server = serve(delay=1.0)
+    with pytest.raises(PdfFetchError):
+        fetch(PdfFetcher(timeout=0.2), server.base_url + "42.pdf")
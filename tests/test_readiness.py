@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import main
+from app.startup import startup
+
+
+def _ready() -> httpx.Response:
+    async def send():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ready")
+
+    return asyncio.run(send())
+
+
+@pytest.fixture
+def started(monkeypatch):
+    monkeypatch.setattr(startup, "ready_at", 0.5)
+    monkeypatch.setattr(startup, "errors", {})
+    return startup.errors
+
+
+def test_ready_after_a_clean_startup(started):
+    response = _ready()
+    assert response.status_code == 200 and response.json()["failed"] == []
+
+
+def test_failed_warmup_is_not_ready(started):
+    started["warmup_db"] = "connection refused"
+    response = _ready()
+    assert response.status_code == 503
+    assert response.json()["failed"] == ["warmup_db"]
+
+
+def test_best_effort_failures_and_the_opt_out_stay_ready(started, monkeypatch):
+    started["session_prefetch"] = "boom"
+    assert _ready().status_code == 200
+    started["warmup_llm"] = "no API key"
+    monkeypatch.setattr(main, "READY_REQUIRE_WARMUP_SUCCESS", False)
+    assert _ready().status_code == 200
@@ -0,0 +1,40 @@
+import asyncio
+
+from app.resume_cache import CachedResume, ResumeCache
+
+
+def _entry(i: int, text: str = "x" * 200) -> CachedResume:
+    return CachedResume(sha256=f"{i:064x}", text=text)
+
+
+def _files(cache: ResumeCache) -> int:
+    return sum(p.stat().st_size for p in cache.cache_dir.glob("*.json"))
+
+
+def test_disk_bytes_are_tracked_without_scanning(tmp_path, monkeypatch):
+    cache = ResumeCache(str(tmp_path), max_disk_bytes=10_000)
+    asyncio.run(cache.put(_entry(1)))
+
+    scans = []
+    monkeypatch.setattr(cache, "_evict_disk", lambda: scans.append(1))
+    asyncio.run(cache.put(_entry(2)))
+    asyncio.run(cache.put(_entry(2, text="y" * 50)))   # overwrite shrinks the total
+    assert scans == []
+    assert cache.stats()["disk_bytes"] == _files(cache)
+
+
+def test_existing_files_seed_the_total(tmp_path):
+    asyncio.run(ResumeCache(str(tmp_path)).put(_entry(1)))
+    cache = ResumeCache(str(tmp_path))
+    asyncio.run(cache.put(_entry(2)))
+    assert cache.stats()["disk_bytes"] == _files(cache)
+
+
+def test_over_budget_evicts_the_oldest(tmp_path):
+    cache = ResumeCache(str(tmp_path), max_disk_bytes=700)
+    for i in range(5):
+        asyncio.run(cache.put(_entry(i)))
+    stats = cache.stats()
+    assert stats["disk_evictions"] > 0
+    assert stats["disk_bytes"] == _files(cache) <= 700
+    assert cache._path(_entry(4).sha256).exists()
@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app import chat_pipeline, resume_pipeline
+from app.admission import Overloaded
+from app.resume_pipeline import metadata_answers, parse_batch, split_batch_answer
+from benchmarks.fakes import FakeChatModel
+
+
+class CountingModel(FakeChatModel):
+    calls: int = 0
+
+    async def _agenerate(self, messages, *args, **kwargs):
+        self.calls += 1
+        return await super()._agenerate(messages, *args, **kwargs)
+
+
+@pytest.fixture
+def model():
+    fake = CountingModel(latency=0, token_latency=0)
+    chat_pipeline.set_llm(fake)
+    yield fake
+    chat_pipeline.set_llm(None)
+
+
+def test_batch_is_one_model_call(model):
+    requests = [("resume one", ["name", "skills"]), ("resume two", ["email"]), ("resume three", ["phone"])]
+    answers = asyncio.run(metadata_answers(requests))
+    assert model.calls == 1
+    assert answers == [
+        '{"name": "Fake name", "skills": ["Python", "SQL"]}',
+        '{"email": "Fake email"}',
+        '{"phone": "Fake phone"}',
+    ]
+
+
+def test_resumes_missing_from_the_reply_are_asked_again(model, monkeypatch):
+    monkeypatch.setattr(
+        "app.resume_pipeline.split_batch_answer", lambda answer, count: ['{"name": "A"}'] + [None] * (count - 1)
+    )
+    answers = asyncio.run(metadata_answers([("resume one", ["name"]), ("resume two", ["email"])]))
+    assert model.calls == 2
+    assert answers == ['{"name": "A"}', '{"email": "Fake email"}']
+
+
+def test_split_batch_answer():
+    reply = '```json\n{"1": {"name": "Ann"}, "3": "not an object"}\n```'
+    assert split_batch_answer(reply, 3) == ['{"name": "Ann"}', None, None]
+    assert split_batch_answer("no json here", 2) == [None, None]
+
+
+class Slots:
+    """llm_slot stand-in that records how many tickets are held and taken."""
+
+    def __init__(self, overloaded: bool = False):
+        self.overloaded = overloaded
+        self.held = 0
+        self.taken = 0
+
+    async def __call__(self):
+        if self.overloaded:
+            raise Overloaded("queue_full", 3)
+        self.taken += 1
+        return self
+
+    def __enter__(self):
+        self.held += 1
+
+    def __exit__(self, *exc):
+        self.held -= 1
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Stub the fetch/extract/finish stages; 'hit.pdf' is a cache hit."""
+    slots = Slots()
+
+    async def fetch_resume(name):
+        return SimpleNamespace(file_name=name, cached="cached" if name == "hit.pdf" else None)
+
+    async def no_slot_held(fetched, *args):
+        assert slots.held == 0
+        return {"fileName": fetched.file_name, "status": "success"}
+
+    async def extract_text(fetched):
+        assert slots.held == 0
+        return "plain text"
+
+    async def answers(requests):
+        assert slots.held == 1
+        return ['{"name": "A"}'] * len(requests)
+
+    monkeypatch.setattr(resume_pipeline, "fetch_resume", fetch_resume)
+    monkeypatch.setattr(resume_pipeline, "extract_text", extract_text)
+    monkeypatch.setattr(resume_pipeline, "finish_cached", no_slot_held)
+    monkeypatch.setattr(resume_pipeline, "finish_parse", no_slot_held)
+    monkeypatch.setattr(resume_pipeline, "metadata_answers", answers)
+    return slots
+
+
+def _batch(names, slots):
+    async def collect():
+        return [r async for r in parse_batch(names, llm_batch_size=2, llm_concurrency=1, llm_slot=slots)]
+
+    return {r["fileName"]: r for r in asyncio.run(collect())}
+
+
+def test_batch_takes_a_slot_per_model_call_only(stages):
+    results = _batch(["hit.pdf", "a.pdf", "b.pdf", "c.pdf", "d.pdf"], stages)
+    assert all(r["status"] == "success" for r in results.values())
+    assert 2 <= stages.taken <= 4   # one per batched call, never one for the cache hit
+
+
+def test_shed_model_calls_fail_only_their_resumes(stages):
+    stages.overloaded = True
+    results = _batch(["hit.pdf", "a.pdf"], stages)
+    assert results["hit.pdf"]["status"] == "success"
+    assert results["a.pdf"]["status_code"] == 429
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app import database, resume_store as store_module
+from app.models.resume import ResumeCreate
+from app.resume_store import ResumeSchemaError, ResumeStore
+
+
+def run(coro_fn):
+    async def go():
+        try:
+            return await coro_fn()
+        finally:
+            await database.dispose_engine()
+
+    return asyncio.run(go())
+
+
+def test_cold_read_on_a_fresh_database(fresh_database):
+    store = ResumeStore()
+
+    async def reads():
+        return await asyncio.gather(*(store.get(f"u{i}") for i in range(6)))
+
+    assert run(reads) == [None] * 6
+
+
+def test_missing_table_reads_as_empty_when_not_creating(fresh_database, monkeypatch):
+    monkeypatch.setattr(store_module, "RESUME_STORE_CREATE_SCHEMA", False)
+    assert run(lambda: ResumeStore().get_many(["u1", "u2"])) == {}
+
+
+def test_saved_resume_is_read_back(fresh_database):
+    store = ResumeStore()
+
+    async def roundtrip():
+        await store.save(ResumeCreate(user_id="u1", raw_text="text", metadata={"name": "A"}))
+        await store.drain()
+        return await ResumeStore().get("u1")
+
+    assert run(roundtrip).metadata == {"name": "A"}
+
+
+def test_duplicate_user_ids_are_a_clear_schema_error(fresh_database):
+    async def scenario():
+        from sqlalchemy import text
+
+        async with database.get_engine().begin() as conn:
+            await conn.execute(text(
+                "CREATE TABLE resumes (id INTEGER PRIMARY KEY, user_id VARCHAR(255) NOT NULL, raw_text TEXT NOT NULL, "
+                "metadata JSON, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+            ))
+            for _ in range(2):
+                await conn.execute(text(
+                    "INSERT INTO resumes (user_id, raw_text, created_at, updated_at) "
+                    "VALUES ('u1', 'old', '2024-01-01', '2024-01-01')"
+                ))
+        store = ResumeStore()
+        with pytest.raises(ResumeSchemaError, match="duplicate user_id"):
+            await store.ensure_schema()
+        # Reads still work without the index
+        return await store.get("u1")
+
+    assert run(scenario).raw_text == "old"
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.session_backends import RedisSessionBackend, SessionRecord, SQLiteSessionBackend
+from app.session_manager import SessionManager
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_backend(request, tmp_path):
+    """Factory for backends sharing one store, like two workers would."""
+    if request.param == "sqlite":
+        path = str(tmp_path / "sessions.sqlite3")
+        return lambda: SQLiteSessionBackend(path)
+    # Local stand-in for a Redis server
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    return lambda: RedisSessionBackend(client=fakeredis.FakeAsyncRedis(server=server))
+
+
+def test_save_is_compare_and_set(make_backend):
+    async def scenario():
+        backend = make_backend()
+        assert await backend.save("s1", SessionRecord("resume", version=1), expected_version=0)
+        # Creating again, or writing from a stale version, is refused
+        assert not await backend.save("s1", SessionRecord("other", version=1), expected_version=0)
+        assert await backend.save("s1", SessionRecord("resume v2", version=2), expected_version=1)
+        assert not await backend.save("s1", SessionRecord("stale", version=2), expected_version=1)
+        assert await backend.version("s1") == 2
+        assert (await backend.load("s1")).resume_text == "resume v2"
+        await backend.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_turns_from_two_workers_are_both_kept(make_backend):
+    async def scenario():
+        a, b = SessionManager(backend=make_backend()), SessionManager(backend=make_backend())
+        sid = await a.create("resume text")
+        session_a, session_b = await a.get(sid), await b.get(sid)
+
+        # Both workers answer a turn from the same version N
+        session_a.add_turn("q from a", "answer a")
+        session_b.add_turn("q from b", "answer b")
+        await a.record_turn(sid, session_a, "q from a", "answer a")
+        await b.record_turn(sid, session_b, "q from b", "answer b")
+
+        latest = await make_backend().load(sid)
+        contents = [m["data"]["content"] for m in latest.messages]
+        assert contents == ["q from a", "answer a", "q from b", "answer b"]
+        assert latest.version == session_b.version == session_a.version + 1
+        assert b.stats()["loads"]["save_conflicts"] == 1
+        await a.aclose()
+        await b.aclose()
+
+    asyncio.run(scenario())
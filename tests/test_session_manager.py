@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app import session_manager as session_module
+from app.routers import resume as resume_router, session as session_router
+from app.session_backends import SQLiteSessionBackend
+from app.session_manager import SessionManager
+
+
+class EmptyResumeStore:
+    """No resume rows at all: sessions can only come from the shared backend."""
+
+    async def get(self, user_id):
+        return None
+
+    async def get_many(self, user_ids):
+        return {}
+
+
+def test_prefetch_does_not_hide_sessions_held_by_the_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_module, "resume_store", EmptyResumeStore())
+    path = str(tmp_path / "sessions.sqlite3")
+
+    async def scenario():
+        other_worker = SessionManager(backend=SQLiteSessionBackend(path))
+        sid = await other_worker.create("resume text")
+
+        manager = SessionManager(backend=SQLiteSessionBackend(path))
+        assert await manager.prefetch([sid, "nobody"]) == 0
+        session = await manager.get(sid)
+        assert session.resume_text == "resume text"
+        # Ids absent everywhere are still negatively cached
+        assert manager.stats()["negative_cache"] == 1
+        await other_worker.aclose()
+        await manager.aclose()
+
+    asyncio.run(scenario())
+
+
+def _prefetch(monkeypatch, body: dict, headers: dict) -> httpx.Response:
+    async def prefetch(ids):
+        return len(ids)
+
+    monkeypatch.setattr(resume_router, "API_KEY", "secret")
+    monkeypatch.setattr(session_router.session_manager, "prefetch", prefetch)
+    app = FastAPI()
+    app.include_router(session_router.router)
+
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/session/prefetch", json=body, headers=headers)
+
+    return asyncio.run(send())
+
+
+def test_prefetch_route_needs_the_api_key(monkeypatch):
+    assert _prefetch(monkeypatch, {"session_ids": ["a"]}, {}).status_code == 403
+    assert _prefetch(monkeypatch, {"session_ids": ["a"]}, {"Authorization": "wrong"}).status_code == 401
+    ok = _prefetch(monkeypatch, {"session_ids": ["a", "b"]}, {"Authorization": "secret"})
+    assert ok.json() == {"requested": 2, "loaded": 2}
+
+
+def test_prefetch_route_caps_the_id_count(monkeypatch):
+    ids = [str(i) for i in range(session_module.SESSION_PREFETCH_MAX_IDS + 1)]
+    assert _prefetch(monkeypatch, {"session_ids": ids}, {"Authorization": "secret"}).status_code == 422
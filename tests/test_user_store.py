@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+import httpx
+from fastapi import FastAPI
+
+from app.models.user import UserCreate
+from app.routers import user as user_router
+from app.user_store import InMemoryUserRepository, UserExists, decode_cursor, parse_fields
+
+
+def _repo(n: int) -> InMemoryUserRepository:
+    seed = [{"email": f"u{i}@example.com", "username": f"user{i}", "full_name": f"User {i}"} for i in range(n)]
+    return InMemoryUserRepository(seed)
+
+
+def test_cursor_walks_every_user_once():
+    repo = _repo(25)
+    seen, cursor = [], None
+    while True:
+        page = asyncio.run(repo.list(cursor, limit=10))
+        seen += [u["id"] for u in page.items]
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    assert seen == list(range(1, 26))
+
+
+def test_last_full_page_has_no_next_cursor():
+    page = asyncio.run(_repo(10).list(None, limit=10))
+    assert len(page.items) == 10 and page.next_cursor is None
+
+
+def test_fields_limit_the_columns_and_keep_the_id():
+    page = asyncio.run(_repo(3).list(None, limit=5, fields=parse_fields("email")))
+    assert page.items[0] == {"id": 1, "email": "u0@example.com"}
+
+
+@pytest.mark.parametrize("fields, cursor", [("email,password", None), (None, "not-a-cursor!")])
+def test_bad_fields_or_cursor_are_rejected(fields, cursor):
+    with pytest.raises(ValueError):
+        asyncio.run(_repo(3).list(cursor, fields=parse_fields(fields)))
+
+
+def test_cursor_is_opaque_id():
+    page = asyncio.run(_repo(5).list(None, limit=2))
+    assert decode_cursor(page.next_cursor) == 2
+
+
+def test_duplicate_email_or_username():
+    repo = _repo(1)
+    with pytest.raises(UserExists):
+        asyncio.run(repo.create(UserCreate(email="u0@example.com", username="other", password="password1")))
+    with pytest.raises(UserExists):
+        asyncio.run(repo.create(UserCreate(email="new@example.com", username="user0", password="password1")))
+
+
+@pytest.fixture
+def call(monkeypatch):
+    """Run one request against the users router over an in-memory repository."""
+    monkeypatch.setattr(user_router, "user_store", _repo(3))
+    app = FastAPI()
+    app.include_router(user_router.router)
+
+    def request(method: str, url: str, **kwargs) -> httpx.Response:
+        async def send():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.request(method, url, **kwargs)
+        return asyncio.run(send())
+
+    return request
+
+
+def test_routes_return_the_same_datetime_format_as_create(call):
+    created = call("POST", "/users/", json={"email": "new@example.com", "username": "newbie", "password": "password1"})
+    fetched = call("GET", f"/users/{created.json()['id']}")
+    assert fetched.json()["created_at"] == created.json()["created_at"]
+    assert "T" in fetched.json()["created_at"]
+
+
+def test_list_route_pages_with_header(call):
+    first = call("GET", "/users/", params={"limit": 2, "fields": "id,username"})
+    assert first.json() == [{"id": 1, "username": "user0"}, {"id": 2, "username": "user1"}]
+    rest = call("GET", "/users/", params={"cursor": first.headers["X-Next-Cursor"]})
+    assert [u["id"] for u in rest.json()] == [3]
+    assert "x-next-cursor" not in rest.headers
+
+
+def test_concurrent_first_requests_create_the_schema_once(fresh_database):
+    from app import database
+    from app.user_store import SQLUserRepository
+
+    async def go():
+        repo = SQLUserRepository()
+        try:
+            return await asyncio.gather(*(repo.get(i) for i in range(6)), return_exceptions=True)
+        finally:
+            await database.dispose_engine()
+
+    assert asyncio.run(go()) == [None] * 6